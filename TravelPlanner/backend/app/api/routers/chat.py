@@ -1,12 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
+from io import BytesIO
+from pydantic import ValidationError
 from app.schemas.chat import (
     ChatRequest, 
     ChatResponse, 
     ChatHistoryRequest, 
     ChatHistoryResponse, 
-    ClearChatRequest
+    ClearChatRequest,
+    TTSPayload
 )
 from app.services.chat_service import chat_service
+from app.services.chat_events import encode, sse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,6 +41,48 @@ async def chat(request: ChatRequest):
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same as POST /chat/, streamed as Server-Sent Events.
+
+    Events: session, cached (the reply came from the semantic cache, with its
+    similarity), token, tool_start, tool_end (with the first hotel rows),
+    tool_error, then final (the ChatResponse payload) or error.
+    """
+    async def frames():
+        async for event in chat_service.stream_message(request.message, request.session_id):
+            yield sse(event)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Streaming chat over a WebSocket: send ChatRequest JSON messages, receive
+    the events of POST /chat/stream as JSON, one per frame. A disconnect
+    cancels the run in progress.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                request = ChatRequest.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            # closing the stream (on disconnect too) cancels the agent run
+            async with aclosing(chat_service.stream_message(request.message,
+                                                            request.session_id)) as events:
+                async for event in events:
+                    await websocket.send_text(encode(event))
+    except WebSocketDisconnect:
+        pass
+
 @router.get("/history/{session_id}", response_model=ChatHistoryResponse)
 async def get_chat_history(session_id: str):
     """
@@ -75,6 +123,7 @@ async def chat_health():
 
 @router.post("/tts")
 async def text_to_speech(payload: TTSPayload):
+    from app.services.llm_tts_stt import tts     # ElevenLabs SDK only needed here
     try:
         text = payload.dict()['text']
         output = tts(text)
@@ -86,6 +135,7 @@ async def text_to_speech(payload: TTSPayload):
         
 @router.post("/stt")
 async def speect_to_text(payload: UploadFile = File(...)):
+    from app.services.llm_tts_stt import stt
     try:
         audio = await payload.read()
         output = stt(audio)
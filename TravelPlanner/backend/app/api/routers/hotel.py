@@ -1,10 +1,37 @@
-from fastapi import APIRouter, Path, HTTPException
+from fastapi import APIRouter, Path, HTTPException, Query
+from typing import Optional
 from app.services.snowflake_db import snowflake_db
 from app.services import hotel_ops
+from app.services.hotel_geo import hotel_geo, hotels_nearby
+from app.services.name_index import hotel_lookup, lookup_hotels
+from app.services.destinations import destination_resolver
 import asyncio
 
 router = APIRouter()
 
+@router.get("/hotels/nearby")
+async def get_hotels_nearby(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the point of interest"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the point of interest"),
+    radius_km: Optional[float] = Query(None, gt=0, le=500, description="Only hotels within this distance"),
+    k: int = Query(10, ge=1, le=500, description="Maximum number of hotels, nearest first"),
+):
+    """Hotels around a point from the in-memory HOTELS proximity index."""
+    hotels = await hotels_nearby(lat, lon, radius_km=radius_km, k=k)
+    return {"count": len(hotels), "hotels": hotels}
+
+
+@router.get("/hotels/lookup")
+async def get_hotels_lookup(
+    q: str = Query(..., min_length=2, max_length=200, description="Hotel or city name, typos allowed"),
+    k: int = Query(10, ge=1, le=50, description="Maximum number of matches"),
+    kind: Optional[str] = Query(None, pattern="^(hotel|destination)$", description="Only hotels or only destinations"),
+):
+    """Typo-tolerant name lookup returning hotel IDs / codes and destination codes."""
+    matches = await lookup_hotels(q, k=k, kind=kind)
+    return {"query": q, "count": len(matches), "matches": matches}
+
+
 @router.get("/hotel/{hotel_id}")
 async def get_hotel(hotel_id: int = Path(..., description="Hotel identifier")):
     # Fetch basic hotel details from DB
@@ -31,3 +58,18 @@ async def get_hotel(hotel_id: int = Path(..., description="Hotel identifier")):
         "static_content": static_content.get(hotel_code, {}),
         "rates": rates.get("hotels", [])
     }
+
+
+@router.get("/hotels/stats")
+async def hotel_ops_stats():
+    """Counters for the Hotelbeds client (cache effectiveness, call volume)."""
+    return {
+        "availability_cache": hotel_ops.availability_cache_stats(),
+        "availability_streams": hotel_ops.stream_stats(),
+        "static_cache": hotel_ops.static_cache_stats(),
+        "limiters": hotel_ops.limiter_stats(),
+        "resilience": hotel_ops.resilience_stats(),
+        "geo_index": hotel_geo.stats(),
+        "name_index": hotel_lookup.stats(),
+        "destinations": destination_resolver.stats(),
+    }
@@ -27,10 +27,76 @@ class Settings(BaseSettings):
     
     # AI/LLM Settings
     groq_api_key: Optional[str] = None
+    elevenlabs_api_key: Optional[str] = None
+
+    # Outbound HTTP clients
+    http2_enabled: bool = True                     # used when the h2 package is installed
+    duffel_base_url: str = "https://api.duffel.com"
+    http_record_dir: Optional[str] = None          # record provider exchanges as fixtures
     
     # HotelBeds API Settings
     hotelbeds_api_key: Optional[str] = None
     hotelbeds_api_secret: Optional[str] = None
+    hotelbeds_base_url: str = "https://api.test.hotelbeds.com"
+    hotelbeds_availability_ttl: int = 300          # seconds an availability payload is reused
+    hotelbeds_availability_cache_size: int = 256   # max cached availability payloads
+    hotelbeds_availability_cache_bytes: int = 256 * 2**20   # response bytes the availability cache may hold
+    hotelbeds_stream_availability: bool = False    # decode availability incrementally for top-N tools (streamed payloads are not cached)
+    hotelbeds_static_cache_size: int = 50000       # hotels kept in the static content cache
+    hotelbeds_static_chunk_size: int = 100         # codes per content API request
+    hotelbeds_concurrency_initial: int = 16        # adaptive limiter start, per endpoint
+    hotelbeds_concurrency_max: int = 64            # adaptive limiter ceiling, per endpoint
+    hotelbeds_availability_target_latency: float = 3.0   # seconds; slower calls shrink the limit
+    hotelbeds_content_target_latency: float = 1.5
+    hotelbeds_max_retries: int = 2                 # transient-error retries per call
+    hotelbeds_retry_budget_ratio: float = 0.1      # retries + hedges allowed per first attempt
+
+    # Persistent Hotelbeds static content store (SQLite)
+    hotel_static_db_path: str = "data/hotel_static.db"
+    hotel_static_max_age: int = 7 * 24 * 60 * 60  # seconds before an entry is refreshed
+    hotel_static_db_writable: bool = False         # API workers open the store read-only
+
+    # Lowest-price calendar (swept by Celery, served from memory)
+    price_calendar_db_path: str = "data/price_calendar.db"
+    price_calendar_destinations: list[str] = ["BCN", "MAD", "LIS", "PMI", "LON", "PAR", "ROM", "AMS"]
+    price_calendar_nights: int = 90                # check-in dates swept ahead of today
+    price_calendar_max_age: int = 12 * 60 * 60     # seconds before a cell is re-priced live
+
+    # Hotel proximity index (built from the HOTELS table)
+    hotel_geo_cell_deg: float = 0.05               # grid cell size in degrees (~5.5 km)
+    hotel_geo_refresh_interval: int = 10 * 60      # seconds between incremental refreshes
+    hotel_geo_full_refresh_interval: int = 24 * 60 * 60  # seconds between full reloads
+
+    # Fuzzy hotel / destination name lookup
+    hotel_lookup_refresh_interval: int = 60 * 60   # seconds between index rebuilds
+
+    # Destination-code resolver (Hotelbeds destinations + zones, refreshed by Celery)
+    destinations_path: str = "data/destinations.json.gz"
+    destinations_max_age: int = 7 * 24 * 60 * 60   # seconds before the file is re-fetched
+    destinations_refresh_interval: int = 6 * 60 * 60  # seconds between file reloads
+
+    # Chat session memory (per worker)
+    chat_max_sessions: int = 5000
+    chat_memory_budget: int = 256 * 1024 * 1024    # estimated bytes across all sessions
+    chat_session_ttl: int = 2 * 60 * 60            # seconds idle before a session is dropped
+    chat_reaper_interval: int = 60                 # seconds between idle sweeps
+    chat_window_turns: int = 6                     # recent turns sent verbatim
+    chat_history_token_budget: int = 2000          # tokens of history per prompt (summary + turns)
+    chat_summary_max_tokens: int = 400             # rolling summary of older turns
+
+    # Semantic cache of first-message chat replies
+    semantic_cache_enabled: bool = True
+    semantic_cache_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    semantic_cache_threshold: float = 0.92         # cosine similarity for a hit
+    semantic_cache_ttl: int = 15 * 60              # seconds a reply may be reused
+    semantic_cache_max_entries: int = 5000
+
+    # Per-session memoization of agent tool calls
+    tool_memo_ttl: int = 10 * 60                   # seconds a tool result is reused in a session
+    tool_memo_max_sessions: int = 2000
+
+    # Celery
+    redis_url: str = "redis://localhost:6379/0"
 
     class Config:
         env_file = "../.env"
@@ -6,6 +6,15 @@ import logging
 from app.core.settings import settings
 from app.api.routers import chat, trip, hotel, pay
 from app.services.database import create_db_and_tables, close_database
+from app.services import hotel_ops
+from app.services.http_clients import registry as http_registry
+from app.services.hotel_geo import hotel_geo
+from app.services.name_index import hotel_lookup
+from app.services.destinations import destination_resolver
+from app.services.langchain_agent import chat_memory
+from app.services.chat_memory import warm_tokenizer
+from app.services.semantic_cache import semantic_cache
+from app.services.tool_memo import tool_memo
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -15,6 +24,16 @@ async def lifespan(app: FastAPI):
         create_db_and_tables()
     except Exception as e:
         logging.error(f"Failed to initialize database: {e}")
+
+    await http_registry.startup()
+    hotel_ops.open_static_store()
+    hotel_geo.start()                                   # loads HOTELS in the background
+    hotel_lookup.start()
+    destination_resolver.start()
+    chat_memory.start()                                 # idle-session reaper
+    await warm_tokenizer()                              # tiktoken encoding, off the loop
+    if settings.semantic_cache_enabled:
+        semantic_cache.start()                          # embedding model, in the background
     
     yield
     
@@ -23,6 +42,13 @@ async def lifespan(app: FastAPI):
         close_database()
     except Exception as e:
         logging.error(f"Failed to close database: {e}")
+    await hotel_geo.stop()
+    await hotel_lookup.stop()
+    await destination_resolver.stop()
+    await chat_memory.stop()
+    await semantic_cache.stop()
+    hotel_ops.close_static_store()
+    await http_registry.aclose()
 
 def create_app() -> FastAPI:
     app = FastAPI(title="TravelPlanner", lifespan=lifespan)
@@ -52,6 +78,17 @@ def configure_router(app: FastAPI):
     async def landing():
         return {"message": "Welcome to the Smart Travel Assistant API"}
 
+    @app.get("/metrics/http", tags=["root"])
+    async def http_metrics():
+        """Connection-pool utilisation of the outbound HTTP clients."""
+        return http_registry.metrics()
+
+    @app.get("/metrics/chat", tags=["root"])
+    async def chat_metrics():
+        """Live chat sessions, their estimated memory and eviction counts."""
+        return {**chat_memory.stats(), "semantic_cache": semantic_cache.stats(),
+                "tool_memo": tool_memo.stats()}
+
 def configure_logging():
     logging.basicConfig(
         level=logging.INFO,
@@ -20,6 +20,7 @@ class ChatResponse(BaseModel):
     tools_used: Optional[List[str]] = None
     hotel_data: Optional[List[Dict[str, Any]]] = None
     selected_hotel: Optional[Dict[str, Any]] = None
+    telemetry: Optional[Dict[str, Any]] = None
     timestamp: datetime = datetime.now()
 
 class ChatHistoryRequest(BaseModel):
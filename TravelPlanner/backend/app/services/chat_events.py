@@ -0,0 +1,104 @@
+"""Agent progress as a stream of events (LLM tokens, tool calls, hotel results)"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+_HOTELS_PER_EVENT = 10
+
+
+def hotels_in(output: Any) -> List[Dict[str, Any]]:
+    """Hotel rows in a tool result: a list of dicts or a dict with a list of them
+    under "hotels" / "top" (ranking and price-matrix tools)."""
+    if isinstance(output, dict):
+        output = output.get("hotels", output.get("top"))
+    if isinstance(output, list) and all(isinstance(h, dict) for h in output):
+        return output
+    return []
+
+
+class ChatEventStream(AsyncCallbackHandler):
+    """Callback handler that turns one agent run into a queue of events.
+
+    cached      {"similarity"}               reply served from the semantic cache
+    token       {"text"}                     LLM output as it is generated (this
+                                             includes the agent's reasoning steps)
+    tool_start  {"tool", "input"}
+    tool_end    {"tool", "hotels"?}          first hotel rows of the result
+    tool_error  {"tool", "error"}
+
+    ``tools_used`` and ``hotel_data`` keep what the run did for the final reply.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.tools_used: List[str] = []
+        self.hotel_data: List[Dict[str, Any]] = []
+        self._tools: Dict[UUID, str] = {}
+
+    def emit(self, type_: str, **data: Any) -> None:
+        self.queue.put_nowait({"type": type_, **data})
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.emit("token", text=token)
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *,
+                            run_id: UUID, inputs: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._tools[run_id] = name
+        if name not in self.tools_used:
+            self.tools_used.append(name)
+        self.emit("tool_start", tool=name, input=inputs if inputs is not None else input_str)
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self._tools.pop(run_id, "tool")
+        hotels = hotels_in(output)
+        if hotels:
+            self.hotel_data = hotels
+            self.emit("tool_end", tool=name, hotels=hotels[:_HOTELS_PER_EVENT])
+        else:
+            self.emit("tool_end", tool=name)
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.emit("tool_error", tool=self._tools.pop(run_id, "tool"), error=str(error))
+
+
+async def run_with_events(run: Callable[[ChatEventStream], Awaitable[Dict[str, Any]]],
+                          handler: Optional[ChatEventStream] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Events of ``run(handler)`` as they happen, then one "final" event with
+    its result (or an "error" event). Closing the iterator cancels the run."""
+    handler = handler or ChatEventStream()
+    task = asyncio.create_task(run(handler))
+    try:
+        while True:
+            getter = asyncio.ensure_future(handler.queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            break
+        while not handler.queue.empty():
+            yield handler.queue.get_nowait()
+        if task.exception() is not None:
+            yield {"type": "error", "detail": str(task.exception())}
+        else:
+            yield {"type": "final", **task.result()}
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def encode(event: Dict[str, Any]) -> str:
+    """An event as JSON; dates, Decimals and other tool values become strings."""
+    return json.dumps(event, default=str)
+
+
+def sse(event: Dict[str, Any]) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {event['type']}\ndata: {encode(event)}\n\n"
@@ -0,0 +1,344 @@
+"""Bounded per-session chat history: LRU + idle-TTL eviction under a byte budget,
+and a token-budgeted prompt window with a rolling summary of older turns"""
+
+import asyncio
+import functools
+import logging
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("user", "assistant", "system")
+_MESSAGE_TYPES = (HumanMessage, AIMessage, SystemMessage)
+_ROLE_OF = {"human": 0, "ai": 1, "system": 2}
+
+# role (1) + offset (8) + length (4) + tokens (4) + timestamp (8) per entry
+_ENTRY_BYTES = 25
+
+# (summary so far, messages to fold in) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], Awaitable[str]]
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    # the first call may download the BPE file: warm it off the loop at startup
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:     # not installed, or the BPE file cannot be fetched
+        logger.warning(f"tiktoken unavailable ({e}); chat token budgets are "
+                       f"estimated at ~4 characters per token")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens for ``text``: cl100k_base when tiktoken is installed
+    (close enough for Llama-family budgets), otherwise a 4-chars estimate."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+async def warm_tokenizer() -> None:
+    """Load the tiktoken encoding in a worker thread, so no request pays for it."""
+    await asyncio.to_thread(_encoding)
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def message_bytes(message: BaseMessage) -> int:
+    return len(_text(message).encode("utf-8")) + _ENTRY_BYTES
+
+
+class ConversationLog:
+    """Append-only message log: every message's UTF-8 text goes into one
+    buffer, with parallel arrays of role, offset, length, token count and
+    timestamp.
+
+    Each message is stored once, as plain bytes; LangChain message objects
+    are only built when the agent asks for the history. Token counts are
+    computed once, on append.
+    """
+
+    __slots__ = ("text", "roles", "offsets", "lengths", "tokens", "times")
+
+    def __init__(self):
+        self.text = bytearray()
+        self.roles = array("B")
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.tokens = array("I")
+        self.times = array("d")
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.text) + len(self.roles) * _ENTRY_BYTES
+
+    def append(self, role: int, content: str, at: Optional[float] = None) -> int:
+        data = content.encode("utf-8")
+        self.roles.append(role)
+        self.offsets.append(len(self.text))
+        self.lengths.append(len(data))
+        self.tokens.append(count_tokens(content))
+        self.times.append(time.time() if at is None else at)
+        self.text += data
+        return len(data) + _ENTRY_BYTES
+
+    def content(self, i: int) -> str:
+        start = self.offsets[i]
+        return self.text[start:start + self.lengths[i]].decode("utf-8")
+
+    def entries(self) -> Iterator[Tuple[str, str, datetime]]:
+        """(role, content, timestamp) in order; role is one of ``ROLES``."""
+        for i in range(len(self.roles)):
+            yield ROLES[self.roles[i]], self.content(i), datetime.fromtimestamp(self.times[i])
+
+    def messages(self, start: int = 0, stop: Optional[int] = None) -> List[BaseMessage]:
+        return [_MESSAGE_TYPES[self.roles[i]](content=self.content(i))
+                for i in range(*slice(start, stop).indices(len(self.roles)))]
+
+
+class _Session:
+    __slots__ = ("log", "bytes", "last_used", "summary", "summarized", "summary_tokens")
+
+    def __init__(self):
+        self.log = ConversationLog()
+        self.bytes = 0
+        self.last_used = time.monotonic()
+        self.summary = ""          # rolling summary of log entries [0, summarized)
+        self.summarized = 0
+        self.summary_tokens = 0
+
+
+class ChatMemory:
+    """Conversation history per session, bounded three ways.
+
+    Sessions sit in an OrderedDict in least-recently-used order. Adding to
+    one moves it to the end and then evicts from the front while there are
+    more than ``max_sessions`` or the estimated total passes ``max_bytes``
+    (the session being written is never evicted by its own write). A reaper
+    task drops sessions idle for longer than ``ttl`` seconds.
+
+    The agent sees ``get_context``: the last ``window_turns`` turns verbatim
+    plus a rolling summary of everything before them, cut to
+    ``token_budget`` tokens, so the prompt stays flat however long the
+    conversation runs. The summary is brought up to date after each turn
+    by a background task (``schedule_summary``). Turns it does not cover yet
+    (it lags a turn, or failed) stay in the verbatim part while they fit the
+    budget; past that the oldest are left out until the summary catches up,
+    counted in ``summaries["truncated"]``.
+    """
+
+    def __init__(self, max_sessions: int = settings.chat_max_sessions,
+                 max_bytes: int = settings.chat_memory_budget,
+                 ttl: float = settings.chat_session_ttl,
+                 window_turns: int = settings.chat_window_turns,
+                 token_budget: int = settings.chat_history_token_budget,
+                 summary_tokens: int = settings.chat_summary_max_tokens,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.window_turns = window_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_tokens
+        self.clock = clock
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = {"lru": 0, "bytes": 0, "ttl": 0, "cleared": 0}
+        self.summaries = {"runs": 0, "failed": 0, "truncated": 0}
+        self._task: Optional[asyncio.Task] = None
+        self._summarizing: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _touch(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_used = self.clock()
+        return session
+
+    def _grow(self, session: _Session, n: int) -> None:
+        session.bytes += n
+        self.total_bytes += n
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        session = self._sessions.pop(session_id)
+        self.total_bytes -= session.bytes
+        self.evictions[reason] += 1
+
+    def _enforce(self, keep: str) -> None:
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                           or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._drop(oldest, "lru" if len(self._sessions) > self.max_sessions else "bytes")
+
+    def add_message(self, session_id: str, message: BaseMessage):
+        """Add a message to the conversation history"""
+        session = self._touch(session_id)
+        self._grow(session, session.log.append(_ROLE_OF.get(message.type, 2), _text(message)))
+        self._enforce(keep=session_id)
+
+    def get_history(self, session_id: str) -> List[BaseMessage]:
+        """Get conversation history for a session, as LangChain messages"""
+        session = self._sessions.get(session_id)
+        return session.log.messages() if session else []
+
+    def get_entries(self, session_id: str) -> List[Tuple[str, str, datetime]]:
+        """Get (role, content, timestamp) of every message in a session"""
+        session = self._sessions.get(session_id)
+        return list(session.log.entries()) if session else []
+
+    def clear_history(self, session_id: str):
+        """Clear conversation history for a session"""
+        if session_id in self._sessions:
+            self._drop(session_id, "cleared")
+
+    # --- prompt window + rolling summary --------------------------------------
+    def get_context(self, session_id: str) -> List[BaseMessage]:
+        """History to send with the next message: summary of older turns as a
+        system message, then the most recent messages that fit the budget."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []
+        log = session.log
+        start = session.summarized       # turns not yet in the summary stay verbatim
+        budget, summary = self.token_budget, session.summary
+        if summary:                                   # at most half the budget
+            cap = budget // 2
+            if session.summary_tokens > cap:
+                summary = _truncate_tokens(summary, cap)
+            budget -= min(session.summary_tokens, cap)
+        # newest first until the budget is spent
+        first = len(log)
+        while first > start and log.tokens[first - 1] <= budget:
+            budget -= log.tokens[first - 1]
+            first -= 1
+        if first > start:                 # unsummarised turns did not fit
+            self.summaries["truncated"] += 1
+        context = log.messages(first)
+        if summary:
+            context.insert(0, SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+        return context
+
+    def _pending(self, session: _Session) -> Tuple[int, int]:
+        """Log range that has left the window but is not yet summarised."""
+        return session.summarized, max(session.summarized, len(session.log) - 2 * self.window_turns)
+
+    async def update_summary(self, session_id: str, summarize: Summarizer) -> bool:
+        """Fold the turns that left the window into the session's summary."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        start, stop = self._pending(session)
+        if stop <= start:
+            return False
+        summary = await summarize(session.summary, session.log.messages(start, stop))
+        summary = _truncate_tokens(summary.strip(), self.summary_max_tokens)
+        if self._sessions.get(session_id) is not session or session.summarized != start:
+            return False                                   # cleared or evicted meanwhile
+        grown = len(summary.encode("utf-8")) - len(session.summary.encode("utf-8"))
+        session.summary, session.summarized = summary, stop
+        session.summary_tokens = count_tokens(summary)
+        self._grow(session, grown)
+        self._enforce(keep=session_id)
+        self.summaries["runs"] += 1
+        return True
+
+    def schedule_summary(self, session_id: str, summarize: Summarizer) -> Optional[asyncio.Task]:
+        """Run ``update_summary`` in the background unless nothing is due or
+        one is already running for the session."""
+        session = self._sessions.get(session_id)
+        if session is None or session_id in self._summarizing:
+            return None
+        start, stop = self._pending(session)
+        if stop <= start:
+            return None
+
+        async def run():
+            try:
+                await self.update_summary(session_id, summarize)
+            except Exception as e:
+                self.summaries["failed"] += 1
+                logger.error(f"Chat summary for session {session_id} failed: {e}")
+            finally:
+                self._summarizing.pop(session_id, None)
+
+        task = self._summarizing[session_id] = asyncio.create_task(run())
+        return task
+
+    # --- idle reaping ---------------------------------------------------------
+    def reap(self) -> int:
+        """Drop sessions idle for longer than ``ttl``; returns how many."""
+        cutoff = self.clock() - self.ttl
+        idle = []
+        for session_id, session in self._sessions.items():     # LRU order: oldest first
+            if session.last_used > cutoff:
+                break
+            idle.append(session_id)
+        for session_id in idle:
+            self._drop(session_id, "ttl")
+        return len(idle)
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.chat_reaper_interval)
+            try:
+                n = self.reap()
+                if n:
+                    logger.info(f"Chat memory: {n} idle sessions evicted")
+            except Exception as e:
+                logger.error(f"Chat memory reaper failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reap_loop())
+
+    async def stop(self) -> None:
+        for task in list(self._summarizing.values()):
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        largest = max((s.bytes for s in self._sessions.values()), default=0)
+        return {"sessions": len(self._sessions), "bytes": self.total_bytes,
+                "max_sessions": self.max_sessions, "max_bytes": self.max_bytes,
+                "ttl": self.ttl, "largest_session_bytes": largest,
+                "evictions": dict(self.evictions),
+                "tokenizer": "cl100k_base" if _encoding() is not None else "estimate",
+                "summaries": {**self.summaries, "running": len(self._summarizing)}}
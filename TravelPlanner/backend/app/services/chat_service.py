@@ -1,9 +1,14 @@
 import uuid
-from typing import Dict, Any, Optional, List
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Any, Optional, List
 from datetime import datetime
 from langchain.schema import HumanMessage, AIMessage
-from app.services.langchain_agent import chat_memory, get_agent
+from app.services.langchain_agent import chat_memory, run_agent, summarize_history
 from app.schemas.chat import ChatMessage, ChatResponse
+from app.services.chat_events import ChatEventStream, run_with_events
+from app.services.semantic_cache import semantic_cache
+from app.services.tool_memo import tool_memo
+from app.core.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,42 +16,50 @@ logger = logging.getLogger(__name__)
 class ChatService:
     """Service for handling chat interactions with the LangChain agent"""
     
-    def __init__(self):
-        self.default_agent = get_agent()
-    
     async def process_message(
         self, 
         message: str, 
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        events: Optional[ChatEventStream] = None
     ) -> ChatResponse:
-        """Process a user message and return the agent's response"""
+        """Process a user message and return the agent's response.
+
+        ``events`` receives the run's tokens and tool calls as they happen.
+        """
         
         # Generate session ID if not provided
         if not session_id:
             session_id = str(uuid.uuid4())
         
+        tool_stats = tool_memo.begin_turn(session_id)
+        logged = False
+        
         try:
-            # Create human message
-            human_msg = HumanMessage(content=message)
+            # Earlier turns (recent window + summary); the message itself is
+            # logged together with its reply, so a cancelled run leaves no trace
+            history = chat_memory.get_context(session_id)
             
-            # Add to memory
-            chat_memory.add_message(session_id, human_msg)
+            # A new conversation's question may already have been answered for
+            # someone else; follow-ups depend on their history and are never cached
+            cacheable = settings.semantic_cache_enabled and not history
+            cached = await semantic_cache.lookup(message) if cacheable else None
             
-            # Get conversation history for context
-            history = chat_memory.get_history(session_id)
-            
-            # Process with agent
-            logger.info(f"Processing message for session {session_id}: {message[:100]}...")
-            
-            # Get or create session-specific agent
-            agent = chat_memory.get_or_create_agent(session_id)
-            
-            # Run the agent with the message
-            result = await agent.arun(message)
-            logger.info(f"Agent result:{result!r}")
-            # Create AI message
-            ai_msg = AIMessage(content=result)
-            chat_memory.add_message(session_id, ai_msg)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for session {session_id} "
+                            f"(similarity {cached.similarity})")
+                if events is not None:
+                    events.emit("cached", similarity=cached.similarity)
+                result = cached.reply
+            else:
+                # Process with the shared agent
+                logger.info(f"Processing message for session {session_id}: {message[:100]}...")
+                result = await run_agent(message, history, callbacks=[events] if events else None)
+                logger.info(f"Agent result:{result!r}")
+            # Add the turn to memory
+            chat_memory.add_message(session_id, HumanMessage(content=message))
+            chat_memory.add_message(session_id, AIMessage(content=result))
+            logged = True
+            chat_memory.schedule_summary(session_id, summarize_history)
             
             # Extract tool usage information if available
             tools_used = []
@@ -56,7 +69,13 @@ class ChatService:
             # Try to extract information from the agent's execution
             # This is a simplified approach - in a real implementation,
             # you might want to capture tool execution details more precisely
-            if "hotel" in message.lower() or "hotel" in result.lower():
+            if cached is not None:
+                tools_used = list(cached.tools_used or [])
+                hotel_data = cached.hotel_data or []
+            elif events is not None:
+                tools_used = list(events.tools_used)
+                hotel_data = events.hotel_data
+            elif "hotel" in message.lower() or "hotel" in result.lower():
                 tools_used.append("hotel_search")
             
             # Create response
@@ -66,14 +85,20 @@ class ChatService:
                 tools_used=tools_used if tools_used else None,
                 hotel_data=hotel_data,
                 selected_hotel=selected_hotel,
+                telemetry={"tool_cache": tool_stats, "semantic_cache_hit": cached is not None},
                 timestamp=datetime.now()
             )
             
+            if cacheable and cached is None:
+                semantic_cache.schedule_store(message, result, tools_used, hotel_data)
+            
             logger.info(f"Successfully processed message for session {session_id}")
             return response
             
         except Exception as e:
             logger.error(f"Error processing message for session {session_id}: {str(e)}")
+            if not logged:
+                chat_memory.add_message(session_id, HumanMessage(content=message))
             # Return error response
             return ChatResponse(
                 reply=f"I apologize, but I encountered an error while processing your request: {str(e)}",
@@ -81,25 +106,32 @@ class ChatService:
                 timestamp=datetime.now()
             )
     
+    async def stream_message(
+        self,
+        message: str,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """``process_message`` as events: "session" first, then tokens and tool
+        calls, then "final" with the same payload as the POST reply."""
+        if not session_id:
+            session_id = str(uuid.uuid4())
+        yield {"type": "session", "session_id": session_id}
+
+        async def run(events: ChatEventStream) -> Dict[str, Any]:
+            response = await self.process_message(message, session_id, events=events)
+            return response.model_dump(mode="json")
+
+        async with aclosing(run_with_events(run)) as events:
+            async for event in events:
+                yield event
+
     def get_chat_history(self, session_id: str) -> List[ChatMessage]:
         """Get chat history for a session"""
         try:
-            history = chat_memory.get_history(session_id)
-            messages = []
-            
-            for msg in history:
-                if isinstance(msg, HumanMessage):
-                    messages.append(ChatMessage(
-                        role="user",
-                        content=msg.content,
-                        timestamp=datetime.now()
-                    ))
-                elif isinstance(msg, AIMessage):
-                    messages.append(ChatMessage(
-                        role="assistant",
-                        content=msg.content,
-                        timestamp=datetime.now()
-                    ))
+            messages = [
+                ChatMessage(role=role, content=content, timestamp=at)
+                for role, content, at in chat_memory.get_entries(session_id)
+            ]
             
             return messages
         except Exception as e:
@@ -110,6 +142,7 @@ class ChatService:
         """Clear chat history for a session"""
         try:
             chat_memory.clear_history(session_id)
+            tool_memo.clear(session_id)
             logger.info(f"Cleared chat history for session {session_id}")
             return True
         except Exception as e:
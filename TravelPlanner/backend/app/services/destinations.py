@@ -0,0 +1,279 @@
+"""Local Hotelbeds destination-code resolver (prefix trie with aliases)"""
+
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.settings import settings
+from app.services.name_index import TrigramIndex, normalise
+
+logger = logging.getLogger(__name__)
+
+# Common names the content API does not carry (English exonyms, nicknames,
+# airport-style codes that differ from the destination code).
+ALIASES: Dict[str, str] = {
+    "barna": "BCN", "lisbon": "LIS", "lisboa": "LIS", "rome": "ROE", "roma": "ROE",
+    "florence": "FLR", "firenze": "FLR", "venice": "VCE", "venezia": "VCE",
+    "milan": "MIL", "milano": "MIL", "naples": "NAP", "napoli": "NAP",
+    "munich": "MUC", "munchen": "MUC", "cologne": "CGN", "koln": "CGN",
+    "vienna": "VIE", "wien": "VIE", "prague": "PRG", "praha": "PRG",
+    "copenhagen": "CPH", "kobenhavn": "CPH", "athens": "ATH", "athina": "ATH",
+    "new york city": "NYC", "nyc": "NYC", "big apple": "NYC",
+    "mallorca": "PMI", "majorca": "PMI", "palma de mallorca": "PMI",
+    "the hague": "HAG", "den haag": "HAG", "seville": "SVQ", "sevilla": "SVQ",
+}
+
+
+class PrefixTrie:
+    """Array-packed trie: keys kept sorted, so every prefix's subtree is one
+    contiguous slice found with two binary searches. Far smaller than a
+    node-per-character trie and rebuilt wholesale when content changes."""
+
+    __slots__ = ("keys", "values")
+
+    def __init__(self, items: Iterable[Tuple[str, Any]]):
+        pairs = sorted(items)
+        self.keys: List[str] = [k for k, _ in pairs]
+        self.values: List[Any] = [v for _, v in pairs]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def exact(self, key: str) -> List[Any]:
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key)
+        return self.values[lo:hi]
+
+    def span(self, prefix: str) -> Tuple[int, int]:
+        """``[lo, hi)`` positions of every key starting with ``prefix``."""
+        return (bisect.bisect_left(self.keys, prefix),
+                bisect.bisect_left(self.keys, prefix + "\uffff"))
+
+    def prefix(self, prefix: str, limit: int = 50) -> List[Tuple[str, Any]]:
+        lo, hi = self.span(prefix)
+        hi = min(hi, lo + limit)
+        return list(zip(self.keys[lo:hi], self.values[lo:hi]))
+
+
+@dataclass
+class Resolution:
+    code: Optional[str]
+    method: str          # code / exact / alias / prefix / fuzzy / ambiguous / unknown
+    name: Optional[str] = None
+    country: Optional[str] = None
+    zone: Optional[str] = None
+    suggestions: List[Dict[str, str]] = field(default_factory=list)
+
+
+class DestinationResolver:
+    """Free text -> Hotelbeds destination code, entirely in memory.
+
+    Keys are normalised destination names, zone names and ``ALIASES``;
+    lookups try, in order: a literal code, an exact key, a unique prefix
+    and finally a trigram match for misspellings.
+    """
+
+    def __init__(self):
+        self._set([])
+        self.loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"resolved": 0, "unknown": 0, "fuzzy": 0}
+
+    def _set(self, destinations: List[dict]) -> None:
+        info: Dict[str, Dict[str, str]] = {}
+        entries: List[Tuple[str, Tuple[str, Optional[str]]]] = []
+        for d in destinations:
+            code = d.get("code")
+            name = _content(d.get("name"))
+            if not code:
+                continue
+            info[code] = {"code": code, "name": name or code, "country": d.get("countryCode")}
+            if name:
+                entries.append((normalise(name), (code, None)))
+            for z in d.get("zones") or ():
+                zone_name = _content(z.get("name"))
+                if zone_name:
+                    entries.append((normalise(zone_name), (code, zone_name)))
+        for alias, code in ALIASES.items():
+            if code in info or not info:
+                entries.append((alias, (code, None)))
+        self.info = info
+        self.trie = PrefixTrie(e for e in entries if e[0])
+        fuzzy = TrigramIndex()
+        for key, (code, zone) in dict.fromkeys(zip(self.trie.keys, self.trie.values)):
+            fuzzy.add(key, {"code": code, "zone": zone})
+        self.fuzzy = fuzzy.freeze()
+
+    def load(self, destinations: List[dict]) -> int:
+        self._set(destinations)
+        self.loaded_at = time.time()
+        return len(self.info)
+
+    def __len__(self) -> int:
+        return len(self.info)
+
+    # --- resolution -----------------------------------------------------------
+    def _pick(self, hits: List[Tuple[str, Optional[str]]], method: str) -> Optional[Resolution]:
+        codes = list(dict.fromkeys(code for code, _ in hits))
+        if len(codes) != 1:
+            return None
+        zones = {z for _, z in hits}
+        zone = zones.pop() if len(zones) == 1 else None
+        meta = self.info.get(codes[0], {})
+        return Resolution(codes[0], method, meta.get("name"), meta.get("country"), zone)
+
+    def _suggest(self, codes: Iterable[str]) -> List[Dict[str, str]]:
+        return [self.info.get(c, {"code": c}) for c in dict.fromkeys(codes)][:5]
+
+    def _resolve_text(self, text: str, fuzzy: bool = True) -> Resolution:
+        raw = text.strip()
+        if not self.info and len(raw) == 3 and raw.isalpha():    # nothing loaded yet
+            return Resolution(raw.upper(), "code")
+        if raw.upper() in self.info and len(raw) <= 4:
+            meta = self.info[raw.upper()]
+            return Resolution(raw.upper(), "code", meta["name"], meta["country"])
+        key = normalise(raw)
+        if not key:
+            return Resolution(None, "unknown")
+        hits = self.trie.exact(key)
+        if hits:
+            method = "alias" if key in ALIASES else "exact"
+            picked = self._pick(hits, method)
+            if picked:
+                return picked
+            return Resolution(None, "ambiguous", suggestions=self._suggest(c for c, _ in hits))
+        if len(key) >= 3:
+            lo, hi = self.trie.span(key)                   # unique over the whole subtree
+            if hi > lo:
+                picked = self._pick(self.trie.values[lo:hi], "prefix")
+                if picked:
+                    return picked
+        matches = self.fuzzy.search(key, k=5, min_score=0.35) if fuzzy else []
+        if matches:
+            best_score, best = matches[0]
+            runner_up = next((s for s, e in matches[1:]
+                              if self.fuzzy.payloads[e]["code"] != self.fuzzy.payloads[best]["code"]), 0)
+            payload = self.fuzzy.payloads[best]
+            if best_score >= 0.45 and best_score - runner_up >= 0.1:
+                meta = self.info.get(payload["code"], {})
+                return Resolution(payload["code"], "fuzzy", meta.get("name"), meta.get("country"),
+                                  payload["zone"])
+            return Resolution(None, "unknown", suggestions=self._suggest(
+                self.fuzzy.payloads[e]["code"] for _, e in matches))
+        return Resolution(None, "unknown")
+
+    def resolve(self, text: str) -> Resolution:
+        """Best destination for ``text``; "Barcelona, Spain" falls back to its
+        first part when the whole string does not resolve."""
+        result = self._resolve_text(text, fuzzy="," not in text)
+        if result.code is None and "," in text:
+            result = self._resolve_text(text.split(",", 1)[0])
+            if result.code is None:
+                result = self._resolve_text(text)
+        self.counters["resolved" if result.code else "unknown"] += 1
+        if result.method == "fuzzy":
+            self.counters["fuzzy"] += 1
+        return result
+
+    def mentioned(self, text: str, max_words: int = 4) -> List[Tuple[Optional[str], str]]:
+        """``(code, phrase)`` for every destination named inside free text
+        ("cheap hotels in barcelona next weekend"), longest phrases first and
+        never overlapping; ``code`` is None for a phrase that names several
+        destinations. Exact keys only, so a sentence never matches on a typo."""
+        words = normalise(text).split()
+        taken = [False] * len(words)
+        found: List[Tuple[int, Optional[str], str]] = []
+        for n in range(min(max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                if any(taken[i:i + n]):
+                    continue
+                phrase = " ".join(words[i:i + n])
+                if len(phrase) < 3:
+                    continue
+                codes = {code for code, _ in self.trie.exact(phrase)}
+                if codes:
+                    found.append((i, codes.pop() if len(codes) == 1 else None, phrase))
+                    taken[i:i + n] = [True] * n
+        return [(code, phrase) for _, code, phrase in sorted(found)]
+
+    # --- persistence ----------------------------------------------------------
+    def read_file(self, path: str) -> Optional[List[dict]]:
+        try:
+            with gzip.open(path, "rt") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Destinations file {path} not loaded: {e}")
+            return None
+
+    def write_file(self, path: str, destinations: List[dict]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt") as f:
+            json.dump(destinations, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    async def refresh(self) -> None:
+        """Load the saved dictionary; fetch from Hotelbeds when it is missing
+        or older than destinations_max_age (Celery normally keeps it fresh)."""
+        path = settings.destinations_path
+        destinations = await asyncio.to_thread(self.read_file, path)
+        fresh = (destinations is not None and
+                 time.time() - os.path.getmtime(path) < settings.destinations_max_age)
+        if destinations:
+            self.load(destinations)
+        if fresh:
+            return
+        from app.services import hotel_ops
+        destinations = await hotel_ops.fetch_destinations()
+        if destinations:
+            self.load(destinations)
+            try:
+                await asyncio.to_thread(self.write_file, path, destinations)
+            except OSError as e:
+                logger.warning(f"Destinations file {path} not written: {e}")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                logger.info(f"Destination resolver loaded: {len(self)} destinations")
+            except Exception as e:
+                logger.error(f"Destination resolver refresh failed: {e}")
+            await asyncio.sleep(settings.destinations_refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"destinations": len(self), "keys": len(self.trie),
+                "loaded_at": self.loaded_at, **self.counters}
+
+
+def _content(value) -> Optional[str]:
+    return value.get("content") if isinstance(value, dict) else value
+
+
+destination_resolver = DestinationResolver()
+
+
+def resolve_destination(text: str) -> Resolution:
+    """Hotelbeds destination for free text ("Barcelona", "barcleona", "BCN")."""
+    return destination_resolver.resolve(text)
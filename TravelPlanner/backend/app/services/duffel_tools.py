@@ -3,12 +3,14 @@ from __future__ import annotations
 
 import os
 import sys
-import requests
+import httpx
 import urllib.parse as _urlparse
 from typing import Dict, List, Optional
 
 from langchain_core.tools import tool
 
+from app.services.http_clients import registry
+
 ###############################################################################
 # Configuration
 ###############################################################################
@@ -18,7 +20,6 @@ if not DUFFEL_API_KEY:
     sys.stderr.write("[ERROR] DUFFEL_API_KEY environment variable not set.\n")
     sys.exit(1)
 
-BASE_URL: str = "https://api.duffel.com"
 HEADERS: Dict[str, str] = {
     "Authorization": f"Bearer {DUFFEL_API_KEY}",
     "Duffel-Version": "v2",  # use Duffel API v2 for all requests
@@ -37,7 +38,7 @@ def _duffel_request(
     json_data: Optional[dict] = None,
     timeout: int = 30,
 ) -> Dict:
-    """Thin wrapper around ``requests`` that standardises error handling.
+    """Thin wrapper around the pooled Duffel client that standardises error handling.
 
     Args:
         method: HTTP verb ("GET", "POST", ...).
@@ -53,17 +54,19 @@ def _duffel_request(
         On HTTP error   – ``{"error": "API Request Failed", "details": <body>}``
                           so the LLM agent can inspect codes/messages.
     """
-    url: str = f"{BASE_URL}{endpoint}"
+    # The registry keeps one keep-alive pool for Duffel (base URL set there),
+    # so only the first call pays for the TLS handshake.
+    client = registry.get("duffel")
 
     try:
-        resp = requests.request(method, url, headers=HEADERS, json=json_data, timeout=timeout)
+        resp = client.request(method, endpoint, headers=HEADERS, json=json_data, timeout=timeout)
         resp.raise_for_status()
         body = resp.json()
         # Almost every Duffel endpoint responds with a {"data": ...} wrapper; if
         # it's not present just return the body untouched.
         return body.get("data", body)
 
-    except requests.exceptions.HTTPError as exc:
+    except httpx.HTTPStatusError as exc:
         err_body: Dict = {}
         try:
             err_body = exc.response.json()
@@ -0,0 +1,314 @@
+"""In-memory proximity index over the HOTELS table (radius and k-nearest)"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances from one point to arrays of points, in km."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """Fixed-size lat/lon grid over points sorted by cell.
+
+    Points live in arrays ordered by cell id, so a cell is a contiguous slice
+    found by binary search. Queries visit only the cells overlapping the
+    search circle's bounding box and compute exact haversine distances for
+    the points in them, vectorised.
+
+    Upserts and removals are cheap: changed ids are tombstoned in the sorted
+    part and new positions go to a small unsorted delta that every query
+    scans; the delta is merged (one re-sort) once it grows past
+    ``merge_at`` points.
+    """
+
+    def __init__(self, cell_deg: float = 0.05, merge_at: int = 4096):
+        self.cell_deg = cell_deg
+        self.merge_at = merge_at
+        self._cols = int(round(360 / cell_deg))
+        self._empty()
+        self._delta: Dict[Any, Tuple[float, float]] = {}
+        self.stats = {"queries": 0, "cells_visited": 0, "distances": 0, "merges": 0}
+
+    def _empty(self) -> None:
+        self._ids = np.empty(0, dtype=object)
+        self._lats = np.empty(0)
+        self._lons = np.empty(0)
+        self._cells = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._pos: Dict[Any, int] = {}
+
+    # --- grid ---------------------------------------------------------------
+    def _row(self, lat):
+        return np.floor((np.asarray(lat) + 90.0) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) + 180.0) / self.cell_deg).astype(np.int64) % self._cols
+
+    def _cell_ids(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        return self._row(lats) * self._cols + self._col(lons)
+
+    # --- updates ------------------------------------------------------------
+    def __len__(self) -> int:
+        return int(self._alive.sum()) + len(self._delta)
+
+    def upsert(self, points: Iterable[Tuple[Any, float, float]]) -> int:
+        """Add or move ``(id, lat, lon)`` points; returns how many were applied."""
+        n = 0
+        for pid, lat, lon in points:
+            if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                continue
+            pos = self._pos.pop(pid, None)
+            if pos is not None:
+                self._alive[pos] = False
+            self._delta[pid] = (float(lat), float(lon))
+            n += 1
+        if len(self._delta) >= self.merge_at:
+            self.merge()
+        return n
+
+    def remove(self, ids: Iterable[Any]) -> None:
+        for pid in ids:
+            pos = self._pos.pop(pid, None)
+            if pos is not None:
+                self._alive[pos] = False
+            self._delta.pop(pid, None)
+
+    def merge(self) -> None:
+        """Fold the delta into the sorted arrays and drop tombstones."""
+        alive = self._alive
+        ids = np.concatenate([self._ids[alive], np.array(list(self._delta), dtype=object)])
+        coords = np.array(list(self._delta.values()), dtype=np.float64).reshape(-1, 2)
+        lats = np.concatenate([self._lats[alive], coords[:, 0]])
+        lons = np.concatenate([self._lons[alive], coords[:, 1]])
+        cells = self._cell_ids(lats, lons)
+        order = np.argsort(cells, kind="stable")
+        self._ids, self._lats, self._lons = ids[order], lats[order], lons[order]
+        self._cells = cells[order]
+        self._alive = np.ones(len(order), dtype=bool)
+        self._pos = {pid: i for i, pid in enumerate(self._ids.tolist())}
+        self._delta = {}
+        self.stats["merges"] += 1
+
+    # --- queries ------------------------------------------------------------
+    def _candidates(self, lat: float, lon: float, km: float) -> np.ndarray:
+        """Sorted-array positions in the cells overlapping the circle's bbox."""
+        dlat = km / _KM_PER_DEG_LAT
+        lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        coslat = min(math.cos(math.radians(lat_lo)), math.cos(math.radians(lat_hi)))
+        full_width = coslat <= 1e-9 or km / (_KM_PER_DEG_LAT * coslat) >= 180
+        rows = np.arange(self._row(lat_lo), self._row(lat_hi) + 1)
+        if full_width:
+            cols = np.arange(self._cols)
+        else:
+            dlon = km / (_KM_PER_DEG_LAT * coslat)
+            first, last = self._col(lon - dlon), self._col(lon + dlon)
+            span = (last - first) % self._cols
+            cols = (first + np.arange(span + 1)) % self._cols
+        if len(rows) * len(cols) > 4 * len(self._cells) + 64:  # huge radius: scan all
+            self.stats["cells_visited"] += len(self._cells)
+            return np.flatnonzero(self._alive)
+        # one binary search per cell; cells are contiguous runs of positions
+        wanted = (rows[:, None] * self._cols + np.sort(cols)[None, :]).ravel()
+        self.stats["cells_visited"] += len(wanted)
+        lo = np.searchsorted(self._cells, wanted, side="left")
+        hi = np.searchsorted(self._cells, wanted, side="right")
+        has = hi > lo
+        if not has.any():
+            return np.empty(0, dtype=np.int64)
+        pos = np.concatenate([np.arange(a, b) for a, b in zip(lo[has], hi[has])])
+        return pos[self._alive[pos]]
+
+    def _within(self, lat: float, lon: float, km: float) -> Tuple[np.ndarray, np.ndarray]:
+        pos = self._candidates(lat, lon, km)
+        ids = self._ids[pos]
+        dist = haversine_km(lat, lon, self._lats[pos], self._lons[pos])
+        if self._delta:
+            coords = np.array(list(self._delta.values()))
+            ids = np.concatenate([ids, np.array(list(self._delta), dtype=object)])
+            dist = np.concatenate([dist, haversine_km(lat, lon, coords[:, 0], coords[:, 1])])
+        self.stats["distances"] += len(dist)
+        keep = dist <= km
+        return ids[keep], dist[keep]
+
+    def radius(self, lat: float, lon: float, km: float,
+               limit: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """``(id, km)`` of points within ``km`` of (lat, lon), nearest first."""
+        self.stats["queries"] += 1
+        ids, dist = self._within(lat, lon, km)
+        order = np.argsort(dist, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [(ids[i], float(dist[i])) for i in order]
+
+    def nearest(self, lat: float, lon: float, k: int,
+                max_km: Optional[float] = None) -> List[Tuple[Any, float]]:
+        """The ``k`` nearest points, optionally no further than ``max_km``.
+
+        Searches a growing radius: once a circle holds ``k`` points, nothing
+        outside it can be closer.
+        """
+        self.stats["queries"] += 1
+        if k <= 0 or len(self) == 0:
+            return []
+        limit_km = max_km if max_km is not None else math.pi * EARTH_RADIUS_KM
+        km = min(limit_km, 0.5)
+        while True:
+            ids, dist = self._within(lat, lon, km)
+            if len(ids) >= k or km >= limit_km:
+                order = np.argsort(dist, kind="stable")[:k]
+                return [(ids[i], float(dist[i])) for i in order]
+            km = min(limit_km, km * 3)
+
+
+# --- HOTELS-backed index -----------------------------------------------------
+# Built from the HOTELS table at startup and kept current by a background
+# task: every refresh_interval only rows with a HOTEL_ID above the highest one
+# seen are fetched (HOTELS has no modification timestamp); a full reload every
+# full_refresh_interval picks up moved or deleted hotels.
+HOTEL_COLUMNS = ("HOTEL_ID", "HOTEL_NAME", "STARS", "RATING", "LATITUDE", "LONGITUDE",
+                 "CITY_CODE", "COUNTRY_CODE", "HOTEL_TYPE")
+
+Fetch = Callable[[int, int], List[Dict[str, Any]]]      # (after_id, limit) -> rows
+
+
+def _fetch_from_snowflake(after_id: int, limit: int) -> List[Dict[str, Any]]:
+    from app.services.snowflake_db import snowflake_db     # connects on import
+    return snowflake_db.list_hotels_with_location(after_id, limit)
+
+
+class HotelGeo:
+    def __init__(self, fetch: Fetch = _fetch_from_snowflake,
+                 cell_deg: float = settings.hotel_geo_cell_deg, batch: int = 50_000):
+        self.fetch = fetch
+        self.cell_deg = cell_deg
+        self.batch = batch
+        self.index = GeoIndex(cell_deg)
+        self.hotels: Dict[int, Dict[str, Any]] = {}
+        self.max_id = 0
+        self.loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ingest(self, index: GeoIndex, hotels: Dict[int, dict], rows: List[dict]) -> None:
+        index.upsert((r["HOTEL_ID"], r["LATITUDE"], r["LONGITUDE"]) for r in rows)
+        for r in rows:
+            hotels[r["HOTEL_ID"]] = {c: r.get(c) for c in HOTEL_COLUMNS}
+
+    def _pull(self, after_id: int):
+        while True:
+            rows = self.fetch(after_id, self.batch)
+            if not rows:
+                return
+            yield rows
+            after_id = max(r["HOTEL_ID"] for r in rows)
+            if len(rows) < self.batch:
+                return
+
+    def _apply(self, batches: List[List[dict]]) -> int:
+        added = 0
+        for rows in batches:
+            self._ingest(self.index, self.hotels, rows)
+            self.max_id = max(self.max_id, max(r["HOTEL_ID"] for r in rows))
+            added += len(rows)
+        return added
+
+    def refresh(self) -> int:
+        """Fetch hotels added since the last load; returns how many."""
+        return self._apply(list(self._pull(self.max_id)))
+
+    def _build(self) -> Tuple[GeoIndex, Dict[int, Dict[str, Any]], int]:
+        """A fresh index, hotels and max id from a full pull (safe off the loop)."""
+        index, hotels, max_id = GeoIndex(self.cell_deg), {}, 0
+        for rows in self._pull(0):
+            self._ingest(index, hotels, rows)
+            max_id = max(max_id, max(r["HOTEL_ID"] for r in rows))
+        index.merge()
+        return index, hotels, max_id
+
+    def _swap(self, built: Tuple[GeoIndex, Dict[int, Dict[str, Any]], int]) -> int:
+        self.index, self.hotels, self.max_id = built
+        self.loaded_at = time.time()
+        return len(self.hotels)
+
+    def reload(self) -> int:
+        """Rebuild from scratch, then swap in (queries never see a half index)."""
+        return self._swap(self._build())
+
+    def _rows(self, hits: List[Tuple[Any, float]]) -> List[Dict[str, Any]]:
+        return [{**self.hotels[pid], "DISTANCE_KM": round(km, 3)} for pid, km in hits]
+
+    def within(self, lat: float, lon: float, radius_km: float,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._rows(self.index.radius(lat, lon, radius_km, limit))
+
+    def nearest(self, lat: float, lon: float, k: int = 10,
+                max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        return self._rows(self.index.nearest(lat, lon, k, max_km))
+
+    # --- background refresh ---------------------------------------------------
+    async def _refresh_loop(self) -> None:
+        last_full = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_full >= settings.hotel_geo_full_refresh_interval:
+                    # build off the loop, swap on it so queries never pair
+                    # the new index with the old hotels
+                    n = self._swap(await asyncio.to_thread(self._build))
+                    last_full = time.monotonic()
+                    logger.info(f"Hotel geo index loaded: {n} hotels")
+                else:
+                    # fetch off the loop, apply on it for the same reason
+                    batches = await asyncio.to_thread(lambda: list(self._pull(self.max_id)))
+                    n = self._apply(batches)
+                    if n:
+                        logger.info(f"Hotel geo index: {n} new hotels")
+            except Exception as e:
+                logger.error(f"Hotel geo index refresh failed: {e}")
+            await asyncio.sleep(settings.hotel_geo_refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hotels": len(self.index), "max_id": self.max_id,
+                "loaded_at": self.loaded_at, "pending_delta": len(self.index._delta),
+                **self.index.stats}
+
+
+hotel_geo = HotelGeo()
+
+
+async def hotels_nearby(lat: float, lon: float, radius_km: Optional[float] = None,
+                        k: int = 10) -> List[Dict[str, Any]]:
+    """Hotels around a point, nearest first: the ``k`` nearest, limited to
+    ``radius_km`` when given."""
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    return hotel_geo.nearest(lat, lon, k, radius_km)
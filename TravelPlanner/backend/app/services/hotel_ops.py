@@ -1,29 +1,61 @@
 """Wrapper around the HotelOperations external API"""
 
 import httpx
-from typing import List, Literal, Dict, Any, Tuple
+import ijson
+import numpy as np
+from ijson.common import ObjectBuilder
+from typing import List, Literal, Dict, Any, Tuple, AsyncIterator
 import logging
 import time 
 import hashlib 
 import json 
 import asyncio 
 import datetime
-from async_lru import alru_cache   
 from app.core.settings import settings 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from operator import itemgetter
+from app.services.rate_table import RateTable, rate_sort_key
+from app.services.topk import BoundedTopK
+from app.services import ranking
+from app.services import http_clients
+from app.services.static_store import HotelStaticStore, open_store
+from app.services.limiter import AdaptiveLimiter
+from app.services.resilience import LatencyTracker, RetryBudget, hedged_call
+from app.services.price_calendar import CalendarIndex, CalendarStore
 
 logger = logging.getLogger(__name__)
 
-    # async‑aware LRU cache  🡅
-
 API_KEY    = settings.hotelbeds_api_key
 API_SECRET = settings.hotelbeds_api_secret
-BASE_URL   = "https://api.test.hotelbeds.com"
+BASE_URL   = settings.hotelbeds_base_url
+
+# --- pooled async client (http_clients registry) + concurrency ----------
+# adaptive (AIMD) concurrency per endpoint; lower priority value is served first
+_LIMITS = {
+    "availability": AdaptiveLimiter("availability",
+                                    initial=settings.hotelbeds_concurrency_initial,
+                                    max_limit=settings.hotelbeds_concurrency_max,
+                                    target_latency=settings.hotelbeds_availability_target_latency),
+    "content":      AdaptiveLimiter("content",
+                                    initial=settings.hotelbeds_concurrency_initial,
+                                    max_limit=settings.hotelbeds_concurrency_max,
+                                    target_latency=settings.hotelbeds_content_target_latency),
+}
+PRIORITY_INTERACTIVE = 0        # agent turns / API requests
+PRIORITY_BACKGROUND  = 10       # refresh jobs, sweeps
+
+def limiter_stats() -> Dict[str, dict]:
+    return {name: lim.stats() for name, lim in _LIMITS.items()}
 
-# --- pooled async client -----------------------------------------
-_http: httpx.AsyncClient | None = None          # created lazily
-_LIMIT = asyncio.Semaphore(45)      
+# hedging + retries: a duplicate attempt is sent once the first exceeds the
+# endpoint's observed p95; retries and hedges share one global budget
+_LATENCY = {"availability": LatencyTracker(), "content": LatencyTracker(default=1.0)}
+_RETRY_BUDGET = RetryBudget(ratio=settings.hotelbeds_retry_budget_ratio)
+_MAX_RETRIES = settings.hotelbeds_max_retries
+
+def resilience_stats() -> Dict[str, Any]:
+    return {"budget": _RETRY_BUDGET.snapshot(),
+            "latency": {name: t.stats() for name, t in _LATENCY.items()}}
 
 def _signature() -> str:
     now = int(time.time())
@@ -38,99 +70,708 @@ def _headers() -> dict[str, str]:
     }
 
 async def _client() -> httpx.AsyncClient:
-    global _http
-    if _http is None:
-        _http = httpx.AsyncClient(base_url=BASE_URL, timeout=20.0)
-    return _http
+    return http_clients.registry.get("hotelbeds")
 
-# --- availability && helper functions-------------------------------------------------
-async def availability(dest: str, cin: str, cout: str,
-                       rooms: int = 1, adults: int = 2,
-                       children: int = 0) -> dict:
-    body = {
-        "stay": {"checkIn": cin, "checkOut": cout},
-        "occupancies": [{"rooms": rooms, "adults": adults, "children": children}],
-        "destination": {"code": dest}
+# --- availability cache + single-flight -----------------------------------
+# Every agent tool asks for the same (dest, cin, cout, occupancy) payload, so
+# identical bodies are answered from a short TTL cache, and concurrent misses
+# for the same body share one in-flight request instead of each POSTing.
+# Payloads range from a few KB to tens of MB, so the cache is bounded by the
+# response bytes recorded at fetch time as well as by entry count. An entry
+# also carries the payload's RateTable once a tool has built it (see
+# _availability_table), and its size counts toward the same budget.
+_AVAIL_TTL  = settings.hotelbeds_availability_ttl
+_AVAIL_MAX  = settings.hotelbeds_availability_cache_size
+_AVAIL_MAX_BYTES = settings.hotelbeds_availability_cache_bytes
+_avail_cache: "OrderedDict[str, Tuple[float, dict, int, RateTable | None]]" = OrderedDict()
+_avail_bytes = 0
+_avail_inflight: Dict[str, asyncio.Task] = {}
+_avail_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+def _availability_body(dest: str, cin: str, cout: str,
+                       rooms: int, adults: int, children: int) -> dict:
+    return {
+        "stay": {"checkIn": cin.strip(), "checkOut": cout.strip()},
+        "occupancies": [{"rooms": int(rooms), "adults": int(adults),
+                         "children": int(children)}],
+        "destination": {"code": dest.strip().upper()}
     }
-    async with _LIMIT:                                      # guard concurrency
+
+def _cache_key(body: dict) -> str:
+    canon = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canon.encode()).hexdigest()
+
+def _store_availability(key: str, task: asyncio.Task) -> None:
+    global _avail_bytes
+    _avail_inflight.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return                                              # never cache failures
+    data, nbytes = task.result()
+    if nbytes > _AVAIL_MAX_BYTES:
+        return                                              # would evict everything else
+    old = _avail_cache.pop(key, None)
+    if old is not None:
+        _avail_bytes -= old[2]
+    _avail_cache[key] = (time.monotonic(), data, nbytes, None)
+    _avail_bytes += nbytes
+    _evict_availability()
+
+def _evict_availability() -> None:
+    global _avail_bytes
+    while len(_avail_cache) > _AVAIL_MAX or _avail_bytes > _AVAIL_MAX_BYTES:
+        _avail_bytes -= _avail_cache.popitem(last=False)[1][2]
+
+def _cached_availability(key: str) -> dict | None:
+    cached = _avail_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _AVAIL_TTL:
+        return cached[1]
+    return None
+
+def availability_cache_stats() -> Dict[str, int]:
+    """Hit / miss / coalesced counters of the availability cache."""
+    return {**_avail_stats, "entries": len(_avail_cache), "bytes": _avail_bytes,
+            "inflight": len(_avail_inflight)}
+
+def clear_availability_cache() -> None:
+    global _avail_bytes
+    _avail_cache.clear()
+    _avail_bytes = 0
+
+# --- availability && helper functions-------------------------------------------------
+async def _post_availability_once(body: dict, priority: int) -> Tuple[dict, int]:
+    async with _LIMITS["availability"].slot(priority) as slot:   # guard concurrency
         r = await (await _client()).post(
             "/hotel-api/1.0/hotels", headers=_headers(), json=body
         )
+        slot.observe(r.status_code)
     r.raise_for_status()
     try:
         data = r.json()
     except Exception as e:
-        print(f"Error parsing JSON: {e}, response text: {r.text}")
+        logger.error(f"Error parsing JSON: {e}, response text: {r.text}")
         raise
-    return data
+    return data, len(r.content)
 
+async def _post_availability(body: dict,
+                             priority: int = PRIORITY_INTERACTIVE) -> Tuple[dict, int]:
+    """Availability payload and its response size in bytes."""
+    return await hedged_call(lambda: _post_availability_once(body, priority),
+                             _LATENCY["availability"], _RETRY_BUDGET,
+                             max_retries=_MAX_RETRIES)
 
-async def _flatten_rates(raw: dict):
-    if not isinstance(raw, dict):
-        print(f"Expected dict, got {type(raw)}: {raw}")
-        raise ValueError("Expected a dict as input to _flatten_rates")
-    out = []
-    for h in raw.get("hotels", []):
+async def availability(dest: str, cin: str, cout: str,
+                       rooms: int = 1, adults: int = 2,
+                       children: int = 0,
+                       priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """Hotelbeds availability, served from the TTL cache when possible.
+
+    The returned payload is shared between callers and must not be mutated."""
+    body = _availability_body(dest, cin, cout, rooms, adults, children)
+    key = _cache_key(body)
+
+    cached = _cached_availability(key)
+    if cached is not None:
+        _avail_cache.move_to_end(key)
+        _avail_stats["hits"] += 1
+        return cached
+
+    task = _avail_inflight.get(key)
+    if task is not None:
+        _avail_stats["coalesced"] += 1
+    else:
+        _avail_stats["misses"] += 1
+        task = asyncio.ensure_future(_post_availability(body, priority))
+        _avail_inflight[key] = task
+        task.add_done_callback(lambda t, key=key: _store_availability(key, t))
+    # shield: one cancelled caller must not cancel the request for the others
+    return (await asyncio.shield(task))[0]
+
+
+# --- streaming availability -------------------------------------------------
+# Hotels are decoded one at a time while the body downloads, so a ranking
+# that keeps only the top-N never holds the whole multi-MB response tree.
+# Streamed responses bypass the availability cache, hedging and retries
+# (nothing is buffered, so other tools in the same turn cannot reuse them):
+# enabling the flag trades cross-tool reuse for memory. Concurrent identical
+# rankings share one stream, and a payload that is cached, being fetched, or
+# being streamed for a different ranking is read through the buffered path,
+# which then serves later tools too.
+_STREAM_AVAILABILITY = settings.hotelbeds_stream_availability
+_stream_inflight: Dict[Tuple, asyncio.Task] = {}
+_stream_stats = {"streams": 0, "coalesced": 0}
+_HOTEL_PREFIXES = ("hotels.hotels.item", "hotels.item")   # APItude / flat shape
+
+async def _iter_hotels(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """Incrementally decode ``hotels[]`` out of an availability byte stream.
+
+    Numbers decode as float / int, as ``r.json()`` gives the buffered path."""
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    builder, prefix_open = None, None
+
+    def _drain():
+        nonlocal builder, prefix_open
+        done = []
+        for prefix, event, value in events:
+            if builder is None:
+                if event == "start_map" and prefix in _HOTEL_PREFIXES:
+                    builder, prefix_open = ObjectBuilder(), prefix
+                    builder.event(event, value)
+                continue
+            builder.event(event, value)
+            if event == "end_map" and prefix == prefix_open:
+                done.append(builder.value)
+                builder = None
+        del events[:]
+        return done
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        for hotel in _drain():
+            yield hotel
+    parser.close()
+    for hotel in _drain():
+        yield hotel
+
+async def availability_stream(dest: str, cin: str, cout: str,
+                              rooms: int = 1, adults: int = 2,
+                              children: int = 0) -> AsyncIterator[dict]:
+    """Yield availability hotels as they are decoded from the response."""
+    body = _availability_body(dest, cin, cout, rooms, adults, children)
+    async with _LIMITS["availability"].slot() as slot:
+        client = await _client()
+        async with client.stream("POST", "/hotel-api/1.0/hotels",
+                                 headers=_headers(), json=body) as r:
+            slot.observe(r.status_code)
+            r.raise_for_status()
+            async for hotel in _iter_hotels(r.aiter_bytes()):
+                yield hotel
+
+async def _stream_top_k(hotels: AsyncIterator[dict], order: Tuple[str, ...],
+                        top_n: int, board: str | None = None) -> List[dict]:
+    """Rank streamed rates straight into a bounded heap (O(top_n) memory)."""
+    best = BoundedTopK(top_n)
+    async for h in hotels:
         for room in h.get("rooms", []):
             for rate in room.get("rates", []):
-                rate["hotelCode"] = h["code"]
-                out.append(rate)
-    return out
-
-@alru_cache(maxsize=1024, ttl=60*60)                         # 1‑hour TTL
-async def hotel_static(*codes: Tuple[str, ...]) -> Dict[str, dict]:
-    query = ",".join(codes)
-    async with _LIMIT:
+                if board is not None and rate.get("boardCode") != board:
+                    continue
+                key = rate_sort_key(h, rate, order)
+                if best.would_keep(key):
+                    best.push(key, {**rate, "hotelCode": h["code"]})
+    return best.items()
+
+def _should_stream(key: str, ranking: Tuple) -> bool:
+    if not _STREAM_AVAILABILITY:
+        return False
+    if _cached_availability(key) is not None or key in _avail_inflight:
+        return False                                       # a buffered payload is cheaper
+    return not any(k == key and r != ranking for k, r in _stream_inflight)
+
+async def _streamed_top_k(dest: str, cin: str, cout: str, order: Tuple[str, ...],
+                          top_n: int, board: str | None = None) -> List[dict] | None:
+    """Top-N straight off the wire, or None when the buffered path should
+    answer instead (see _should_stream)."""
+    key = _cache_key(_availability_body(dest, cin, cout, 1, 2, 0))
+    ranking = (order, top_n, board)
+    task = _stream_inflight.get((key, ranking))
+    if task is not None:
+        _stream_stats["coalesced"] += 1
+    elif _should_stream(key, ranking):
+        _stream_stats["streams"] += 1
+        task = asyncio.ensure_future(_stream_top_k(availability_stream(dest, cin, cout),
+                                                   order, top_n, board))
+        _stream_inflight[key, ranking] = task
+        task.add_done_callback(lambda t, k=(key, ranking): _stream_inflight.pop(k, None))
+    else:
+        return None
+    # each caller gets its own rate dicts, as records() gives the buffered path
+    return [dict(rate) for rate in await asyncio.shield(task)]
+
+def stream_stats() -> Dict[str, int]:
+    return {**_stream_stats, "inflight": len(_stream_inflight)}
+
+async def _flatten_rates(raw: dict) -> RateTable:
+    """Availability payload -> columnar RateTable (rates are not copied)."""
+    if not isinstance(raw, dict):
+        logger.error(f"Expected dict, got {type(raw)}: {raw}")
+        raise ValueError("Expected a dict as input to _flatten_rates")
+    return RateTable.from_availability(raw)
+
+async def _availability_table(dest: str, cin: str, cout: str,
+                              priority: int = PRIORITY_INTERACTIVE) -> RateTable:
+    """RateTable of ``availability(dest, cin, cout)``.
+
+    The table (and the sorted indexes it builds lazily) is kept on the
+    payload's cache entry, so the tools answering one cached payload ingest
+    it only once, and it is evicted together with the payload."""
+    global _avail_bytes
+    raw = await availability(dest, cin, cout, priority=priority)
+    key = _cache_key(_availability_body(dest, cin, cout, 1, 2, 0))
+    entry = _avail_cache.get(key)
+    if entry is not None and entry[1] is raw and entry[3] is not None:
+        return entry[3]
+    table = await _flatten_rates(raw)
+    entry = _avail_cache.get(key)
+    if entry is not None and entry[1] is raw and entry[3] is None:
+        _avail_cache[key] = (entry[0], raw, entry[2] + table.nbytes, table)
+        _avail_bytes += table.nbytes
+        _evict_availability()
+    return table
+
+# --- static content: per-hotel-code cache ----------------------------------
+# Entries are cached per code, so a lookup only fetches codes it has not seen.
+# Missing codes go out in chunks of _STATIC_CHUNK (the content API returns at
+# most 100 hotels per page) fetched in parallel under the content limiter;
+# concurrent lookups for a code that is already being fetched wait on that
+# request.
+_STATIC_TTL   = 60*60                                      # 1‑hour TTL
+_STATIC_MAX   = settings.hotelbeds_static_cache_size
+_STATIC_CHUNK = settings.hotelbeds_static_chunk_size
+_static_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+_static_inflight: Dict[str, asyncio.Task] = {}
+_static_stats = {"hits": 0, "store_hits": 0, "misses": 0, "requests": 0}
+
+# Persistent store read before any network call; opened read-only by API
+# workers at startup and written by the Celery jobs: the calendar sweep seeds
+# the hotels it sees (seed_static_store) and refresh_hotel_static refetches
+# stale entries (refresh_static_store).
+_STATIC_MAX_AGE = settings.hotel_static_max_age
+_static_store: HotelStaticStore | None = None
+
+def open_static_store(readonly: bool | None = None) -> HotelStaticStore | None:
+    global _static_store
+    if readonly is None:
+        readonly = not settings.hotel_static_db_writable
+    close_static_store()
+    _static_store = open_store(settings.hotel_static_db_path, readonly=readonly)
+    return _static_store
+
+def close_static_store() -> None:
+    global _static_store
+    if _static_store is not None:
+        _static_store.close()
+        _static_store = None
+
+def _from_static_store(codes: List[str]) -> Dict[str, dict]:
+    if _static_store is None or not codes:
+        return {}
+    try:
+        stored = _static_store.get_many(codes)
+    except Exception as e:
+        logger.warning(f"Hotel static store read failed: {e}")
+        return {}
+    oldest = time.time() - _STATIC_MAX_AGE
+    now = time.monotonic()
+    found = {}
+    for code, (fetched_at, h) in stored.items():
+        if fetched_at >= oldest:
+            _static_cache[code] = (now, h)
+            _static_cache.move_to_end(code)
+            found[code] = h
+    _evict_static()
+    return found
+
+async def _get_static_chunk_once(codes: List[str], priority: int) -> Dict[str, dict]:
+    _static_stats["requests"] += 1
+    async with _LIMITS["content"].slot(priority) as slot:
         r = await (await _client()).get(
             "/hotel-content-api/1.0/hotels",
             headers=_headers(),
-            params={"fields": "code,name,category", "codes": query, "language": "ENG"}
+            params={"fields": "code,name,category", "codes": ",".join(codes),
+                    "language": "ENG", "from": 1, "to": len(codes)}
         )
+        slot.observe(r.status_code)
     r.raise_for_status()
-    hotels = r.json().get("hotels", [])
-    return {h["code"]: h for h in hotels}
+    return {str(h["code"]): h for h in r.json().get("hotels", [])}
+
+async def _fetch_static_chunk(codes: List[str],
+                              priority: int = PRIORITY_INTERACTIVE) -> Dict[str, dict]:
+    return await hedged_call(lambda: _get_static_chunk_once(codes, priority),
+                             _LATENCY["content"], _RETRY_BUDGET,
+                             max_retries=_MAX_RETRIES)
+
+def _evict_static() -> None:
+    while len(_static_cache) > _STATIC_MAX:
+        _static_cache.popitem(last=False)
+
+def _store_static(codes: List[str], task: asyncio.Task) -> None:
+    for code in codes:
+        if _static_inflight.get(code) is task:
+            del _static_inflight[code]
+    if task.cancelled() or task.exception() is not None:
+        return
+    now = time.monotonic()
+    for code, h in task.result().items():
+        _static_cache[code] = (now, h)
+        _static_cache.move_to_end(code)
+    _evict_static()
+    if _static_store is not None and not _static_store.readonly:
+        try:
+            _static_store.put_many(task.result())
+        except Exception as e:
+            logger.warning(f"Hotel static store write failed: {e}")
+
+async def hotel_static(*codes) -> Dict[str, dict]:
+    """Static content (code, name, category) keyed by hotel code as str."""
+    wanted = list(dict.fromkeys(str(c) for c in codes))
+    now = time.monotonic()
+    found: Dict[str, dict] = {}
+    pending: Dict[str, asyncio.Task] = {}
+    to_fetch: List[str] = []
+    for code in wanted:
+        cached = _static_cache.get(code)
+        if cached is not None and now - cached[0] < _STATIC_TTL:
+            found[code] = cached[1]
+        elif code in _static_inflight:
+            pending[code] = _static_inflight[code]
+        else:
+            to_fetch.append(code)
+    _static_stats["hits"] += len(found)
+
+    stored = _from_static_store(to_fetch)
+    if stored:
+        found.update(stored)
+        to_fetch = [code for code in to_fetch if code not in stored]
+        _static_stats["store_hits"] += len(stored)
+    _static_stats["misses"] += len(wanted) - len(found)
+
+    for i in range(0, len(to_fetch), _STATIC_CHUNK):
+        chunk = to_fetch[i:i + _STATIC_CHUNK]
+        task = asyncio.ensure_future(_fetch_static_chunk(chunk))
+        task.add_done_callback(lambda t, chunk=chunk: _store_static(chunk, t))
+        for code in chunk:
+            _static_inflight[code] = pending[code] = task
+
+    if pending:
+        tasks = list({id(t): t for t in pending.values()}.values())
+        await asyncio.gather(*(asyncio.shield(t) for t in tasks))
+        for code, task in pending.items():
+            h = task.result().get(code)
+            if h is not None:
+                found[code] = h
+    return {code: found[code] for code in wanted if code in found}
+
+def static_cache_stats() -> Dict[str, int]:
+    """Per-code static content cache counters (hits/misses count codes)."""
+    return {**_static_stats, "entries": len(_static_cache),
+            "inflight": len(_static_inflight),
+            "store_open": _static_store is not None}
+
+def _static_name(hotel: dict) -> str | None:
+    name = hotel.get("name")
+    return name.get("content") if isinstance(name, dict) else name
+
+def static_cache_names() -> List[Tuple[str, str]]:
+    """``(code, name)`` of hotels in the in-memory static cache (call on the loop)."""
+    return [(code, n) for code, (_, h) in _static_cache.items() if (n := _static_name(h))]
+
+def static_store_names() -> List[Tuple[str, str]]:
+    """``(code, name)`` of every hotel in the persistent static store."""
+    if _static_store is None:
+        return []
+    return [(code, n) for code, h in _static_store.iter_all() if (n := _static_name(h))]
+
+async def refresh_static_store(store: HotelStaticStore, max_age: float | None = None,
+                               codes=(), limit: int | None = None) -> int:
+    """Refetch store entries older than ``max_age`` (plus any extra ``codes``)
+    from the content API and write them back; returns hotels written."""
+    max_age = _STATIC_MAX_AGE if max_age is None else max_age
+    todo = list(dict.fromkeys([*(str(c) for c in codes),
+                               *store.stale_codes(max_age, limit)]))
+    written = await _fetch_into_store(store, todo)
+    logger.info(f"Hotel static refresh: {len(todo)} requested, {written} written")
+    return written
+
+async def seed_static_store(store: HotelStaticStore, codes) -> int:
+    """Fetch the hotels in ``codes`` that the store has no entry for yet;
+    returns hotels written."""
+    todo = store.missing_codes(codes)
+    written = await _fetch_into_store(store, todo)
+    logger.info(f"Hotel static seed: {len(todo)} new codes, {written} written")
+    return written
+
+async def _fetch_into_store(store: HotelStaticStore, todo: List[str]) -> int:
+    chunks = [todo[i:i + _STATIC_CHUNK] for i in range(0, len(todo), _STATIC_CHUNK)]
+    written = 0
+    fetches = (_fetch_static_chunk(c, PRIORITY_BACKGROUND) for c in chunks)
+    for found in await asyncio.gather(*fetches):
+        written += store.put_many(found)
+    return written
+
+# --- destinations content ----------------------------------------------------
+_DEST_PAGE = 1000                                          # content API page limit
+
+async def _get_destinations_page_once(first: int, priority: int) -> dict:
+    async with _LIMITS["content"].slot(priority) as slot:
+        r = await (await _client()).get(
+            "/hotel-content-api/1.0/locations/destinations",
+            headers=_headers(),
+            params={"fields": "code,name,countryCode,zones", "language": "ENG",
+                    "from": first, "to": first + _DEST_PAGE - 1},
+        )
+        slot.observe(r.status_code)
+    r.raise_for_status()
+    return r.json()
+
+async def fetch_destinations(priority: int = PRIORITY_BACKGROUND) -> List[dict]:
+    """Every Hotelbeds destination (code, name, countryCode, zones)."""
+    async def page(first: int) -> dict:
+        return await hedged_call(lambda: _get_destinations_page_once(first, priority),
+                                 _LATENCY["content"], _RETRY_BUDGET,
+                                 max_retries=_MAX_RETRIES)
+
+    first_page = await page(1)
+    total = int(first_page.get("total") or 0)
+    pages = await asyncio.gather(*(page(f) for f in range(1 + _DEST_PAGE, total + 1, _DEST_PAGE)))
+    destinations = [d for p in (first_page, *pages) for d in p.get("destinations", [])]
+    logger.info(f"Hotelbeds destinations fetched: {len(destinations)} of {total}")
+    return destinations
 
 # --- business functions for agent tools-------------------------------------------------
 
 
+# ranking orders: primary key first, later keys break ties (stable by row)
+LOWEST_PRICE_ORDER = ("net", "-category", "-promos")
+BEST_PROMO_ORDER   = ("-promos", "net", "-category")
+
 async def hotels_lowest_prices(dest, cin, cout, top_n=10):
-    flat = await _flatten_rates(await availability(dest, cin, cout))
-    return sorted(flat, key=lambda r: float(r["net"]))[:top_n]
+    streamed = await _streamed_top_k(dest, cin, cout, LOWEST_PRICE_ORDER, top_n)
+    if streamed is not None:
+        return streamed
+    table = await _availability_table(dest, cin, cout)
+    return table.records(table.top_k(top_n, LOWEST_PRICE_ORDER))
 
 async def hotels_highest_rating(dest, cin, cout, top_n=5):
-    flat   = await _flatten_rates(await availability(dest, cin, cout))
-    codes  = tuple({r["hotelCode"] for r in flat})
-    static = await hotel_static(*codes)
-    rated  = sorted(static.values(),
-                    key=lambda h: int(h["category"]["simpleCode"]), reverse=True)
-    return rated[:top_n]
+    table  = await _availability_table(dest, cin, cout)
+    static = await hotel_static(*table.hotel_code_set())
+    best   = BoundedTopK(top_n)
+    for h in static.values():
+        best.push((-int(h["category"]["simpleCode"]),), h)
+    return best.items()
 
 async def hotels_with_cxl_policy(dest: str, cin: str, cout: str,
                             policy: Literal["NRF", "FREE", "BEFORE_DATE"],
-                            deadline: str | None = None):
-    """FREE = cancellationPolicies is empty; NRF = rateClass ‘NRF’;
-       BEFORE_DATE = first policy date > deadline."""
-    flat = await _flatten_rates(await availability(dest, cin, cout))
+                            deadline: str | None = None,
+                            deadline_to: str | None = None,
+                            board: str | None = None,
+                            max_price: float | None = None):
+    """FREE = cancellationPolicies is empty; NRF = rateClass ‘NRF’;
+       BEFORE_DATE = first policy date > deadline (and <= deadline_to when
+       given, i.e. free cancellation ends within that window).
+       board / max_price narrow the result in the same pass."""
+    table = await _availability_table(dest, cin, cout)
+    return table.records(_policy_rows(table, policy, deadline, deadline_to, board, max_price))
+
+def _policy_rows(table: RateTable, policy: str | None, deadline: str | None = None,
+                 deadline_to: str | None = None, board: str | None = None,
+                 max_price: float | None = None):
+    if policy is None:
+        return table.select(board=board, max_net=max_price)
     if policy == "NRF":
-        return [r for r in flat if r["rateClass"] == "NRF"]
+        return table.select(rate_class="NRF", board=board, max_net=max_price)
     if policy == "FREE":
-        return [r for r in flat if not r.get("cancellationPolicies")]
+        return table.select(free_cancellation=True, board=board, max_net=max_price)
     if policy == "BEFORE_DATE":
-        dt = datetime.fromisoformat(deadline)
-        def ok(r):
-            cps = r.get("cancellationPolicies", [])
-            return all(datetime.fromisoformat(c["from"]) > dt for c in cps)
-        return [r for r in flat if ok(r)]
+        if not deadline:
+            raise ValueError("deadline is required for BEFORE_DATE")
+        return table.select(penalty_free_after=deadline, penalty_from_before=deadline_to,
+                            board=board, max_net=max_price)
     raise ValueError("Unknown policy flag")
 
 
 async def hotels_best_promo_board(dest: str, cin: str, cout: str,
                             board: str = "BB", top_n: int = 10):
-    flat = await _flatten_rates(await availability(dest, cin, cout))
-    filtered = [r for r in flat if r["boardCode"] == board]
-    scored   = sorted(filtered,
-                      key=lambda r: len(r.get("promotions", [])),
-                      reverse=True)
-    return scored[:top_n]
+    streamed = await _streamed_top_k(dest, cin, cout, BEST_PROMO_ORDER, top_n, board)
+    if streamed is not None:
+        return streamed
+    table    = await _availability_table(dest, cin, cout)
+    filtered = table.take(table.board_is(board))
+    return filtered.records(filtered.top_k(top_n, BEST_PROMO_ORDER))
+
+async def hotels_ranked(dest: str, cin: str, cout: str,
+                        weights: Dict[str, float] | None = None,
+                        mode: Literal["weighted", "pareto"] = "weighted",
+                        top_n: int = 10, board: str | None = None,
+                        max_price: float | None = None,
+                        policy: Literal["NRF", "FREE", "BEFORE_DATE"] | None = None,
+                        deadline: str | None = None) -> Dict[str, Any]:
+    """Rank hotels on price, category, promotions, board and cancellation
+    flexibility at once, from one availability call.
+
+    weighted: best rate per hotel by the weighted score, top ``top_n``.
+    pareto:   hotels whose best rate is not beaten on every weighted
+              criterion by another hotel, best scores first.
+    Board / price / cancellation-policy filters apply before ranking.
+    """
+    if mode not in ("weighted", "pareto"):
+        raise ValueError("mode must be 'weighted' or 'pareto'")
+    w = ranking.normalise_weights(weights)
+    table = await _availability_table(dest, cin, cout)
+    rows = _policy_rows(table, policy, deadline, None, board, max_price)
+    check_in = datetime.datetime.fromisoformat(cin.strip()).replace(
+        tzinfo=datetime.timezone.utc).timestamp()
+    scores = ranking.criteria_scores(table, check_in, time.time())
+    weight_vec = np.array([w[c] for c in ranking.CRITERIA])
+    score = scores @ weight_vec
+    per_hotel = ranking.best_per_hotel(table, score, rows)
+
+    front_size = None
+    if mode == "pareto":
+        used = weight_vec > 0
+        front = per_hotel[ranking.pareto_front(scores[per_hotel][:, used])]
+        front_size = len(front)
+        picked = ranking.weighted_top_k(table, score, top_n, front)
+    else:
+        picked = ranking.weighted_top_k(table, score, top_n, per_hotel)
+
+    hotels = []
+    for pos, rec in zip(picked, table.records(picked)):
+        rec["category"] = int(table.category[pos])
+        rec["score"] = round(float(score[pos]), 4)
+        rec["criteria"] = {c: round(float(v), 3) for c, v in zip(ranking.CRITERIA, scores[pos])}
+        hotels.append(rec)
+    return {"mode": mode, "weights": w, "considered": int(len(rows)),
+            "hotels_considered": int(len(per_hotel)), "front_size": front_size,
+            "hotels": hotels}
+
+async def hotels_price_matrix(dests: List[str], date_from: str, date_to: str,
+                              nights: int = 1, top_n: int = 10,
+                              max_checkins: int = 31) -> Dict[str, Any]:
+    """Cheapest stays over several destinations and a window of check-in dates.
+
+    Every (destination, check-in) availability request is issued concurrently
+    (the limiter paces them) and merged into one global top-N as responses
+    arrive. ``matrix[dest][checkIn]`` is the lowest net price of that stay,
+    or None when nothing is available or the request failed."""
+    start = datetime.date.fromisoformat(date_from)
+    end   = datetime.date.fromisoformat(date_to)
+    span  = min((end - start).days + 1, max_checkins)
+    checkins = [start + datetime.timedelta(days=i) for i in range(max(span, 0))]
+    dests = list(dict.fromkeys(d.strip().upper() for d in dests))
+
+    async def _cell(dest: str, cin: datetime.date):
+        cout = cin + datetime.timedelta(days=nights)
+        try:
+            table = await _availability_table(dest, cin.isoformat(), cout.isoformat())
+            return dest, cin.isoformat(), cout.isoformat(), table
+        except Exception as e:
+            logger.warning(f"Price matrix cell {dest} {cin} failed: {e}")
+            return dest, cin.isoformat(), cout.isoformat(), None
+
+    matrix: Dict[str, Dict[str, float | None]] = {d: {} for d in dests}
+    best = BoundedTopK(top_n)
+    failed = 0
+    for next_cell in asyncio.as_completed([_cell(d, c) for d in dests for c in checkins]):
+        dest, cin, cout, table = await next_cell
+        if table is None:
+            failed += 1
+            matrix[dest][cin] = None
+            continue
+        idx = table.top_k(top_n, LOWEST_PRICE_ORDER)
+        if not len(idx) or not np.isfinite(table.net[idx[0]]):
+            matrix[dest][cin] = None
+            continue
+        matrix[dest][cin] = float(table.net[idx[0]])
+        keys = table.sort_keys(LOWEST_PRICE_ORDER)
+        for i in idx:
+            key = tuple(float(k[i]) for k in keys)
+            if not best.would_keep(key):
+                break                                   # idx is sorted: the rest rank lower
+            rate = table.records([i])[0]
+            best.push(key, {**rate, "destination": dest, "checkIn": cin, "checkOut": cout})
+
+    return {
+        "nights": nights,
+        "checkIns": [c.isoformat() for c in checkins],
+        "matrix": {d: dict(sorted(cells.items())) for d, cells in matrix.items()},
+        "top": best.items(),
+        "failed": failed,
+    }
+
+# --- lowest-price calendar ---------------------------------------------------
+# The Celery sweep (app.workers.tasks.sweep_price_calendar) fills a SQLite
+# calendar with the min / median net price of 1-night stays per destination;
+# API workers serve it from an in-memory index and only go live for cells
+# that are missing or older than max_age.
+_calendar = CalendarIndex(settings.price_calendar_db_path)
+
+def _night_prices(table: RateTable) -> Tuple[float, float]:
+    prices = table.net[np.isfinite(table.net)]
+    if not len(prices):
+        return np.nan, np.nan
+    return float(prices.min()), float(np.median(prices))
+
+async def _price_night(dest: str, night: datetime.date,
+                       priority: int = PRIORITY_INTERACTIVE, hotel_codes: set | None = None):
+    cout = night + datetime.timedelta(days=1)
+    table = await _availability_table(dest, night.isoformat(), cout.isoformat(), priority)
+    if hotel_codes is not None:
+        hotel_codes.update(str(c) for c in table.hotel_code_set())
+    lo, med = _night_prices(table)
+    return night, lo, med, time.time()
+
+async def hotels_price_calendar(dest: str, date_from: str, date_to: str,
+                                max_age: int | None = None,
+                                max_live: int = 31) -> Dict[str, Any]:
+    """Per-night lowest and median price for 1-night stays in a date range.
+
+    At most ``max_live`` missing or stale nights (earliest first) are priced
+    live; the rest are reported with source "unavailable"."""
+    dest = dest.strip().upper()
+    max_age = settings.price_calendar_max_age if max_age is None else max_age
+    start = datetime.date.fromisoformat(date_from)
+    end   = datetime.date.fromisoformat(date_to)
+    oldest = time.time() - max_age
+
+    await _calendar.refresh()
+    cells = _calendar.cells(dest, start, end)
+    stale = [night for night, _, _, updated in cells if not updated >= oldest][:max(max_live, 0)]
+    live = {}
+    if stale:
+        results = await asyncio.gather(*(_price_night(dest, n) for n in stale),
+                                       return_exceptions=True)
+        for night, res in zip(stale, results):
+            if isinstance(res, Exception):
+                logger.warning(f"Live calendar lookup {dest} {night} failed: {res}")
+                continue
+            live[night] = res
+            _calendar.put(dest, *res)
+
+    days = []
+    for night, lo, med, updated in cells:
+        source = "index"
+        if night in live:
+            _, lo, med, updated = live[night]
+            source = "live"
+        elif not updated >= oldest:
+            source = "unavailable"
+        days.append({
+            "date": night.isoformat(),
+            "min": None if np.isnan(lo) else round(lo, 2),
+            "median": None if np.isnan(med) else round(med, 2),
+            "updatedAt": None if np.isnan(updated) else updated,
+            "source": source,
+        })
+    return {"dest": dest, "days": days}
+
+async def sweep_price_calendar(store: CalendarStore, dests: List[str],
+                               nights: int, start: datetime.date | None = None,
+                               hotel_codes: set | None = None) -> int:
+    """Price the next ``nights`` check-in dates for ``dests`` into ``store``;
+    the codes of every hotel seen are added to ``hotel_codes`` when given."""
+    start = start or datetime.date.today()
+    written = 0
+    for dest in dests:
+        dest = dest.strip().upper()
+        days = [start + datetime.timedelta(days=i) for i in range(nights)]
+        results = await asyncio.gather(
+            *(_price_night(dest, d, PRIORITY_BACKGROUND, hotel_codes) for d in days),
+            return_exceptions=True,
+        )
+        cells = [r for r in results if not isinstance(r, Exception)]
+        written += store.upsert(dest, cells)
+        logger.info(f"Price calendar sweep {dest}: {len(cells)}/{nights} nights")
+    return written
 
 print(_signature())
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""Registry of pooled outbound HTTP clients, one per upstream"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+import httpx
+
+from app.core.settings import settings
+from app.services.http_recording import (FixtureWriter, RecordingAsyncTransport,
+                                         RecordingSyncTransport)
+
+logger = logging.getLogger(__name__)
+
+_HAS_H2 = importlib.util.find_spec("h2") is not None
+
+T = TypeVar("T")
+
+
+class _PoolMeter:
+    """Request counters shared by the sync and async metered transports."""
+
+    __slots__ = ("requests", "errors", "inflight", "peak_inflight", "busy_seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.busy_seconds = 0.0
+
+    def start(self) -> float:
+        self.requests += 1
+        self.inflight += 1
+        self.peak_inflight = max(self.peak_inflight, self.inflight)
+        return time.monotonic()
+
+    def finish(self, started: float, failed: bool) -> None:
+        self.inflight -= 1
+        self.busy_seconds += time.monotonic() - started
+        if failed:
+            self.errors += 1
+
+
+def _pool_connections(transport) -> Dict[str, int]:
+    """Connection counts of httpx's underlying httpcore pool, when exposed."""
+    pool = getattr(transport, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return {}
+    idle = sum(1 for c in connections if c.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class _MeteredAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, meter: _PoolMeter):
+        self.inner = inner
+        self.meter = meter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = self.meter.start()
+        failed = True
+        try:
+            response = await self.inner.handle_async_request(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.meter.finish(started, failed)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class _MeteredSyncTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, meter: _PoolMeter):
+        self.inner = inner
+        self.meter = meter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = self.meter.start()
+        failed = True
+        try:
+            response = self.inner.handle_request(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.meter.finish(started, failed)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+@dataclass
+class UpstreamConfig:
+    name: str
+    base_url: str = ""
+    sync: bool = False                  # SDKs / tools that call synchronously
+    timeout: float = 20.0
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive: int = 20
+    keepalive_expiry: float = 30.0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class ClientRegistry:
+    """Owns one pooled ``httpx`` client per upstream.
+
+    Clients are created in the FastAPI lifespan (``startup``) -- or lazily on
+    first use outside the app, e.g. in Celery tasks -- and closed together in
+    ``aclose``. An async client's pooled connections belong to the event loop
+    it was created on, so it is rebuilt (and the old one closed) when used
+    from another loop; code that runs its own loops should go through
+    ``run_with_clients``. With ``record_dir`` set every exchange is also
+    written there as a fixture (see ``http_recording``). SDK objects built on
+    top of a pooled client (Groq, ElevenLabs) are memoised with ``sdk`` and
+    dropped with their client.
+    """
+
+    def __init__(self, record_dir: str | None = None):
+        self.record_dir = record_dir                # capture fixtures when set
+        self._configs: Dict[str, UpstreamConfig] = {}
+        self._clients: Dict[str, httpx.Client | httpx.AsyncClient] = {}
+        self._meters: Dict[str, _PoolMeter] = {}
+        self._transports: Dict[str, Any] = {}
+        self._loops: Dict[str, asyncio.AbstractEventLoop] = {}
+        self._sdks: Dict[str, Any] = {}
+        self._closing: "set[asyncio.Future]" = set()
+
+    def register(self, config: UpstreamConfig) -> None:
+        self._configs[config.name] = config
+
+    def _build(self, name: str):
+        cfg = self._configs[name]
+        limits = httpx.Limits(max_connections=cfg.max_connections,
+                              max_keepalive_connections=cfg.max_keepalive,
+                              keepalive_expiry=cfg.keepalive_expiry)
+        http2 = cfg.http2 and _HAS_H2
+        if cfg.http2 and not _HAS_H2:
+            logger.info(f"HTTP/2 requested for {name} but h2 is not installed; using HTTP/1.1")
+        meter = self._meters.setdefault(name, _PoolMeter())
+        writer = FixtureWriter(self.record_dir, name) if self.record_dir else None
+        if cfg.sync:
+            transport = httpx.HTTPTransport(http2=http2, limits=limits)
+            inner = RecordingSyncTransport(transport, writer) if writer else transport
+            wrapped = _MeteredSyncTransport(inner, meter)
+        else:
+            transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+            inner = RecordingAsyncTransport(transport, writer) if writer else transport
+            wrapped = _MeteredAsyncTransport(inner, meter)
+        if writer:
+            logger.info(f"Recording {name} exchanges to {writer.dir}")
+        self._transports[name] = transport
+        client_cls = httpx.Client if cfg.sync else httpx.AsyncClient
+        return client_cls(base_url=cfg.base_url, timeout=cfg.timeout,
+                          headers=cfg.headers, transport=wrapped)
+
+    def get(self, name: str) -> httpx.AsyncClient | httpx.Client:
+        """Pooled client for ``name`` (``httpx.Client`` for sync upstreams)."""
+        client = self._clients.get(name)
+        loop = None
+        if not self._configs[name].sync:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        if client is None or client.is_closed or (loop is not None and self._loops.get(name) is not loop):
+            if client is not None and not client.is_closed:
+                self._discard(name, client, self._loops.get(name))
+            client = self._clients[name] = self._build(name)
+            self._loops[name] = loop
+        return client
+
+    def _discard(self, name: str, client: httpx.AsyncClient,
+                 owner: asyncio.AbstractEventLoop | None) -> None:
+        """Close a client replaced on a loop switch: on the loop that owns its
+        connections while that one still runs, else on the current loop."""
+        async def close():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing replaced HTTP client {name}: {e}")
+
+        if owner is not None and owner.is_running() and not owner.is_closed():
+            future = asyncio.run_coroutine_threadsafe(close(), owner)
+        else:
+            future = asyncio.ensure_future(close())
+        self._closing.add(future)
+        future.add_done_callback(self._closing.discard)
+
+    def sdk(self, name: str, factory: Callable[[httpx.Client], Any]) -> Any:
+        """SDK object built once on top of the pooled client ``name``."""
+        client = self.get(name)
+        cached = self._sdks.get(name)
+        if cached is None or cached[0] is not client:
+            cached = self._sdks[name] = (client, factory(client))
+        return cached[1]
+
+    async def startup(self) -> None:
+        for name in self._configs:
+            self.get(name)
+        logger.info(f"HTTP clients ready: {', '.join(self._configs)}")
+
+    async def aclose(self) -> None:
+        for name, client in list(self._clients.items()):
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                else:
+                    client.close()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client {name}: {e}")
+        self._clients.clear()
+        self._loops.clear()
+        self._sdks.clear()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, cfg in self._configs.items():
+            meter = self._meters.get(name, _PoolMeter())
+            client = self._clients.get(name)
+            pool = {}
+            if client is not None and not client.is_closed:
+                pool = _pool_connections(self._transports.get(name))
+            out[name] = {
+                "open": client is not None and not client.is_closed,
+                "http2": cfg.http2 and _HAS_H2,
+                "max_connections": cfg.max_connections,
+                "requests": meter.requests,
+                "errors": meter.errors,
+                "inflight": meter.inflight,
+                "peak_inflight": meter.peak_inflight,
+                "busy_seconds": round(meter.busy_seconds, 3),
+                "utilization": round(meter.inflight / cfg.max_connections, 3),
+                **pool,
+            }
+        return out
+
+
+registry = ClientRegistry(record_dir=settings.http_record_dir)
+
+
+def run_with_clients(coro: Awaitable[T]) -> T:
+    """``asyncio.run(coro)`` for code outside the app (Celery tasks): the
+    registry's clients are closed before that loop is, so every run gets
+    fresh, loop-scoped connections."""
+    async def scoped() -> T:
+        try:
+            return await coro
+        finally:
+            await registry.aclose()
+    return asyncio.run(scoped())
+
+
+registry.register(UpstreamConfig(
+    "hotelbeds", base_url=settings.hotelbeds_base_url, timeout=20.0,
+    http2=settings.http2_enabled, max_connections=64, max_keepalive=32,
+    keepalive_expiry=60.0,
+))
+registry.register(UpstreamConfig(
+    "duffel", base_url=settings.duffel_base_url, sync=True, timeout=30.0,
+    http2=settings.http2_enabled, max_connections=20, max_keepalive=10,
+))
+registry.register(UpstreamConfig(
+    "groq", sync=True, timeout=60.0, max_connections=20, max_keepalive=10,
+))
+registry.register(UpstreamConfig(
+    "elevenlabs", sync=True, timeout=60.0, max_connections=10, max_keepalive=5,
+))
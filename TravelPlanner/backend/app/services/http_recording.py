@@ -0,0 +1,134 @@
+"""Recording transports: capture provider exchanges as replayable fixtures"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Only these headers are kept; credentials and signatures never reach disk.
+_KEPT_HEADERS = ("content-type",)
+
+
+def _decode(content: bytes) -> Any:
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:80] or "root"
+
+
+class FixtureWriter:
+    """Writes one JSON file per exchange under ``<root>/<upstream>/``.
+
+    File names are ``<seq>-<METHOD>-<path slug>.json`` so a directory listing
+    reads in call order. Each file holds the request (method, path, query,
+    JSON body) and the response (status, content type, JSON body, latency).
+    """
+
+    def __init__(self, root: str, upstream: str):
+        self.dir = os.path.join(root, upstream)
+        self.upstream = upstream
+        os.makedirs(self.dir, exist_ok=True)
+        self._seq = itertools.count(len(os.listdir(self.dir)) + 1)
+
+    def write(self, request: httpx.Request, response: httpx.Response,
+              latency: float) -> str:
+        exchange = {
+            "upstream": self.upstream,
+            "method": request.method,
+            "path": request.url.path,
+            "query": dict(request.url.params.multi_items()),
+            "request": _decode(request.content),
+            "status": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS},
+            "response": _decode(response.content),
+            "latency": round(latency, 4),
+        }
+        name = f"{next(self._seq):05d}-{request.method}-{_slug(request.url.path)}.json"
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            json.dump(exchange, f, indent=1)
+        return path
+
+
+def _replayable(request: httpx.Request, response: httpx.Response,
+                content: bytes) -> httpx.Response:
+    """A fresh response carrying the already-read body."""
+    headers = [(k, v) for k, v in response.headers.items()
+               if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+    return httpx.Response(response.status_code, headers=headers, content=content,
+                          request=request, extensions=response.extensions)
+
+
+class RecordingAsyncTransport(httpx.AsyncBaseTransport):
+    """Passes requests through and records every exchange.
+
+    The body is read in full before it is handed back, so streamed responses
+    arrive in one piece while recording -- fine for capturing fixtures, not
+    for measuring.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, writer: FixtureWriter):
+        self.inner = inner
+        self.writer = writer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        replay = _replayable(request, response, content)
+        try:
+            self.writer.write(request, replay, time.monotonic() - started)
+        except OSError as e:
+            logger.warning(f"Fixture for {request.url.path} not written: {e}")
+        return replay
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class RecordingSyncTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, writer: FixtureWriter):
+        self.inner = inner
+        self.writer = writer
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        response.close()
+        replay = _replayable(request, response, content)
+        try:
+            self.writer.write(request, replay, time.monotonic() - started)
+        except OSError as e:
+            logger.warning(f"Fixture for {request.url.path} not written: {e}")
+        return replay
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def load_fixtures(root: str, upstream: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Recorded exchanges under ``root`` (optionally one upstream), in call order."""
+    dirs = [upstream] if upstream else sorted(os.listdir(root))
+    for name in dirs:
+        folder = os.path.join(root, name)
+        if not os.path.isdir(folder):
+            continue
+        for file in sorted(os.listdir(folder)):
+            if file.endswith(".json"):
+                with open(os.path.join(folder, file)) as f:
+                    yield json.load(f)
@@ -1,11 +1,11 @@
 from langchain.agents import initialize_agent, AgentType
-from langchain_core.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
+from langchain_core.prompts import MessagesPlaceholder
 from langchain.schema import BaseMessage
 from app.services import lc_tools
+from app.services.chat_memory import ChatMemory
 from langchain_groq import ChatGroq
 from app.core.settings import settings
-from typing import List, Dict, Optional
+from typing import List
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,82 +15,66 @@ llm = ChatGroq(
     model="llama3-70b-8192",  # or "llama3-8b-8192" for smaller version
     groq_api_key=settings.groq_api_key,
     temperature=0.3,
+    streaming=True,  # token callbacks for /chat/stream; plain calls still get the full reply
 )
 
 TOOLS = [lc_tools.hotel_select_tool, 
          lc_tools.hotel_cheapest_tool, lc_tools.hotel_cxl_policy_tool, 
-         lc_tools.hotel_highest_rated_tool]
+         lc_tools.hotel_highest_rated_tool, lc_tools.hotel_price_matrix_tool,
+         lc_tools.hotel_price_calendar_tool, lc_tools.hotel_rank_tool,
+         lc_tools.hotels_nearby_tool, lc_tools.hotel_lookup_tool]
 
 SYSTEM_PROMPT = """You are TripPlanner, a professional travel agent.
 When needed, call tools from the available list of tools to recommend hotels. Prioritize the user's requirements and always show the top 5 hotels based on those criteria, until specified otherwise."""
 
-# Simple conversation memory for the chat agent
-vector_memory = ConversationBufferMemory(
-    memory_key="chat_history",
-    return_messages=True,
-    output_key="output"
-)
-
-class ChatMemory:
-    """Custom memory class for managing chat sessions"""
-    
-    def __init__(self):
-        self.conversations = {}
-        self.agents = {}  # Store agent instances per session
-    
-    def add_message(self, session_id: str, message: BaseMessage):
-        """Add a message to the conversation history"""
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        self.conversations[session_id].append(message)
-    
-    def get_history(self, session_id: str) -> List[BaseMessage]:
-        """Get conversation history for a session"""
-        return self.conversations.get(session_id, [])
-    
-    def clear_history(self, session_id: str):
-        """Clear conversation history for a session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-        if session_id in self.agents:
-            del self.agents[session_id]
-    
-    def get_or_create_agent(self, session_id: str):
-        """Get existing agent for session or create new one"""
-        if session_id not in self.agents:
-            self.agents[session_id] = create_agent_with_memory(session_id)
-        return self.agents[session_id]
+def build_agent_executor():
+    """One stateless executor shared by every session.
 
-def create_agent_with_memory(session_id: str):
-    """Create a new agent instance with session-specific memory"""
-    # Create session-specific memory
-    session_memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-        output_key="output"
-    )
-    
-    # Create agent with session memory
-    agent = initialize_agent(
+    Built once at import: prompt and tool schemas are rendered a single
+    time and the executor holds no memory; each call passes the session's
+    history as ``chat_history``.
+    """
+    return initialize_agent(
         TOOLS,
         llm,
         agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        memory=session_memory,
+        agent_kwargs={
+            "memory_prompts": [MessagesPlaceholder(variable_name="chat_history")],
+            "input_variables": ["input", "agent_scratchpad", "chat_history"],
+        },
         verbose=True,
     )
-    
-    return agent
 
-def get_agent():
-    """Get default agent with global memory (legacy function)"""
-    prompt = PromptTemplate.from_template(SYSTEM_PROMPT)
-    return initialize_agent(
-        TOOLS,
-        llm,
-        agent=AgentType.OPENAI_FUNCTIONS,
-        memory=vector_memory,
-        verbose=True,
+agent_executor = build_agent_executor()
+
+async def run_agent(message: str, history: List[BaseMessage], callbacks=None) -> str:
+    """Answer ``message`` given the earlier turns of its session."""
+    result = await agent_executor.ainvoke(
+        {"input": message, "chat_history": history},
+        config={"callbacks": callbacks} if callbacks else None,
     )
+    return result["output"]
+
+SUMMARY_PROMPT = """You keep notes for a travel agent on their conversation with a traveller.
+Update the notes with the new messages. Keep destinations, dates, travellers, budget,
+preferences and hotels already proposed or rejected; drop greetings and small talk.
+Answer with the updated notes only, in at most {max_words} words.
+
+Current notes:
+{summary}
+
+New messages:
+{messages}"""
+
+async def summarize_history(summary: str, messages: List[BaseMessage]) -> str:
+    """Rolling summary for ``ChatMemory``: fold ``messages`` into ``summary``."""
+    lines = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    reply = await llm.ainvoke(SUMMARY_PROMPT.format(
+        max_words=settings.chat_summary_max_tokens * 3 // 4,
+        summary=summary or "(none)",
+        messages=lines,
+    ))
+    return reply.content
 
 # Global chat memory instance
 chat_memory = ChatMemory()
@@ -1,7 +1,12 @@
+import functools
 from langchain.tools import StructuredTool
 from pydantic import BaseModel, Field
 from typing import Any, Literal, Optional
 from app.services import hotel_ops
+from app.services.destinations import destination_resolver
+from app.services.hotel_geo import hotels_nearby
+from app.services.name_index import lookup_hotels
+from app.services.tool_memo import tool_memo
 
 '''
 hotel_search_tool = Tool(
@@ -11,6 +16,44 @@ hotel_search_tool = Tool(
     coroutine=hotel_ops.search_hotels,
 )
 '''
+
+def resolved_dest(fn):
+    """Map ``dest`` / ``dests`` free text to Hotelbeds codes before ``fn`` runs.
+
+    Misspelled or spelled-out cities are fixed locally; input that does not
+    resolve is answered with suggestions instead of a failing availability call.
+    """
+    def resolve(text: str) -> tuple[str | None, dict | None]:
+        found = destination_resolver.resolve(text)
+        if found.code:
+            return found.code, None
+        if len(destination_resolver) == 0:
+            return text, None                   # dictionary not loaded yet: pass through
+        return None, {"error": f"Unknown destination '{text}'", "suggestions": found.suggestions}
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if "dest" in kwargs:
+            kwargs["dest"], error = resolve(kwargs["dest"])
+            if error:
+                return error
+        if "dests" in kwargs:
+            codes = []
+            for text in kwargs["dests"]:
+                code, error = resolve(text)
+                if error:
+                    return error
+                codes.append(code)
+            kwargs["dests"] = codes
+        return await fn(*args, **kwargs)
+    return wrapper
+
+def hotelbeds_tool(name: str, fn):
+    """``fn`` memoized per chat session, behind ``resolved_dest``: the memo
+    is keyed on the resolved codes, so "Barcelona", "barcelona" and "BCN"
+    share one entry (and one Hotelbeds call)."""
+    return resolved_dest(tool_memo.wrap(name, fn))
+
 class SelectHotelIsInput(BaseModel):
     hotels: list[dict] = Field(..., description="List of hotels from which best hotel is to be selected")
     budget: int = Field(..., description="Budget for the booking")
@@ -30,7 +73,7 @@ hotel_select_tool = StructuredTool.from_function(
     args_schema=SelectHotelIsInput,
 )
 class BestRatedHotelIsInput(BaseModel):
-    dest: str = Field(..., description="Destination city code")
+    dest: str = Field(..., description="Destination city code or city name, e.g. 'BCN' or 'Barcelona'")
     cin: str = Field(..., description="Check-in date (YYYY-MM-DD)")
     cout: str = Field(..., description="Check-out date (YYYY-MM-DD)")
     top_n: int = Field(10, description="Number of hotels to return")
@@ -39,12 +82,12 @@ hotel_highest_rated_tool = StructuredTool.from_function(
     name="get_highest_rated_hotel",
     description="Get the top-n hotels with highest rating with availability in the given dates and location.",
     func=None,
-    coroutine=hotel_ops.hotels_highest_rating,
+    coroutine=hotelbeds_tool("get_highest_rated_hotel", hotel_ops.hotels_highest_rating),
     args_schema=BestRatedHotelIsInput,
 )
 
 class CheapestHotelsInput(BaseModel):
-    dest: str = Field(..., description="Destination city code")
+    dest: str = Field(..., description="Destination city code or city name, e.g. 'BCN' or 'Barcelona'")
     cin: str = Field(..., description="Check-in date (YYYY-MM-DD)")
     cout: str = Field(..., description="Check-out date (YYYY-MM-DD)")
     top_n: int = Field(10, description="Number of hotels to return")
@@ -53,22 +96,118 @@ hotel_cheapest_tool = StructuredTool.from_function(
     name="get_cheapest_hotels",
     description="Get the hotels with the cheapest rates with availability in the given dates and location.",
     func=None,
-    coroutine=hotel_ops.hotels_lowest_prices,
+    coroutine=hotelbeds_tool("get_cheapest_hotels", hotel_ops.hotels_lowest_prices),
     args_schema=CheapestHotelsInput,
 )
 
 class HotelsWithCxlPolicyInput(BaseModel):
-    dest: str = Field(..., description="Destination city code")
+    dest: str = Field(..., description="Destination city code or city name, e.g. 'BCN' or 'Barcelona'")
     cin: str = Field(..., description="Check-in date (YYYY-MM-DD)")
     cout: str = Field(..., description="Check-out date (YYYY-MM-DD)")
     policy: Literal["NRF", "FREE", "BEFORE_DATE"] = Field(..., description="Cancellation policy type")
     deadline: Optional[str] = Field(None, description="Deadline date (YYYY-MM-DD) for BEFORE_DATE policy")
+    deadline_to: Optional[str] = Field(None, description="Optional end date (YYYY-MM-DD) for BEFORE_DATE: only rates whose free cancellation ends between deadline and deadline_to")
+    board: Optional[str] = Field(None, description="Optional board code filter, e.g. 'BB', 'HB', 'AI'")
+    max_price: Optional[float] = Field(None, description="Optional maximum net price of the rate")
 
 hotel_cxl_policy_tool = StructuredTool.from_function(
     name="get_hotels_with_compatible_cancellation",
-    description="Get hotels with matching cancellation policy as mentioned in user prompt with availability in the given dates and location. Available cancellation policies are FREE=cancellationPolicies is empty; NRF=rateClass ‘NRF’; BEFORE_DATE=first policy date>deadline.",
+    description="Get hotels with matching cancellation policy as mentioned in user prompt with availability in the given dates and location. Available cancellation policies are FREE=cancellationPolicies is empty; NRF=rateClass ‘NRF’; BEFORE_DATE=first policy date>deadline (optionally <= deadline_to). Board and maximum price can be combined with any policy.",
     func=None,
-    coroutine=hotel_ops.hotels_with_cxl_policy,
+    coroutine=hotelbeds_tool("get_hotels_with_compatible_cancellation", hotel_ops.hotels_with_cxl_policy),
     args_schema=HotelsWithCxlPolicyInput
 )
 
+
+class PriceMatrixInput(BaseModel):
+    dests: list[str] = Field(..., description="Destination city codes or names to compare, e.g. ['BCN', 'Lisbon']")
+    date_from: str = Field(..., description="Earliest check-in date (YYYY-MM-DD)")
+    date_to: str = Field(..., description="Latest check-in date (YYYY-MM-DD)")
+    nights: int = Field(1, description="Length of stay in nights")
+    top_n: int = Field(10, description="Number of cheapest stays to return across all destinations and dates")
+
+hotel_price_matrix_tool = StructuredTool.from_function(
+    name="get_cheapest_dates_and_destinations",
+    description="Compare hotel prices across several destinations and a range of check-in dates in one call. Returns the lowest price per destination and check-in date plus the overall cheapest stays. Use this instead of calling get_cheapest_hotels repeatedly for flexible dates or multiple cities.",
+    func=None,
+    coroutine=hotelbeds_tool("get_cheapest_dates_and_destinations", hotel_ops.hotels_price_matrix),
+    args_schema=PriceMatrixInput,
+)
+
+class PriceCalendarInput(BaseModel):
+    dest: str = Field(..., description="Destination city code or city name, e.g. 'BCN' or 'Barcelona'")
+    date_from: str = Field(..., description="First check-in date (YYYY-MM-DD)")
+    date_to: str = Field(..., description="Last check-in date (YYYY-MM-DD)")
+
+hotel_price_calendar_tool = StructuredTool.from_function(
+    name="get_price_calendar",
+    description="Get the lowest and median hotel price per night for one destination over a range of dates. Use this to answer 'when is it cheapest to go to X'.",
+    func=None,
+    coroutine=hotelbeds_tool("get_price_calendar", hotel_ops.hotels_price_calendar),
+    args_schema=PriceCalendarInput,
+)
+
+class RankHotelsInput(BaseModel):
+    dest: str = Field(..., description="Destination city code or city name, e.g. 'BCN' or 'Barcelona'")
+    cin: str = Field(..., description="Check-in date (YYYY-MM-DD)")
+    cout: str = Field(..., description="Check-out date (YYYY-MM-DD)")
+    price_weight: float = Field(0.4, description="Importance of a low price (0-1)")
+    category_weight: float = Field(0.25, description="Importance of a high star category (0-1)")
+    promotions_weight: float = Field(0.1, description="Importance of promotions (0-1)")
+    board_weight: float = Field(0.1, description="Importance of included meals, RO < BB < HB < FB < AI (0-1)")
+    flexibility_weight: float = Field(0.15, description="Importance of free / late cancellation (0-1)")
+    mode: Literal["weighted", "pareto"] = Field("weighted", description="'weighted' for one ranked list by weighted score; 'pareto' for the hotels that are not beaten on every criterion by another hotel")
+    top_n: int = Field(10, description="Number of hotels to return")
+    board: Optional[str] = Field(None, description="Optional board code the rate must have, e.g. 'BB'")
+    max_price: Optional[float] = Field(None, description="Optional maximum net price of the rate")
+    policy: Optional[Literal["NRF", "FREE", "BEFORE_DATE"]] = Field(None, description="Optional cancellation policy the rate must have")
+    deadline: Optional[str] = Field(None, description="Deadline date (YYYY-MM-DD) for the BEFORE_DATE policy")
+
+async def rank_hotels(dest: str, cin: str, cout: str, price_weight: float = 0.4,
+                      category_weight: float = 0.25, promotions_weight: float = 0.1,
+                      board_weight: float = 0.1, flexibility_weight: float = 0.15,
+                      mode: str = "weighted", top_n: int = 10, board: str | None = None,
+                      max_price: float | None = None, policy: str | None = None,
+                      deadline: str | None = None) -> dict[str, Any]:
+    """Flatten the weight fields for the LLM into ``hotel_ops.hotels_ranked``."""
+    weights = {"price": price_weight, "category": category_weight,
+               "promotions": promotions_weight, "board": board_weight,
+               "flexibility": flexibility_weight}
+    return await hotel_ops.hotels_ranked(dest, cin, cout, weights=weights, mode=mode,
+                                         top_n=top_n, board=board, max_price=max_price,
+                                         policy=policy, deadline=deadline)
+
+hotel_rank_tool = StructuredTool.from_function(
+    name="rank_hotels",
+    description="Rank hotels on several criteria at once -- price, star category, promotions, board and cancellation flexibility -- with one availability search. Use this for compound requests (e.g. 'cheap but at least 4 stars with free cancellation') instead of chaining get_cheapest_hotels, get_highest_rated_hotel and get_hotels_with_compatible_cancellation. Set the weights to reflect what the user cares about.",
+    func=None,
+    coroutine=hotelbeds_tool("rank_hotels", rank_hotels),
+    args_schema=RankHotelsInput,
+)
+
+class HotelsNearbyInput(BaseModel):
+    lat: float = Field(..., description="Latitude of the landmark or address, e.g. 41.4036 for Sagrada Familia")
+    lon: float = Field(..., description="Longitude of the landmark or address, e.g. 2.1744 for Sagrada Familia")
+    radius_km: Optional[float] = Field(None, description="Only hotels within this distance in km, e.g. 1.5 for walking distance")
+    k: int = Field(10, description="Maximum number of hotels to return, nearest first")
+
+hotels_nearby_tool = StructuredTool.from_function(
+    name="get_hotels_near_location",
+    description="Find hotels closest to a point of interest (landmark, address, station). Pass the point's latitude and longitude; returns hotels with their distance in km, nearest first. Use this for 'hotels near X' instead of searching the whole city.",
+    func=None,
+    coroutine=hotels_nearby,
+    args_schema=HotelsNearbyInput,
+)
+
+class LookupInput(BaseModel):
+    query: str = Field(..., description="Hotel or city name as the user wrote it, typos allowed")
+    k: int = Field(10, description="Maximum number of matches")
+    kind: Optional[Literal["hotel", "destination"]] = Field(None, description="'hotel' to match only hotels, 'destination' only destination codes")
+
+hotel_lookup_tool = StructuredTool.from_function(
+    name="lookup_hotel_or_destination",
+    description="Resolve a loosely written hotel or city name to hotel IDs / Hotelbeds hotel codes and destination codes. Use this before other hotel tools instead of guessing a destination code.",
+    func=None,
+    coroutine=lookup_hotels,
+    args_schema=LookupInput,
+)
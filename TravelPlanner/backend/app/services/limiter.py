@@ -0,0 +1,160 @@
+"""Adaptive (AIMD) concurrency limiting for outbound provider calls"""
+
+import asyncio
+import heapq
+import httpx
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class Slot:
+    """Handle for one admitted call; report the upstream status through it."""
+
+    __slots__ = ("started", "latency", "status")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+        self.status: Optional[int] = None
+
+    def observe(self, status: int) -> None:
+        """Record the response status; latency is taken at this point, so a
+        streamed body being consumed afterwards does not count as upstream time."""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+            self.status = status
+
+
+# Set by a caller that needs to know when its call left the queue (hedged
+# attempts start their hedge timer there): called with None when the call
+# has to wait and with the Slot once it is admitted.
+on_admit: ContextVar[Optional[Callable[[Optional["Slot"]], None]]] = ContextVar(
+    "limiter_on_admit", default=None)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that follows the upstream's observed capacity.
+
+    Additive increase: each fast success raises the limit by ``1/limit``,
+    i.e. roughly +1 per full window of calls. Multiplicative decrease: a
+    throttling status (429/503), a timeout or a call slower than
+    ``target_latency`` scales it by ``backoff`` -- at most once per
+    ``cooldown`` seconds so one burst of errors does not collapse it.
+    Waiters are admitted lowest ``priority`` first, FIFO within a priority.
+    """
+
+    def __init__(self, name: str, initial: int = 16, min_limit: int = 1,
+                 max_limit: int = 64, target_latency: float = 3.0,
+                 backoff: float = 0.7, cooldown: float = 1.0):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.inflight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = 0
+        self._last_decrease = 0.0
+        self._stats = {"admitted": 0, "throttled": 0, "slow": 0,
+                       "errors": 0, "decreases": 0}
+
+    # --- admission ----------------------------------------------------------
+    def _has_room(self) -> bool:
+        return self.inflight < max(self.min_limit, int(self.limit))
+
+    async def _acquire(self, priority: int) -> None:
+        if self._has_room() and not self.queue_depth:
+            self.inflight += 1
+            return
+        hook = on_admit.get()
+        if hook is not None:
+            hook(None)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, self._seq, fut))
+        self._seq += 1
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():          # admitted, then cancelled
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_room():
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():                                  # waiter gave up
+                continue
+            self.inflight += 1
+            fut.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0) -> AsyncIterator[Slot]:
+        """Admit one call; use ``slot.observe(status)`` once a response arrives."""
+        await self._acquire(priority)
+        self._stats["admitted"] += 1
+        slot = Slot()
+        hook = on_admit.get()
+        if hook is not None:
+            hook(slot)
+        error: Optional[BaseException] = None
+        try:
+            yield slot
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release()
+            self._record(slot, error)
+
+    # --- adaptation ---------------------------------------------------------
+    def _record(self, slot: Slot, error: Optional[BaseException]) -> None:
+        if slot.latency is None:
+            slot.latency = time.monotonic() - slot.started
+        if isinstance(error, asyncio.CancelledError):
+            return                                          # says nothing about the upstream
+        if slot.status in THROTTLE_STATUSES:
+            self._stats["throttled"] += 1
+            self._decrease()
+        elif error is not None and slot.status is None:
+            self._stats["errors"] += 1
+            if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError)):
+                self._decrease()
+        elif slot.status is not None and slot.status >= 500:
+            self._stats["errors"] += 1
+        elif slot.latency > self.target_latency:
+            self._stats["slow"] += 1
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self._stats["decreases"] += 1
+        logger.info(f"Limiter {self.name}: limit lowered to {self.limit:.1f}")
+
+    # --- introspection ------------------------------------------------------
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": round(self.limit, 2), "inflight": self.inflight,
+                "queue_depth": self.queue_depth, **self._stats}
@@ -3,12 +3,23 @@ from groq import Groq
 import uuid
 from elevenlabs import ElevenLabs
 from tempfile import NamedTemporaryFile
+from app.core.settings import settings
+from app.services.http_clients import registry
 
-GROQ_API_KEY = os.environ['GROQ_API_KEY']
-ELEVENLABS_API_KEY = os.environ['ELEVENLABS_API_KEY']
+GROQ_API_KEY = settings.groq_api_key or os.environ.get('GROQ_API_KEY')
+ELEVENLABS_API_KEY = settings.elevenlabs_api_key or os.environ.get('ELEVENLABS_API_KEY')
 
 PATH = "/home/aleksei/" #replace with actual path once we deploy backend on a VM
 
+def _groq() -> Groq:
+    """Groq SDK client on the pooled "groq" connection (built once)."""
+    return registry.sdk("groq", lambda http: Groq(api_key=GROQ_API_KEY, http_client=http))
+
+def _elevenlabs() -> ElevenLabs:
+    """ElevenLabs SDK client on the pooled "elevenlabs" connection (built once)."""
+    return registry.sdk("elevenlabs",
+                        lambda http: ElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=http))
+
 def call_groq(system_prompt: str,
               user_message: str,
 		      conv_history: list) -> str:
@@ -28,7 +39,7 @@ def call_groq(system_prompt: str,
     [
     """
     
-    client = Groq(api_key = GROQ_API_KEY)
+    client = _groq()
     
     messages=[
         {
@@ -55,7 +66,7 @@ def call_groq(system_prompt: str,
     
 def stt(audio_bytes: bytes) -> str:
     
-    client = Groq(api_key=GROQ_API_KEY)
+    client = _groq()
     
     with NamedTemporaryFile(suffix = ".mp3", delete=True) as tmp:
         tmp.write(audio_bytes)
@@ -70,7 +81,7 @@ def stt(audio_bytes: bytes) -> str:
     return transcription.text
 
 def tts(text: str) -> bytes:
-    client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+    client = _elevenlabs()
     output = client.text_to_speech.convert(
         voice_id="JBFqnCBsd6RMkjVDRZzb",
         output_format="mp3_44100_128",
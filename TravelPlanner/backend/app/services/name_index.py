@@ -0,0 +1,268 @@
+"""Typo-tolerant trigram lookup over hotel names, destination names and codes"""
+
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalise(text: str) -> str:
+    """Casefolded, accent-free, punctuation-free text with single spaces."""
+    text = unicodedata.normalize("NFKD", str(text or "")).casefold()
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Trigrams of each word, padded so word starts weigh more than ends."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class TrigramIndex:
+    """Inverted index gram -> entry ids, frozen into NumPy arrays.
+
+    A lookup gathers candidates from the query's rarest grams only (a gram
+    such as "hot" from "Hotel" matches most entries and says little), keeps
+    the entries sharing the most of them, and rescores those few exactly:
+
+        score = 0.7 * |q & e| / |q|  +  0.3 * |q & e| / |q | e|
+
+    The first term lets a short query match inside a long name, the second
+    prefers tighter matches.
+    """
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._building: Dict[str, List[int]] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def add(self, text: str, payload: Dict[str, Any]) -> None:
+        norm = normalise(text)
+        grams = trigrams(norm)
+        if not grams:
+            return
+        entry = len(self.payloads)
+        self.texts.append(norm)
+        self.payloads.append(payload)
+        self._grams.append(grams)
+        for g in grams:
+            self._building.setdefault(g, []).append(entry)
+
+    def freeze(self) -> "TrigramIndex":
+        self._postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in self._building.items()}
+        self._building = {}
+        return self
+
+    def search(self, query: str, k: int = 10, min_score: float = 0.35,
+               max_grams: int = 8, max_postings: int = 20_000, rescore: int = 64,
+               accept: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Tuple[float, int]]:
+        """``(score, entry)`` of the best matches, best first. ``accept``
+        filters candidates before the ``rescore`` cut, so a filtered search
+        is not crowded out by entries it would reject."""
+        q = trigrams(normalise(query))
+        if not q or not self._postings:
+            return []
+        lists = sorted((p for p in (self._postings.get(g) for g in q) if p is not None), key=len)
+        if not lists:
+            return []
+        # rarest grams only, and no more postings than the budget once two are in
+        taken, volume = [], 0
+        for p in lists[:max_grams]:
+            if len(taken) >= 2 and volume + len(p) > max_postings:
+                break
+            taken.append(p)
+            volume += len(p)
+        counts = np.bincount(np.concatenate(taken))
+        ids = np.flatnonzero(counts)
+        if accept is not None:
+            ids = ids[[accept(self.payloads[i]) for i in ids.tolist()]]
+        counts = counts[ids]
+        if len(ids) > rescore:
+            top = np.argpartition(-counts, rescore - 1)[:rescore]
+            ids = ids[top]
+        scored = []
+        for entry in ids.tolist():
+            e = self._grams[entry]
+            shared = len(q & e)
+            score = 0.7 * shared / len(q) + 0.3 * shared / len(q | e)
+            if score >= min_score:
+                scored.append((score, entry))
+        scored.sort(key=lambda se: (-se[0], len(self.texts[se[1]]), se[1]))
+        return scored[:k]
+
+
+# --- hotels + destinations ----------------------------------------------------
+# Built from the HOTELS table (names and city codes), the Hotelbeds static
+# content known locally (persistent store + in-memory cache) and the
+# destination names of the destination resolver, then swapped in whole;
+# rebuilt every hotel_lookup_refresh_interval seconds.
+HotelRows = Callable[[], Iterable[Dict[str, Any]]]
+StaticNames = Callable[[], Iterable[Tuple[str, str]]]      # -> (code, name)
+DestinationNames = Callable[[], Iterable[Tuple[str, str, str, Optional[str]]]]
+                                                # -> (code, text, name, country)
+
+
+def _hotels_from_snowflake() -> Iterable[Dict[str, Any]]:
+    from app.services.snowflake_db import snowflake_db     # connects on import
+    after_id = 0
+    while True:
+        rows = snowflake_db.list_hotels(after_id, 50_000)
+        yield from rows
+        if len(rows) < 50_000:
+            return
+        after_id = rows[-1]["HOTEL_ID"]
+
+
+def _stored_names() -> Iterable[Tuple[str, str]]:
+    from app.services import hotel_ops
+    return hotel_ops.static_store_names()
+
+
+def _cached_names() -> Iterable[Tuple[str, str]]:
+    from app.services import hotel_ops
+    return hotel_ops.static_cache_names()
+
+
+def _destination_names() -> Iterable[Tuple[str, str, str, Optional[str]]]:
+    """Hotelbeds destination names and ``ALIASES``, from the resolver's
+    current snapshot (replaced whole on reload, so safe to read off the loop)."""
+    from app.services.destinations import ALIASES, destination_resolver
+    info = destination_resolver.info
+    for code, meta in info.items():
+        yield code, meta["name"], meta["name"], meta.get("country")
+    for alias, code in ALIASES.items():
+        if code in info:
+            yield code, alias, info[code]["name"], info[code].get("country")
+
+
+def build_index(hotel_rows: Iterable[Dict[str, Any]],
+                static_names: Iterable[Tuple[str, str]],
+                destination_names: Iterable[Tuple[str, str, str, Optional[str]]] = ()
+                ) -> TrigramIndex:
+    index = TrigramIndex()
+    cities: Dict[str, Optional[str]] = {}
+    for r in hotel_rows:
+        city = r.get("CITY_CODE")
+        if r.get("HOTEL_NAME"):
+            index.add(r["HOTEL_NAME"], {"kind": "hotel", "source": "db", "id": r["HOTEL_ID"],
+                                        "name": r["HOTEL_NAME"], "city_code": city})
+        if city:
+            cities.setdefault(city, r.get("COUNTRY_CODE"))
+    for code, name in static_names:
+        index.add(name, {"kind": "hotel", "source": "hotelbeds", "id": code, "name": name,
+                         "city_code": None})
+    names: Dict[str, str] = {}
+    for code, text, name, country in destination_names:
+        names.setdefault(code, name)
+        index.add(text, {"kind": "destination", "source": "hotelbeds", "id": code, "name": name,
+                         "city_code": code, "country_code": country})
+    for city, country in sorted(cities.items()):
+        index.add(city, {"kind": "destination", "source": "db", "id": city,
+                         "name": names.get(city, city), "city_code": city,
+                         "country_code": country})
+    return index.freeze()
+
+
+class HotelLookup:
+    def __init__(self, hotel_rows: HotelRows = _hotels_from_snowflake,
+                 stored_names: StaticNames = _stored_names,
+                 cached_names: StaticNames = _cached_names,
+                 destination_names: DestinationNames = _destination_names):
+        self.hotel_rows = hotel_rows
+        self.stored_names = stored_names
+        self.cached_names = cached_names
+        self.destination_names = destination_names
+        self.index = TrigramIndex().freeze()
+        self.destinations = 0
+        self.loaded_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reload(self, cached: Optional[List[Tuple[str, str]]] = None) -> int:
+        """Rebuild and swap the index. ``cached`` is the static-cache snapshot,
+        taken on the event loop when reloading from a worker thread."""
+        if cached is None:
+            cached = list(self.cached_names())
+        # The DB part may fail (no Snowflake in dev); static names still load.
+        try:
+            rows = list(self.hotel_rows())
+        except Exception as e:
+            logger.error(f"Hotel lookup: HOTELS not loaded: {e}")
+            rows = []
+        names = dict(self.stored_names())
+        names.update(cached)
+        destinations = list(self.destination_names())
+        self.index = build_index(rows, names.items(), destinations)
+        self.destinations = len(destinations)
+        self.loaded_at = time.time()
+        return len(self.index)
+
+    def lookup(self, query: str, k: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        accept = None if kind is None else (lambda p: p["kind"] == kind)
+        # a destination is indexed by its code, name and aliases: keep its best hit
+        seen, out = set(), []
+        for s, e in self.index.search(query, 3 * k, accept=accept):
+            payload = self.index.payloads[e]
+            if payload["kind"] == "destination":
+                if payload["id"] in seen:
+                    continue
+                seen.add(payload["id"])
+            out.append({**payload, "score": round(s, 3)})
+        return out[:k]
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                cached = list(self.cached_names())           # the cache is only safe on the loop
+                n = await asyncio.to_thread(self.reload, cached)
+                logger.info(f"Hotel lookup index loaded: {n} names")
+            except Exception as e:
+                logger.error(f"Hotel lookup index refresh failed: {e}")
+            # destination names load in the background at startup: retry soon
+            interval = settings.hotel_lookup_refresh_interval
+            await asyncio.sleep(interval if self.destinations else min(interval, 60))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self.index), "grams": len(self.index._postings),
+                "destinations": self.destinations, "loaded_at": self.loaded_at}
+
+
+hotel_lookup = HotelLookup()
+
+
+async def lookup_hotels(query: str, k: int = 10,
+                        kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Hotels and destinations whose name or code loosely matches ``query``;
+    ``kind`` restricts to "hotel" or "destination"."""
+    return hotel_lookup.lookup(query, k, kind)
@@ -0,0 +1,221 @@
+"""Per-destination lowest-price calendar: SQLite store + in-memory index"""
+
+import asyncio
+import datetime
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_calendar (
+    dest       TEXT NOT NULL,
+    night      TEXT NOT NULL,          -- check-in date of a 1-night stay
+    min_net    REAL,                   -- NULL when nothing was available
+    median_net REAL,
+    updated_at REAL NOT NULL,          -- epoch seconds
+    PRIMARY KEY (dest, night)
+) WITHOUT ROWID;
+"""
+
+# (night, min_net, median_net, updated_at); prices are NaN when unavailable
+Cell = Tuple[datetime.date, float, float, float]
+
+
+class CalendarStore:
+    """SQLite file written by the sweep job and read by API workers."""
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def upsert(self, dest: str, cells: Iterable[Cell]) -> int:
+        rows = [(dest, night.isoformat(), _null(lo), _null(med), updated_at)
+                for night, lo, med, updated_at in cells]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO price_calendar "
+                "(dest, night, min_net, median_net, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def rows(self) -> List[tuple]:
+        return self._conn.execute(
+            "SELECT dest, night, min_net, median_net, updated_at "
+            "FROM price_calendar ORDER BY dest, night"
+        ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+
+def _null(value: float) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+class _DestCalendar:
+    """Dense per-night arrays for one destination, starting at ``base``."""
+
+    __slots__ = ("base", "min_net", "median_net", "updated_at")
+
+    def __init__(self, base: int, size: int):
+        self.base = base                                    # date ordinal of index 0
+        self.min_net = np.full(size, np.nan, dtype=np.float32)
+        self.median_net = np.full(size, np.nan, dtype=np.float32)
+        self.updated_at = np.full(size, np.nan, dtype=np.float64)
+
+    def cover(self, first: int, last: int) -> None:
+        """Grow the arrays so ordinals ``first..last`` are addressable."""
+        new_base = min(self.base, first)
+        new_end = max(self.base + len(self.min_net), last + 1)
+        if new_base == self.base and new_end == self.base + len(self.min_net):
+            return
+        shift = self.base - new_base
+        for name in self.__slots__[1:]:
+            old = getattr(self, name)
+            grown = np.full(new_end - new_base, np.nan, dtype=old.dtype)
+            grown[shift:shift + len(old)] = old
+            setattr(self, name, grown)
+        self.base = new_base
+
+
+class CalendarIndex:
+    """In-memory calendar served in microseconds.
+
+    Loaded from a ``CalendarStore`` file and reloaded when the file changes
+    (checked at most every ``reload_every`` seconds, see ``refresh``); live
+    results can be overlaid with ``put`` without touching the file, and
+    survive reloads until the file has something newer.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_every: float = 5.0):
+        self.path = path
+        self.reload_every = reload_every
+        self._dests: Dict[str, _DestCalendar] = {}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+
+    def put(self, dest: str, night: datetime.date, min_net: float,
+            median_net: float, updated_at: float) -> None:
+        o = night.toordinal()
+        cal = self._dests.get(dest)
+        if cal is None:
+            cal = self._dests[dest] = _DestCalendar(o, 1)
+        cal.cover(o, o)
+        i = o - cal.base
+        cal.min_net[i], cal.median_net[i], cal.updated_at[i] = min_net, median_net, updated_at
+
+    def cells(self, dest: str, start: datetime.date, end: datetime.date) -> List[Cell]:
+        """Cells for check-in nights ``start..end``; unknown cells have NaN
+        prices and NaN ``updated_at``. Call ``refresh`` first to pick up a
+        newer file."""
+        first, last = start.toordinal(), end.toordinal()
+        cal = self._dests.get(dest)
+        out = []
+        for o in range(first, last + 1):
+            i = o - cal.base if cal is not None else -1
+            if cal is None or not 0 <= i < len(cal.min_net):
+                out.append((datetime.date.fromordinal(o), np.nan, np.nan, np.nan))
+            else:
+                out.append((datetime.date.fromordinal(o), float(cal.min_net[i]),
+                            float(cal.median_net[i]), float(cal.updated_at[i])))
+        return out
+
+    @staticmethod
+    def _build(rows: Iterable[tuple]) -> Dict[str, _DestCalendar]:
+        by_dest: Dict[str, List[tuple]] = {}
+        for row in rows:
+            by_dest.setdefault(row[0], []).append(row)
+        dests: Dict[str, _DestCalendar] = {}
+        for dest, dest_rows in by_dest.items():
+            ords = np.array([datetime.date.fromisoformat(r[1]).toordinal() for r in dest_rows])
+            cal = dests[dest] = _DestCalendar(int(ords.min()), int(ords.max() - ords.min()) + 1)
+            i = ords - cal.base
+            cal.min_net[i] = [np.nan if r[2] is None else r[2] for r in dest_rows]
+            cal.median_net[i] = [np.nan if r[3] is None else r[3] for r in dest_rows]
+            cal.updated_at[i] = [r[4] for r in dest_rows]
+        return dests
+
+    def _swap(self, dests: Dict[str, _DestCalendar]) -> None:
+        """Install a reloaded index, keeping cells of the current one (live
+        ``put`` overlays) that are newer than what the file holds."""
+        for dest, old in self._dests.items():
+            known = np.flatnonzero(np.isfinite(old.updated_at))
+            if not len(known):
+                continue
+            cal = dests.get(dest)
+            if cal is None:
+                cal = dests[dest] = _DestCalendar(old.base + int(known[0]), 1)
+            cal.cover(old.base + int(known[0]), old.base + int(known[-1]))
+            for i in known.tolist():
+                j = old.base + i - cal.base
+                if not cal.updated_at[j] >= old.updated_at[i]:
+                    cal.min_net[j], cal.median_net[j] = old.min_net[i], old.median_net[i]
+                    cal.updated_at[j] = old.updated_at[i]
+        self._dests = dests
+
+    def load_rows(self, rows: Iterable[tuple]) -> None:
+        self._swap(self._build(rows))
+
+    def _due(self) -> bool:
+        if self.path is None:
+            return False
+        now = time.monotonic()
+        if now - self._checked < self.reload_every:
+            return False
+        self._checked = now
+        return True
+
+    def _read(self) -> Optional[Tuple[float, Dict[str, _DestCalendar]]]:
+        """``(mtime, calendars)`` when the file changed since the last load
+        (does file I/O: run it off the event loop)."""
+        try:
+            mtime = max(os.stat(p).st_mtime for p in (self.path, self.path + "-wal")
+                        if os.path.exists(p))
+        except ValueError:                                  # file does not exist yet
+            return None
+        if mtime == self._mtime:
+            return None
+        try:
+            store = CalendarStore(self.path, readonly=True)
+            try:
+                return mtime, self._build(store.rows())
+            finally:
+                store.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Price calendar {self.path} not loaded: {e}")
+            return None
+
+    def _install(self, read: Optional[Tuple[float, Dict[str, _DestCalendar]]]) -> None:
+        if read is not None:
+            self._mtime, dests = read
+            self._swap(dests)
+            logger.info(f"Price calendar reloaded: {len(self._dests)} destinations")
+
+    async def refresh(self) -> None:
+        """Reload when the file changed: read and build in a worker thread,
+        swap on the loop, so requests never wait on SQLite."""
+        if self._due():
+            self._install(await asyncio.to_thread(self._read))
+
+    def maybe_reload(self) -> None:
+        """``refresh`` for code outside the event loop."""
+        if self._due():
+            self._install(self._read())
+
+    def destinations(self) -> List[str]:
+        return sorted(self._dests)
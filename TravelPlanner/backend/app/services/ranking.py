@@ -0,0 +1,119 @@
+"""Multi-criteria scoring, weighted top-k and Pareto fronts over a RateTable"""
+
+from __future__ import annotations
+
+import numpy as np
+from typing import Dict, Mapping, Optional
+
+from app.services.rate_table import RateTable
+from app.services.topk import top_k_indices
+
+CRITERIA = ("price", "category", "promotions", "board", "flexibility")
+
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "price": 0.4, "category": 0.25, "promotions": 0.1, "board": 0.1, "flexibility": 0.15,
+}
+
+# More meals included ranks higher; unknown board codes count as room only.
+BOARD_RANK = {"RO": 0, "SC": 0, "BB": 1, "HB": 2, "FB": 3, "AI": 4, "TI": 4}
+
+
+def normalise_weights(weights: Optional[Mapping[str, float]]) -> Dict[str, float]:
+    """Weights over ``CRITERIA`` scaled to sum to 1 (defaults when empty)."""
+    if not weights:
+        return dict(DEFAULT_WEIGHTS)
+    unknown = set(weights) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown ranking criteria: {', '.join(sorted(unknown))}")
+    if any(w < 0 for w in weights.values()):
+        raise ValueError("Ranking weights must not be negative")
+    total = float(sum(weights.values()))
+    if total == 0:
+        raise ValueError("At least one ranking weight must be positive")
+    return {c: float(weights.get(c, 0.0)) / total for c in CRITERIA}
+
+
+def _scaled(col: np.ndarray) -> np.ndarray:
+    lo, hi = col.min(), col.max()
+    if hi <= lo:
+        return np.ones(len(col))
+    return (col - lo) / (hi - lo)
+
+
+def criteria_scores(table: RateTable, check_in: float, now: float) -> np.ndarray:
+    """(rows, len(CRITERIA)) matrix of per-criterion scores in [0, 1],
+    higher is better.
+
+    price        cheapest rate in the table 1, dearest 0
+    category     star category / 5
+    promotions   promotions relative to the most promoted rate
+    board        ``BOARD_RANK`` / 4
+    flexibility  share of the time until check-in that stays penalty-free;
+                 1 without any penalty, 0 for non-refundable rates
+    """
+    n = len(table)
+    scores = np.empty((n, len(CRITERIA)), dtype=np.float64)
+    if n == 0:
+        return scores
+    net = np.where(np.isfinite(table.net), table.net, np.nan)
+    finite = ~np.isnan(net)
+    price = np.zeros(n)
+    if finite.any():
+        price[finite] = 1.0 - _scaled(net[finite])
+    scores[:, 0] = price
+    scores[:, 1] = np.clip(table.category / 5.0, 0.0, 1.0)
+    top_promos = table.promos.max()
+    scores[:, 2] = table.promos / top_promos if top_promos > 0 else 0.0
+    board_rank = np.array([BOARD_RANK.get(code, 0) for code in table.boards.values] or [0],
+                          dtype=np.float64) / 4.0
+    scores[:, 3] = board_rank[table.board]
+    horizon = max(check_in - now, 1.0)
+    flex = np.clip((table.cxl_from - now) / horizon, 0.0, 1.0)    # inf -> 1
+    nrf = table.rate_classes.get("NRF")
+    if nrf >= 0:
+        flex[table.rate_class == nrf] = 0.0
+    scores[:, 4] = flex
+    return scores
+
+
+def best_per_hotel(table: RateTable, score: np.ndarray,
+                   rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Highest-scoring row per hotel among ``rows`` (all rows by default);
+    ties go to the cheaper rate, then the earlier row."""
+    if rows is None:
+        rows = np.arange(len(table))
+    if len(rows) == 0:
+        return rows
+    order = rows[np.lexsort((rows, table.net[rows], -score[rows], table.hotel[rows]))]
+    _, first = np.unique(table.hotel[order], return_index=True)
+    return order[first]
+
+
+def weighted_top_k(table: RateTable, score: np.ndarray, k: int,
+                   rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Positions of the ``k`` best ``rows`` by score (price breaks ties)."""
+    if rows is None:
+        rows = np.arange(len(table))
+    picked = top_k_indices([-score[rows], table.net[rows]], k)
+    return rows[picked]
+
+
+def pareto_front(points: np.ndarray) -> np.ndarray:
+    """Indices of the non-dominated rows of ``points`` (maximising every column).
+
+    Identical vectors are collapsed first. The remaining point with the
+    largest coordinate sum can never be dominated, so it joins the front and
+    everything it dominates is dropped in one vectorised step; the loop runs
+    once per front point rather than once per row.
+    """
+    if len(points) == 0:
+        return np.arange(0)
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    remaining = np.argsort(-unique.sum(axis=1), kind="stable")
+    keep = []
+    while len(remaining):
+        best, rest = remaining[0], remaining[1:]
+        keep.append(best)
+        remaining = rest[~np.all(unique[rest] <= unique[best], axis=1)]
+    return np.flatnonzero(np.isin(inverse, keep))
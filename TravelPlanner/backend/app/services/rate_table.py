@@ -0,0 +1,309 @@
+"""Columnar, NumPy-backed view over Hotelbeds availability rates"""
+
+from __future__ import annotations
+
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence
+from app.services.topk import top_k_indices
+
+NO_PENALTY = np.inf          # cxl_from value of a rate without cancellation policies
+
+
+def _category(code) -> int:
+    """Hotelbeds categoryCode ('4EST', '5LUX', ...) -> star count, 0 if unknown."""
+    digits = ""
+    for ch in str(code or ""):
+        if not ch.isdigit():
+            break
+        digits += ch
+    return int(digits) if digits else 0
+
+
+def _epoch(ts: str) -> float:
+    """ISO timestamp -> UTC epoch seconds (naive timestamps are taken as UTC)."""
+    dt = datetime.fromisoformat(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def hotel_list(raw: dict) -> list:
+    """Hotels of an availability payload.
+
+    APItude nests them as ``{"hotels": {"hotels": [...], "total": n}}``; a
+    flat ``{"hotels": [...]}`` is accepted as well."""
+    hotels = raw.get("hotels") or []
+    if isinstance(hotels, dict):
+        hotels = hotels.get("hotels") or []
+    return hotels
+
+
+def _row_values(hotel: dict, rate: dict) -> Dict[str, float]:
+    cps = rate.get("cancellationPolicies") or ()
+    net = float(rate.get("net", "nan"))
+    return {
+        "net": np.inf if net != net else net,
+        "category": _category(hotel.get("categoryCode")),
+        "promos": len(rate.get("promotions") or ()),
+        "cxl_from": min((_epoch(c["from"]) for c in cps), default=NO_PENALTY),
+    }
+
+
+def rate_sort_key(hotel: dict, rate: dict, order: Sequence[str]) -> tuple:
+    """Key of a single streamed rate under an order spec, consistent with
+    ``RateTable.sort_keys`` (smaller is better)."""
+    values = _row_values(hotel, rate)
+    return tuple(-values[spec[1:]] if spec.startswith("-") else values[spec]
+                 for spec in order)
+
+
+class _Interner:
+    """Maps repeated strings (hotel codes, board codes, ...) to small ints."""
+
+    __slots__ = ("values", "_index")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._index: Dict[Any, int] = {}
+
+    def __call__(self, value) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def get(self, value) -> int:
+        return self._index.get(value, -1)
+
+
+class _SortedColumn:
+    """Row positions of one column in ascending value order, built once so
+    range predicates on that column are two binary searches."""
+
+    __slots__ = ("order", "values")
+
+    def __init__(self, column: np.ndarray):
+        self.order = np.argsort(column, kind="stable")
+        self.values = column[self.order]
+
+    def between(self, low=-np.inf, high=np.inf, low_open: bool = False,
+                high_open: bool = False) -> np.ndarray:
+        """Positions with ``low <= value <= high`` (ends open on request),
+        in row order."""
+        lo = np.searchsorted(self.values, low, side="right" if low_open else "left")
+        hi = np.searchsorted(self.values, high, side="left" if high_open else "right")
+        return np.sort(self.order[lo:hi]) if hi > lo else self.order[:0]
+
+
+class RateTable:
+    """One row per rate, one NumPy array per column we filter or rank on.
+
+    Columns
+        net        float64  net price (NaN when missing)
+        hotel      int32    index into ``hotel_codes``
+        category   int8     hotel star category parsed from ``categoryCode``
+        board      int16    index into ``boards``
+        rate_class int16    index into ``rate_classes``
+        promos     int16    number of promotions
+        cxl_from   float64  earliest cancellation-penalty date as epoch
+                            seconds, ``NO_PENALTY`` when there is none
+
+    The original rate dicts are only referenced, never copied or mutated;
+    ``records()`` turns the final top-N rows back into dicts for the agent.
+    Sorted indexes over ``cxl_from`` and ``rate_class`` are built on first
+    use and kept for the table's lifetime (see ``select``).
+    """
+
+    __slots__ = ("net", "hotel", "category", "board", "rate_class", "promos",
+                 "cxl_from", "hotel_codes", "boards", "rate_classes", "_row", "_rates",
+                 "_indexes")
+
+    def __init__(self, net, hotel, category, board, rate_class, promos, cxl_from,
+                 hotel_codes, boards, rate_classes, row, rates):
+        self.net = net
+        self.hotel = hotel
+        self.category = category
+        self.board = board
+        self.rate_class = rate_class
+        self.promos = promos
+        self.cxl_from = cxl_from
+        self.hotel_codes = hotel_codes
+        self.boards = boards
+        self.rate_classes = rate_classes
+        self._row = row
+        self._rates = rates
+        self._indexes: Dict[str, _SortedColumn] = {}
+
+    # --- construction -------------------------------------------------------
+    @classmethod
+    def from_availability(cls, raw: dict) -> "RateTable":
+        if not isinstance(raw, dict):
+            raise ValueError(f"Expected a dict availability payload, got {type(raw)}")
+        return cls.from_hotels(hotel_list(raw))
+
+    @classmethod
+    def from_hotels(cls, hotels: Iterable[dict]) -> "RateTable":
+        hotel_codes, boards, rate_classes = _Interner(), _Interner(), _Interner()
+        net: List[float] = []
+        hotel: List[int] = []
+        category: List[int] = []
+        board: List[int] = []
+        rate_class: List[int] = []
+        promos: List[int] = []
+        cxl_from: List[float] = []
+        rates: List[dict] = []
+
+        for h in hotels:
+            h_idx = hotel_codes(h["code"])
+            h_cat = _category(h.get("categoryCode"))
+            for room in h.get("rooms", []):
+                for rate in room.get("rates", []):
+                    net.append(float(rate.get("net", "nan")))
+                    hotel.append(h_idx)
+                    category.append(h_cat)
+                    board.append(boards(rate.get("boardCode")))
+                    rate_class.append(rate_classes(rate.get("rateClass")))
+                    promos.append(len(rate.get("promotions") or ()))
+                    cps = rate.get("cancellationPolicies") or ()
+                    cxl_from.append(min((_epoch(c["from"]) for c in cps),
+                                        default=NO_PENALTY))
+                    rates.append(rate)
+
+        n = len(rates)
+        return cls(
+            net=np.asarray(net, dtype=np.float64),
+            hotel=np.asarray(hotel, dtype=np.int32),
+            category=np.asarray(category, dtype=np.int8),
+            board=np.asarray(board, dtype=np.int16),
+            rate_class=np.asarray(rate_class, dtype=np.int16),
+            promos=np.asarray(promos, dtype=np.int16),
+            cxl_from=np.asarray(cxl_from, dtype=np.float64),
+            hotel_codes=hotel_codes.values,
+            boards=boards,
+            rate_classes=rate_classes,
+            row=np.arange(n, dtype=np.int64),
+            rates=rates,
+        )
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated memory of the columns, the rate references and the two
+        sorted indexes ``select`` may build (the rates themselves belong to
+        the payload)."""
+        columns = (self.net, self.hotel, self.category, self.board, self.rate_class,
+                   self.promos, self.cxl_from, self._row)
+        indexes = 8 * len(self._row) * 2 + self.cxl_from.nbytes + self.rate_class.nbytes
+        return sum(c.nbytes for c in columns) + 8 * len(self._rates) + indexes
+
+    # --- filtering ----------------------------------------------------------
+    def take(self, selector) -> "RateTable":
+        """Sub-table for a boolean mask or an index array (no row copies)."""
+        return RateTable(
+            self.net[selector], self.hotel[selector], self.category[selector],
+            self.board[selector], self.rate_class[selector],
+            self.promos[selector], self.cxl_from[selector],
+            self.hotel_codes, self.boards, self.rate_classes,
+            self._row[selector], self._rates,
+        )
+
+    def board_is(self, code: str) -> np.ndarray:
+        return self.board == self.boards.get(code)
+
+    def rate_class_is(self, code: str) -> np.ndarray:
+        return self.rate_class == self.rate_classes.get(code)
+
+    def free_cancellation(self) -> np.ndarray:
+        return np.isinf(self.cxl_from)
+
+    def penalty_free_until(self, deadline: str) -> np.ndarray:
+        """Rates whose first penalty starts strictly after ``deadline``."""
+        return self.cxl_from > _epoch(deadline)
+
+    def _index(self, column: str) -> _SortedColumn:
+        index = self._indexes.get(column)
+        if index is None:
+            index = self._indexes[column] = _SortedColumn(getattr(self, column))
+        return index
+
+    def select(self, *, rate_class: str | None = None, free_cancellation: bool = False,
+               penalty_free_after: str | None = None, penalty_from_before: str | None = None,
+               board: str | None = None, min_net: float | None = None,
+               max_net: float | None = None) -> np.ndarray:
+        """Row positions (ascending) matching every given predicate.
+
+        Cancellation and rate-class predicates are answered from the sorted
+        indexes by binary search; board and price are then checked only on
+        those candidates, so nothing scans the whole table when an indexed
+        predicate is given.
+
+        ``penalty_free_after=D``     first penalty strictly after D
+                                     (``penalty_free_until``)
+        ``penalty_from_before=D2``   ... and on or before D2 (a range)
+        ``free_cancellation=True``   no penalty at all
+        """
+        candidates = None
+
+        def narrow(positions: np.ndarray) -> None:
+            nonlocal candidates
+            candidates = positions if candidates is None else np.intersect1d(
+                candidates, positions, assume_unique=True)
+
+        if free_cancellation:
+            narrow(self._index("cxl_from").between(NO_PENALTY, NO_PENALTY))
+        elif penalty_free_after is not None or penalty_from_before is not None:
+            low = _epoch(penalty_free_after) if penalty_free_after else -np.inf
+            high = _epoch(penalty_from_before) if penalty_from_before else np.inf
+            narrow(self._index("cxl_from").between(low, high, low_open=True))
+        if rate_class is not None:
+            code = self.rate_classes.get(rate_class)
+            narrow(self._index("rate_class").between(code, code) if code >= 0
+                   else self._row[:0])
+        if candidates is None:
+            candidates = np.arange(len(self))
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if board is not None:
+            keep &= self.board[candidates] == self.boards.get(board)
+        if min_net is not None:
+            keep &= self.net[candidates] >= min_net
+        if max_net is not None:
+            keep &= self.net[candidates] <= max_net
+        return candidates[keep]
+
+    # --- ranking ------------------------------------------------------------
+    def sort_keys(self, order: Sequence[str]) -> List[np.ndarray]:
+        """Column arrays for an order spec like ``("net", "-promos")``."""
+        keys = []
+        for spec in order:
+            name = spec.lstrip("-")
+            col = getattr(self, name)
+            if name == "net":                                  # NaN prices rank last
+                col = np.where(np.isnan(col), np.inf, col)
+            keys.append(-col.astype(np.float64) if spec.startswith("-") else col)
+        return keys
+
+    def top_k(self, k: int, order: Sequence[str] = ("net",)) -> np.ndarray:
+        """Row positions of the first ``k`` rows under ``order``.
+
+        Uses partial selection, so the cost is ~O(n) for the small ``k`` the
+        agent tools ask for; ties are broken stably by row position."""
+        return top_k_indices(self.sort_keys(order), k)
+
+    # --- materialisation ----------------------------------------------------
+    def hotel_code_set(self) -> List[Any]:
+        """Distinct hotel codes present, in first-seen order."""
+        return [self.hotel_codes[i] for i in dict.fromkeys(self.hotel.tolist())]
+
+    def records(self, positions: Sequence[int] | np.ndarray | None = None) -> List[dict]:
+        """Rate dicts (with ``hotelCode``) for the given row positions."""
+        if positions is None:
+            positions = range(len(self))
+        return [
+            {**self._rates[self._row[i]], "hotelCode": self.hotel_codes[self.hotel[i]]}
+            for i in positions
+        ]
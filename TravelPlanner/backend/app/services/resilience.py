@@ -0,0 +1,189 @@
+"""Hedged requests and budgeted retries for outbound provider calls"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from app.services.limiter import Slot, on_admit
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LatencyTracker:
+    """Sliding window of successful attempt latencies for one endpoint.
+
+    The hedge delay is the window's p95, clamped to ``[floor, ceiling]``;
+    until ``min_samples`` latencies are seen ``default`` is used instead.
+    """
+
+    def __init__(self, window: int = 256, default: float = 2.0,
+                 floor: float = 0.1, ceiling: float = 10.0, min_samples: int = 20):
+        self._samples: deque = deque(maxlen=window)
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self.min_samples = min_samples
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def quantile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        if len(self._samples) < self.min_samples:
+            return self.default
+        return min(self.ceiling, max(self.floor, self.quantile(0.95)))
+
+    def stats(self) -> Dict[str, float | None]:
+        return {"samples": len(self._samples), "p50": self.quantile(0.5),
+                "p95": self.quantile(0.95), "hedge_delay": self.hedge_delay()}
+
+
+class RetryBudget:
+    """Token bucket bounding retries and hedges to a fraction of traffic.
+
+    Every first attempt deposits ``ratio`` tokens, every retry or hedge
+    spends one, and ``min_per_sec`` tokens trickle in so a quiet process can
+    still retry. During an outage first attempts keep failing, the bucket
+    drains and extra attempts stop instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_sec: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self.stats = {"retries": 0, "hedges": 0, "hedge_wins": 0, "exhausted": 0}
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + amount
+                           + (now - self._updated) * self.min_per_sec)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        self.stats["exhausted"] += 1
+        return False
+
+    def snapshot(self) -> Dict[str, float]:
+        self._refill()
+        return {"tokens": round(self._tokens, 2), **self.stats}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors worth another attempt: transport failures and 429/5xx."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in TRANSIENT_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+class _Admission:
+    """Limiter admission of one attempt (see limiter.on_admit)."""
+
+    def __init__(self):
+        self.queued = False
+        self.slot: Optional[Slot] = None
+        self.admitted = asyncio.Event()
+
+    def __call__(self, slot: Optional[Slot]) -> None:
+        if slot is None:
+            self.queued = True
+        elif self.slot is None:
+            self.slot = slot
+            self.admitted.set()
+
+
+async def _timed(attempt: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                 admission: _Admission) -> T:
+    """Run one attempt; record the upstream latency the limiter slot measured
+    after admission (queue wait excluded), or the whole attempt when it did
+    not go through a limiter."""
+    on_admit.set(admission)
+    started = time.monotonic()
+    result = await attempt()
+    slot = admission.slot
+    tracker.record(slot.latency if slot is not None and slot.latency is not None
+                   else time.monotonic() - started)
+    return result
+
+
+async def _until_admitted(first: asyncio.Future, admission: _Admission) -> None:
+    await asyncio.sleep(0)                                  # let the attempt reach its limiter
+    if not admission.queued or admission.admitted.is_set():
+        return
+    admitted = asyncio.ensure_future(admission.admitted.wait())
+    try:
+        await asyncio.wait({first, admitted}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        admitted.cancel()
+
+
+async def _hedged_once(attempt: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                       budget: RetryBudget) -> T:
+    admission = _Admission()
+    first = asyncio.ensure_future(_timed(attempt, tracker, admission))
+    tasks = {first}
+    try:
+        await _until_admitted(first, admission)             # queue time is not upstream time
+        done, _ = await asyncio.wait(tasks, timeout=tracker.hedge_delay())
+        if not done and budget.try_spend():
+            budget.stats["hedges"] += 1
+            tasks.add(asyncio.ensure_future(_timed(attempt, tracker, _Admission())))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        budget.stats["hedge_wins"] += 1
+                    return task.result()
+        raise first.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()                            # mark a losing failure as seen
+
+
+async def hedged_call(attempt: Callable[[], Awaitable[T]], tracker: LatencyTracker,
+                      budget: RetryBudget, *, max_retries: int = 2,
+                      backoff: float = 0.25) -> T:
+    """Run ``attempt`` with a hedge after the tracker's p95 and up to
+    ``max_retries`` full-jitter retries on transient errors; both extra
+    kinds of attempt are paid for from ``budget``. When the attempt waits
+    in an AdaptiveLimiter the hedge delay counts from its admission."""
+    budget.deposit()
+    retry = 0
+    while True:
+        try:
+            return await _hedged_once(attempt, tracker, budget)
+        except Exception as e:
+            if retry >= max_retries or not is_transient(e) or not budget.try_spend():
+                raise
+            budget.stats["retries"] += 1
+            delay = random.uniform(0, backoff * 2 ** retry)
+            retry += 1
+            logger.warning(f"Transient upstream error ({e!r}); retry {retry} in {delay:.2f}s")
+            await asyncio.sleep(delay)
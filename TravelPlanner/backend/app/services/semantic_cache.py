@@ -0,0 +1,341 @@
+"""Semantic cache of chat replies for near-duplicate first questions"""
+
+import asyncio
+import datetime
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.settings import settings
+from app.services.destinations import destination_resolver
+from app.services.name_index import normalise
+
+logger = logging.getLogger(__name__)
+
+Embed = Callable[[List[str]], np.ndarray]     # texts -> (n, dim) unit vectors
+
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+
+_MONTH_NUMBERS = {name: i for i, names in enumerate(
+    [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+     ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+     ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+     ("dec", "december")], 1) for name in names}
+_MONTH = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?" \
+         r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_UNTIL = r"\s*(?:-|–|—|to|until|till|through|and)\s*"
+_YEAR = r"(?:,?\s*(\d{4}))?"
+
+# "15/03", "15/03/2025" (day first unless that cannot be a month)
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+# "march 3", "march 3-5", "march 3 to april 2", "mar 3rd, 2026"
+_MONTH_FIRST = re.compile(rf"\b{_MONTH}\s+{_DAY}(?:{_UNTIL}(?:{_MONTH}\s+)?{_DAY})?{_YEAR}\b")
+# "3 march", "3-5 march", "the 3rd to the 5th of march"
+_DAY_FIRST = re.compile(rf"\b(?:the\s+)?{_DAY}(?:{_UNTIL}(?:the\s+)?{_DAY})?\s+(?:of\s+)?{_MONTH}{_YEAR}\b")
+# "the 12th", "the 12th to the 14th" (month inferred from today)
+_ORDINAL = re.compile(r"\bthe\s+(\d{1,2})(?:st|nd|rd|th)"
+                      rf"(?:{_UNTIL}(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)?)?\b")
+
+_COUNT = r"(\d+|one|two|three|four|five|six|seven|eight|nine|ten)"
+_NUMBER_WORDS = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten".split())}
+_OCCUPANCY = re.compile(rf"\b{_COUNT}\s+(adults?|grown ?ups?|guests?|people|persons?"
+                        r"|travell?ers?|children|child|kids?|rooms?|nights?)\b")
+_OCCUPANCY_SLOT = {"adult": "adults", "grown": "adults", "guest": "adults", "people": "adults",
+                   "person": "adults", "travel": "adults", "child": "children",
+                   "kid": "children", "room": "rooms", "night": "nights"}
+
+# Anything that still looks like a quantity or date after slot extraction
+# makes a query uncacheable rather than risk reusing another one's answer.
+_LEFTOVER = re.compile(r"\d|\b(?:two|three|four|five|six|seven|eight|nine|ten|"
+                       r"january|february|march|april|june|july|august|september|"
+                       r"october|november|december)\b")
+
+
+def _weekend(today: datetime.date, weeks_ahead: int) -> Tuple[str, str]:
+    saturday = today + datetime.timedelta(days=(5 - today.weekday()) % 7 + 7 * weeks_ahead)
+    return saturday.isoformat(), (saturday + datetime.timedelta(days=1)).isoformat()
+
+
+# Relative date phrases -> concrete dates, so "next weekend" asked on two
+# different weeks never shares an answer. Longest phrases first.
+_RELATIVE: List[Tuple[str, Callable[[datetime.date], Tuple[str, ...]]]] = [
+    ("next weekend", lambda d: _weekend(d, 1)),
+    ("this weekend", lambda d: _weekend(d, 0)),
+    ("next week", lambda d: ((d + datetime.timedelta(days=7 - d.weekday())).isoformat(),)),
+    ("tomorrow", lambda d: ((d + datetime.timedelta(days=1)).isoformat(),)),
+    ("tonight", lambda d: (d.isoformat(),)),
+    ("today", lambda d: (d.isoformat(),)),
+]
+
+
+def _on_or_after(today: datetime.date, month: int, day: int, year: Optional[str]) -> datetime.date:
+    """The date ``day``/``month`` in ``year``, or its next occurrence from today."""
+    if year:
+        return datetime.date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+    date = datetime.date(today.year, month, day)
+    return date if date >= today else date.replace(year=today.year + 1)
+
+
+def _next_day_of_month(after: datetime.date, day: int) -> datetime.date:
+    """First date on or after ``after`` that falls on ``day`` of its month."""
+    year, month = after.year, after.month
+    if day < after.day:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return datetime.date(year, month, day)
+
+
+def _absolute_dates(text: str, today: datetime.date) -> Tuple[str, List[str]]:
+    """Replace day/month dates in casefolded ``text`` with "date"; returns
+    the text and the ISO dates found. Raises ValueError on impossible dates."""
+    dates: List[datetime.date] = []
+
+    def numeric(m):
+        a, b, year = int(m[1]), int(m[2]), m[3]
+        day, month = (b, a) if b > 12 >= a else (a, b)
+        dates.append(_on_or_after(today, month, day, year))
+        return " date "
+
+    def span(month1, day1, month2, day2, year):
+        first = _on_or_after(today, _MONTH_NUMBERS[month1], int(day1), year)
+        dates.append(first)
+        if day2:
+            month = _MONTH_NUMBERS[month2] if month2 else first.month
+            last = datetime.date(first.year, month, int(day2))
+            dates.append(last if last > first else last.replace(year=first.year + 1))
+        return " date "
+
+    def ordinal(m):
+        first = _next_day_of_month(today, int(m[1]))
+        dates.append(first)
+        if m[2]:
+            dates.append(_next_day_of_month(first + datetime.timedelta(days=1), int(m[2])))
+        return " date "
+
+    text = _NUMERIC_DATE.sub(numeric, text)
+    text = _MONTH_FIRST.sub(lambda m: span(m[1], m[2], m[3] or m[1], m[4], m[5]), text)
+    text = _DAY_FIRST.sub(lambda m: span(m[3], m[1], m[3], m[2], m[4]), text)
+    text = _ORDINAL.sub(ordinal, text)
+    return text, [d.isoformat() for d in dates]
+
+
+def _occupancy(text: str) -> Tuple[str, Tuple[str, ...]]:
+    counts: Dict[str, int] = {}
+
+    def count(m):
+        n = int(m[1]) if m[1].isdigit() else _NUMBER_WORDS[m[1]]
+        slot = next(v for k, v in _OCCUPANCY_SLOT.items() if m[2].startswith(k))
+        counts[slot] = counts.get(slot, 0) + n
+        return f" {slot} "
+
+    text = _OCCUPANCY.sub(count, text)
+    return text, tuple(f"{k}={v}" for k, v in sorted(counts.items()))
+
+
+@dataclass
+class Slots:
+    destination: Optional[str]
+    dates: Tuple[str, ...]
+    masked: str                      # normalised query with slot values replaced
+    occupancy: Tuple[str, ...] = ()  # ("adults=2", "rooms=1")
+    cacheable: bool = True           # False when a date or number was left unparsed
+
+    @property
+    def key(self) -> Tuple[Optional[str], Tuple[str, ...], Tuple[str, ...]]:
+        return self.destination, self.dates, self.occupancy
+
+
+def extract_slots(query: str, today: Optional[datetime.date] = None) -> Slots:
+    """Destination code, dates and party size mentioned in ``query``.
+
+    The text that gets embedded has them replaced by placeholders: whether
+    two questions share an answer depends on the wording around the slots,
+    while the slots themselves must match exactly. A query naming more than
+    one destination, or that still holds digits, number words or month names
+    afterwards, is marked uncacheable.
+    """
+    today = today or datetime.date.today()
+    dates = [f"{y}-{m}-{d}" for y, m, d in _ISO_DATE.findall(query)]
+    text = _ISO_DATE.sub(" date ", query.casefold())
+    cacheable = True
+    try:
+        text, found = _absolute_dates(text, today)
+        dates.extend(found)
+    except ValueError:                                     # "february 30"
+        cacheable = False
+    text, occupancy = _occupancy(text)
+    text = normalise(text)
+    for phrase, resolve in _RELATIVE:
+        if re.search(rf"\b{phrase}\b", text):
+            dates.extend(resolve(today))
+            text = re.sub(rf"\b{phrase}\b", "date", text)
+    found = destination_resolver.mentioned(text)
+    codes = {code for code, _ in found}
+    destination = codes.pop() if len(codes) == 1 else None
+    for _, phrase in found:
+        text = re.sub(rf"\b{re.escape(phrase)}\b", "place", text)
+    # "lisbon or madrid", "barcelona then roma" and ambiguous names have no
+    # single destination to key on
+    cacheable = (cacheable and (not found or destination is not None)
+                 and not destination_resolver.mentioned(text)
+                 and not _LEFTOVER.search(text))
+    return Slots(destination, tuple(sorted(set(dates))), " ".join(text.split()),
+                 occupancy, cacheable)
+
+
+@dataclass
+class CachedReply:
+    reply: str
+    tools_used: Optional[List[str]]
+    hotel_data: Optional[List[Dict[str, Any]]]
+    created: float
+    similarity: float = 1.0
+
+
+def _sentence_transformer() -> Optional[Embed]:
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.warning("sentence-transformers not installed; semantic chat cache disabled")
+        return None
+    model = SentenceTransformer(settings.semantic_cache_model)
+    return lambda texts: model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+class SemanticCache:
+    """Replies keyed by (slots, query embedding).
+
+    Entries are bucketed by their exact slot key; a lookup compares the
+    query's unit vector with the bucket's rows in one matrix product and
+    returns the best reply at or above ``threshold`` cosine similarity that
+    is younger than ``ttl``. At most ``max_entries`` are kept, oldest out.
+    The embedding model loads off the event loop, at startup (``start``) or
+    on first use. Replies are stored in the background (``schedule_store``)
+    so the user never waits on an embedding.
+    """
+
+    def __init__(self, embed: Optional[Embed] = None,
+                 threshold: float = settings.semantic_cache_threshold,
+                 ttl: float = settings.semantic_cache_ttl,
+                 max_entries: int = settings.semantic_cache_max_entries):
+        self._embed = embed
+        self._loaded = embed is not None
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._buckets: Dict[Tuple, Tuple[np.ndarray, List[CachedReply]]] = {}
+        self._order: "deque[Tuple[Tuple, CachedReply]]" = deque()
+        self._load_lock = asyncio.Lock()
+        self._tasks: "set[asyncio.Task]" = set()
+        self.counters = {"hits": 0, "misses": 0, "stored": 0, "expired": 0, "uncacheable": 0}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    async def _embedder(self) -> Optional[Embed]:
+        if not self._loaded:
+            async with self._load_lock:
+                if not self._loaded:
+                    try:
+                        self._embed = await asyncio.to_thread(_sentence_transformer)
+                    except Exception as e:
+                        logger.error(f"Semantic cache model not loaded: {e}")
+                    self._loaded = True
+        return self._embed
+
+    async def _vector(self, slots: Slots) -> Optional[np.ndarray]:
+        embed = await self._embedder()
+        if embed is None:
+            return None
+        return np.asarray(await asyncio.to_thread(embed, [slots.masked]), dtype=np.float32)[0]
+
+    async def lookup(self, query: str) -> Optional[CachedReply]:
+        slots = extract_slots(query)
+        if not slots.cacheable:
+            self.counters["uncacheable"] += 1
+            return None
+        bucket = self._buckets.get(slots.key)
+        if bucket is None:
+            self.counters["misses"] += 1
+            return None
+        vector = await self._vector(slots)
+        if vector is None:
+            return None
+        matrix, entries = self._buckets.get(slots.key, bucket)
+        similarity = matrix @ vector
+        now = time.time()
+        for i in np.argsort(-similarity):
+            if similarity[i] < self.threshold:
+                break
+            if now - entries[i].created <= self.ttl:
+                self.counters["hits"] += 1
+                hit = entries[i]
+                return CachedReply(hit.reply, hit.tools_used, hit.hotel_data, hit.created,
+                                   round(float(similarity[i]), 4))
+            self.counters["expired"] += 1
+        self.counters["misses"] += 1
+        return None
+
+    async def store(self, query: str, reply: str, tools_used: Optional[List[str]] = None,
+                    hotel_data: Optional[List[Dict[str, Any]]] = None) -> bool:
+        slots = extract_slots(query)
+        if not slots.cacheable:
+            return False
+        vector = await self._vector(slots)
+        if vector is None:
+            return False
+        entry = CachedReply(reply, tools_used, hotel_data, time.time())
+        matrix, entries = self._buckets.get(slots.key, (np.empty((0, len(vector)), np.float32), []))
+        self._buckets[slots.key] = (np.vstack([matrix, vector]), entries + [entry])
+        self._order.append((slots.key, entry))
+        while len(self._order) > self.max_entries:
+            self._evict(*self._order.popleft())
+        self.counters["stored"] += 1
+        return True
+
+    def schedule_store(self, query: str, reply: str, tools_used: Optional[List[str]] = None,
+                       hotel_data: Optional[List[Dict[str, Any]]] = None) -> asyncio.Task:
+        """Run ``store`` in the background; failures are logged, not raised."""
+        async def run():
+            try:
+                await self.store(query, reply, tools_used, hotel_data)
+            except Exception as e:
+                logger.error(f"Semantic cache store failed: {e}")
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def start(self) -> None:
+        """Load the embedding model in the background."""
+        if not self._loaded and not self._tasks:
+            task = asyncio.create_task(self._embedder())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _evict(self, key: Tuple, entry: CachedReply) -> None:
+        matrix, entries = self._buckets[key]
+        i = next(i for i, e in enumerate(entries) if e is entry)
+        if len(entries) == 1:
+            del self._buckets[key]
+        else:
+            self._buckets[key] = (np.delete(matrix, i, axis=0), entries[:i] + entries[i + 1:])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self), "buckets": len(self._buckets),
+                "enabled": self._embed is not None or not self._loaded, **self.counters}
+
+
+semantic_cache = SemanticCache()
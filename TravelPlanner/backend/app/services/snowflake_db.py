@@ -278,6 +278,30 @@ class SnowflakeDB:
         results = self.execute_query(query, {"hotel_id": hotel_id})
         return results[0] if results else None
     
+    def list_hotels(self, after_id: int = 0, limit: int = 50000) -> List[Dict[str, Any]]:
+        """Hotel names and locations with HOTEL_ID > after_id, in HOTEL_ID order (keyset page)"""
+        query = f"""
+        SELECT HOTEL_ID, HOTEL_NAME, CITY_CODE, COUNTRY_CODE
+        FROM {settings.snowflake_hotels_table}
+        WHERE HOTEL_ID > %(after_id)s
+        ORDER BY HOTEL_ID
+        LIMIT %(limit)s
+        """
+        return self.execute_query(query, {"after_id": after_id, "limit": limit})
+    
+    def list_hotels_with_location(self, after_id: int = 0, limit: int = 50000) -> List[Dict[str, Any]]:
+        """Hotels with coordinates and HOTEL_ID > after_id, in HOTEL_ID order (keyset page)"""
+        query = f"""
+        SELECT HOTEL_ID, HOTEL_NAME, STARS, RATING, LATITUDE, LONGITUDE,
+               CITY_CODE, COUNTRY_CODE, HOTEL_TYPE
+        FROM {settings.snowflake_hotels_table}
+        WHERE HOTEL_ID > %(after_id)s
+          AND LATITUDE IS NOT NULL AND LONGITUDE IS NOT NULL
+        ORDER BY HOTEL_ID
+        LIMIT %(limit)s
+        """
+        return self.execute_query(query, {"after_id": after_id, "limit": limit})
+    
     def close(self):
         """Close the database connection"""
         if self.connection:
@@ -0,0 +1,120 @@
+"""Persistent on-disk store for Hotelbeds static content"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hotel_static (
+    code       TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    body       BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hotel_static_fetched_at ON hotel_static (fetched_at);
+"""
+
+_MAX_PARAMS = 500          # stay well below SQLite's bound-parameter limit
+
+
+def _encode(hotel: dict) -> bytes:
+    return zlib.compress(json.dumps(hotel, separators=(",", ":")).encode())
+
+
+def _decode(body: bytes) -> dict:
+    return json.loads(zlib.decompress(body))
+
+
+class HotelStaticStore:
+    """SQLite file with one zlib-compressed JSON row per hotel code.
+
+    API workers open it read-only (``readonly=True``) so they share the file
+    without write locks; the refresh job opens it writable. ``fetched_at``
+    is wall-clock epoch seconds so ages survive restarts.
+    """
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def get_many(self, codes: Iterable[str]) -> Dict[str, Tuple[float, dict]]:
+        """``{code: (fetched_at, hotel)}`` for the codes present in the store."""
+        codes = list(codes)
+        out: Dict[str, Tuple[float, dict]] = {}
+        for i in range(0, len(codes), _MAX_PARAMS):
+            chunk = codes[i:i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                "SELECT code, fetched_at, body FROM hotel_static "
+                f"WHERE code IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for code, fetched_at, body in rows:
+                out[code] = (fetched_at, _decode(body))
+        return out
+
+    def put_many(self, hotels: Dict[str, dict], fetched_at: Optional[float] = None) -> int:
+        """Insert or replace hotels keyed by code; returns rows written."""
+        if self.readonly:
+            raise PermissionError(f"{self.path} is opened read-only")
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO hotel_static (code, fetched_at, body) VALUES (?, ?, ?)",
+                [(str(code), fetched_at, _encode(h)) for code, h in hotels.items()],
+            )
+        return len(hotels)
+
+    def missing_codes(self, codes: Iterable[str]) -> List[str]:
+        """The codes in ``codes`` that have no row in the store, in input order."""
+        codes = list(dict.fromkeys(str(c) for c in codes))
+        present = set()
+        for i in range(0, len(codes), _MAX_PARAMS):
+            chunk = codes[i:i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                f"SELECT code FROM hotel_static WHERE code IN ({','.join('?' * len(chunk))})", chunk
+            )
+            present.update(row[0] for row in rows)
+        return [c for c in codes if c not in present]
+
+    def iter_all(self) -> Iterator[Tuple[str, dict]]:
+        """Every ``(code, hotel)`` in the store, in code order."""
+        for code, body in self._conn.execute("SELECT code, body FROM hotel_static ORDER BY code"):
+            yield code, _decode(body)
+
+    def stale_codes(self, max_age: float, limit: Optional[int] = None) -> List[str]:
+        """Codes whose entry is older than ``max_age`` seconds, oldest first."""
+        query = "SELECT code FROM hotel_static WHERE fetched_at < ? ORDER BY fetched_at"
+        params: list = [time.time() - max_age]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self._conn.execute(query, params)]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM hotel_static").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def open_store(path: str, readonly: bool = True) -> Optional[HotelStaticStore]:
+    """Open the store, or return None (and log) when it is not available."""
+    try:
+        store = HotelStaticStore(path, readonly=readonly)
+        logger.info(f"Hotel static store {path}: {len(store)} hotels")
+        return store
+    except sqlite3.Error as e:
+        logger.warning(f"Hotel static store {path} not available: {e}")
+        return None
@@ -0,0 +1,104 @@
+"""Per-session memoization of agent tool calls"""
+
+import functools
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.settings import settings
+
+# Set by ChatService for the duration of one message; tools called outside a
+# chat turn (tests, scripts) are never memoized.
+current_session: ContextVar[Optional[str]] = ContextVar("chat_session_id", default=None)
+_turn_stats: ContextVar[Optional[Dict[str, int]]] = ContextVar("tool_memo_stats", default=None)
+
+
+def canonical_args(args: Tuple, kwargs: Dict[str, Any]) -> str:
+    """Order-independent JSON of a call's arguments (``dests`` lists keep order)."""
+    return json.dumps([list(args), kwargs], sort_keys=True, default=str, separators=(",", ":"))
+
+
+class ToolMemo:
+    """Results of earlier tool calls, per session, for ``ttl`` seconds.
+
+    Keyed by (tool name, canonical arguments). Sessions are kept LRU up to
+    ``max_sessions``, each with at most ``per_session`` results. Results
+    that report an error are not kept.
+    """
+
+    def __init__(self, ttl: float = settings.tool_memo_ttl,
+                 max_sessions: int = settings.tool_memo_max_sessions,
+                 per_session: int = 64, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.per_session = per_session
+        self.clock = clock
+        self._sessions: "OrderedDict[str, OrderedDict[Tuple[str, str], Tuple[float, Any]]]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def begin_turn(self, session_id: str) -> Dict[str, int]:
+        """Scope tool calls in the current context to ``session_id``; returns
+        the dict that counts this turn's hits and misses."""
+        stats = {"hits": 0, "misses": 0}
+        current_session.set(session_id)
+        _turn_stats.set(stats)
+        return stats
+
+    def _count(self, outcome: str) -> None:
+        self.counters[outcome] += 1
+        stats = _turn_stats.get()
+        if stats is not None:
+            stats[outcome] += 1
+
+    def get(self, session_id: str, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        entries = self._sessions.get(session_id)
+        if entries is None or key not in entries:
+            return False, None
+        expires, result = entries[key]
+        if expires < self.clock():
+            del entries[key]
+            return False, None
+        self._sessions.move_to_end(session_id)
+        return True, result
+
+    def put(self, session_id: str, key: Tuple[str, str], result: Any) -> None:
+        entries = self._sessions.get(session_id)
+        if entries is None:
+            entries = self._sessions[session_id] = OrderedDict()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        entries[key] = (self.clock() + self.ttl, result)
+        entries.move_to_end(key)
+        while len(entries) > self.per_session:
+            entries.popitem(last=False)
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def wrap(self, name: str, coroutine: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(coroutine)
+        async def memoized(*args, **kwargs):
+            session_id = current_session.get()
+            if session_id is None:
+                return await coroutine(*args, **kwargs)
+            key = (name, canonical_args(args, kwargs))
+            found, result = self.get(session_id, key)
+            if found:
+                self._count("hits")
+                return result
+            self._count("misses")
+            result = await coroutine(*args, **kwargs)
+            if not (isinstance(result, dict) and "error" in result):
+                self.put(session_id, key, result)
+            return result
+        return memoized
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sessions": len(self._sessions),
+                "entries": sum(len(e) for e in self._sessions.values()), **self.counters}
+
+
+tool_memo = ToolMemo()
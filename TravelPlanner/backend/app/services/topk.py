@@ -0,0 +1,99 @@
+"""Partial top-k selection used by the hotel ranking tools"""
+
+from __future__ import annotations
+
+import heapq
+import numpy as np
+from typing import Any, List, Sequence, Tuple
+
+
+def _candidates(keys: Sequence[np.ndarray], k: int, idx: np.ndarray) -> np.ndarray:
+    """Superset of the top-``k`` of ``idx`` (unordered), found by partitioning.
+
+    Rows strictly better than the k-th primary value are always in; rows
+    tied with it are narrowed down by the next key, so low-cardinality
+    primaries (promotion counts, categories) do not degrade to a full sort.
+    """
+    if k >= len(idx):
+        return idx
+    primary = keys[0][idx]
+    kth = np.partition(primary, k - 1)[k - 1]
+    better = idx[primary < kth]
+    tied = idx[primary == kth]
+    need = k - len(better)
+    if len(keys) > 1 and len(tied) > need:
+        tied = _candidates(keys[1:], need, tied)
+    return np.concatenate([better, tied])
+
+
+def top_k_indices(keys: Sequence[np.ndarray], k: int) -> np.ndarray:
+    """Positions of the ``k`` smallest rows under lexicographic ``keys``.
+
+    ``keys[0]`` is the primary key, later arrays break ties, and any rows
+    still tied keep their original order (stable). NaN ranks after every
+    other value, as in a full sort. Only rows that can reach
+    the top-k are sorted; the rest is discarded by linear-time partitioning
+    instead of a full O(n log n) sort.
+    """
+    if not keys:
+        return np.empty(0, dtype=np.int64)
+    n = len(keys[0])
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    # NaN compares false both ways, so partitioning around a NaN k-th value
+    # would drop every row; rank it as +inf instead.
+    keys = [np.where(np.isnan(key), np.inf, key)
+            if key.dtype.kind == "f" and np.isnan(key).any() else key for key in keys]
+
+    cand = np.sort(_candidates(keys, k, np.arange(n)))
+    # np.lexsort sorts by the *last* key first; the position itself is the
+    # final tie-breaker so the result does not depend on partition order.
+    order = np.lexsort([cand] + [key[cand] for key in reversed(keys)])
+    return cand[order[:k]]
+
+
+class BoundedTopK:
+    """Bounded heap keeping the ``k`` smallest pushes by a numeric key tuple.
+
+    Memory is O(k) however many items are pushed, which makes it the engine
+    for streamed or non-columnar inputs. Equal keys keep the item that was
+    pushed first.
+    """
+
+    __slots__ = ("k", "_heap", "_seq")
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[Tuple[float, ...], int, Any]] = []
+        self._seq = 0
+
+    def push(self, key: Sequence[float], item: Any) -> bool:
+        """Offer ``item``; returns True when it is (currently) kept."""
+        if self.k <= 0:
+            return False
+        # max-heap on (key, seq) via negation: heap[0] is the current worst
+        entry = (tuple(-x for x in key), -self._seq, item)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def would_keep(self, key: Sequence[float]) -> bool:
+        """Whether pushing ``key`` now would keep it (lets callers skip
+        building items that are dropped straight away)."""
+        if self.k <= 0:
+            return False
+        if len(self._heap) < self.k:
+            return True
+        return (tuple(-x for x in key), -self._seq) > self._heap[0][:2]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def items(self) -> List[Any]:
+        """Kept items, best first."""
+        return [e[2] for e in sorted(self._heap, reverse=True)]
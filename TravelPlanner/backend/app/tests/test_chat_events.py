@@ -0,0 +1,100 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.services.chat_events import ChatEventStream, hotels_in, run_with_events, sse
+
+
+async def _fake_run(events: ChatEventStream):
+    """Stands in for an agent run: tokens, one tool call, more tokens."""
+    run_id = uuid.uuid4()
+    await events.on_llm_new_token("Looking")
+    await events.on_tool_start({"name": "get_cheapest_hotels"}, "{}", run_id=run_id,
+                               inputs={"dest": "BCN"})
+    await asyncio.sleep(0.01)
+    await events.on_tool_end([{"hotelCode": 1, "net": "80"}], run_id=run_id)
+    await events.on_llm_new_token(" done")
+    return {"reply": "done", "tools_used": events.tools_used}
+
+
+@pytest.mark.asyncio
+async def test_events_arrive_before_the_final_reply():
+    seen = [e async for e in run_with_events(_fake_run)]
+    assert [e["type"] for e in seen] == ["token", "tool_start", "tool_end", "token", "final"]
+    assert seen[1] == {"type": "tool_start", "tool": "get_cheapest_hotels", "input": {"dest": "BCN"}}
+    assert seen[2]["hotels"] == [{"hotelCode": 1, "net": "80"}]
+    assert seen[-1]["tools_used"] == ["get_cheapest_hotels"]
+
+
+@pytest.mark.asyncio
+async def test_failed_run_ends_with_error_and_close_cancels():
+    async def _boom(events):
+        await events.on_llm_new_token("x")
+        raise RuntimeError("groq down")
+
+    seen = [e async for e in run_with_events(_boom)]
+    assert seen[-1] == {"type": "error", "detail": "groq down"}
+
+    cancelled = asyncio.Event()
+
+    async def _slow(events):
+        events.emit("token", text="a")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    stream = run_with_events(_slow)
+    assert (await stream.__anext__())["type"] == "token"
+    await stream.aclose()                                     # client went away
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+def test_hotels_in_tool_outputs_and_sse_frame():
+    assert hotels_in({"hotels": [{"a": 1}], "mode": "weighted"}) == [{"a": 1}]
+    assert hotels_in({"top": [{"b": 2}]}) == [{"b": 2}]
+    assert hotels_in({"error": "Unknown destination"}) == []
+    assert hotels_in("text") == []
+    frame = sse({"type": "token", "text": "hi"})
+    assert frame.startswith("event: token\ndata: ") and frame.endswith("\n\n")
+    assert json.loads(frame.split("data: ", 1)[1]) == {"type": "token", "text": "hi"}
+
+
+def test_encode_stringifies_tool_values():
+    import datetime
+    from decimal import Decimal
+    from app.services.chat_events import encode
+
+    event = {"type": "tool_end", "hotels": [{"net": Decimal("80.5"), "at": datetime.date(2025, 3, 1)}]}
+    assert json.loads(encode(event))["hotels"] == [{"net": "80.5", "at": "2025-03-01"}]
+
+
+@pytest.mark.asyncio
+async def test_closed_stream_cancels_the_run_and_logs_nothing(monkeypatch):
+    """A client that goes away mid-stream stops the agent; no half turn is kept"""
+    monkeypatch.setenv("GROQ_API_KEY", "stub")              # the LLM client is built on import
+    from app.services import chat_service as service
+
+    cancelled = asyncio.Event()
+
+    async def _run_agent(message, history, callbacks=None):
+        await callbacks[0].on_llm_new_token("Looking")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(service, "run_agent", _run_agent)
+    monkeypatch.setattr(service.settings, "semantic_cache_enabled", False)
+    stream = service.chat_service.stream_message("Hotels in Rome", "test_closed_stream")
+    assert (await stream.__anext__())["type"] == "session"
+    assert (await stream.__anext__())["type"] == "token"
+    await stream.aclose()
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+    assert service.chat_service.get_chat_history("test_closed_stream") == []
@@ -0,0 +1,143 @@
+import pytest
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from app.services.chat_memory import ChatMemory, message_bytes
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _memory(**kwargs):
+    clock = _Clock()
+    defaults = dict(max_sessions=100, max_bytes=10 ** 9, ttl=60, clock=clock)
+    return ChatMemory(**{**defaults, **kwargs}), clock
+
+
+def test_lru_eviction_keeps_recently_used_sessions():
+    memory, _ = _memory(max_sessions=2)
+    memory.add_message("a", HumanMessage(content="hi"))
+    memory.add_message("b", HumanMessage(content="hi"))
+    memory.get_history("a")                                   # reading does not refresh
+    memory.add_message("a", AIMessage(content="hello"))
+    memory.add_message("c", HumanMessage(content="hi"))
+    assert "b" not in memory and "a" in memory and "c" in memory
+    assert memory.stats()["evictions"]["lru"] == 1
+
+
+def test_byte_budget_and_accounting():
+    one = message_bytes(HumanMessage(content="x" * 1000))
+    memory, _ = _memory(max_bytes=3 * one)
+    for sid in "abcd":
+        memory.add_message(sid, HumanMessage(content="x" * 1000))
+    assert len(memory) == 3 and memory.total_bytes == 3 * one
+    assert memory.stats()["evictions"]["bytes"] == 1
+
+    # a single oversized session is kept rather than evicting itself
+    memory.add_message("big", HumanMessage(content="x" * 10 * 1000))
+    assert len(memory) == 1 and "big" in memory
+
+    memory.clear_history("big")
+    assert memory.total_bytes == 0 and memory.get_history("big") == []
+
+
+def test_idle_sessions_are_reaped():
+    memory, clock = _memory(ttl=60)
+    memory.add_message("old", HumanMessage(content="hi"))
+    clock.now = 50
+    memory.add_message("fresh", HumanMessage(content="hi"))
+    clock.now = 100
+    assert memory.reap() == 1
+    assert "old" not in memory and "fresh" in memory
+    assert memory.stats()["evictions"]["ttl"] == 1
+
+
+def test_conversation_log_stores_each_message_once():
+    memory, _ = _memory()
+    memory.add_message("s", HumanMessage(content="Hotels in Málaga?"))
+    memory.add_message("s", AIMessage(content="Here are five."))
+
+    [(role, content, _), second] = memory.get_entries("s")
+    assert (role, content) == ("user", "Hotels in Málaga?") and second[0] == "assistant"
+    history = memory.get_history("s")
+    assert [type(m) for m in history] == [HumanMessage, AIMessage]
+    assert history[0].content == "Hotels in Málaga?"
+
+    log = memory._sessions["s"].log
+    assert bytes(log.text) == "Hotels in Málaga?Here are five.".encode()
+    assert log.nbytes == memory.total_bytes
+
+
+async def _summarize(summary, messages):
+    return (summary + " " + " ".join(m.content for m in messages)).strip()
+
+
+@pytest.mark.asyncio
+async def test_window_and_rolling_summary_keep_prompt_flat():
+    from app.services.chat_memory import count_tokens
+
+    memory, _ = _memory(window_turns=2, token_budget=200, summary_tokens=50)
+    sizes = []
+    for turn in range(30):
+        memory.add_message("s", HumanMessage(content=f"question {turn} " + "x " * 20))
+        memory.add_message("s", AIMessage(content=f"answer {turn} " + "y " * 20))
+        task = memory.schedule_summary("s", _summarize)
+        if task:
+            await task
+        context = memory.get_context("s")
+        sizes.append(sum(count_tokens(m.content) for m in context))
+
+    assert max(sizes) <= 200 and sizes[-1] == sizes[10]          # flat, within budget
+    summary, *recent = memory.get_context("s")
+    assert isinstance(summary, SystemMessage) and "question 0" in summary.content
+    assert [m.content.split()[:2] for m in recent][-1] == ["answer", "29"]
+    assert len(recent) <= 4
+    assert memory.stats()["summaries"]["runs"] == 28
+
+
+def test_turns_stay_in_the_window_until_summarised():
+    memory, _ = _memory(window_turns=1, token_budget=1000)
+    for turn in range(3):                              # no summary has run (or it failed)
+        memory.add_message("s", HumanMessage(content=f"question {turn}"))
+        memory.add_message("s", AIMessage(content=f"answer {turn}"))
+    context = [m.content for m in memory.get_context("s")]
+    assert context[0] == "question 0" and len(context) == 6
+
+    memory.token_budget = 8                                # the oldest no longer fit
+    context = [m.content for m in memory.get_context("s")]
+    assert context[-1] == "answer 2" and len(context) < 6
+    assert memory.stats()["summaries"]["truncated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_summary_growth_is_held_to_the_byte_budget():
+    memory, _ = _memory(window_turns=1, max_bytes=10 ** 9)
+    for session in ("old", "s"):
+        for text in ("a", "b", "c"):
+            memory.add_message(session, HumanMessage(content=text))
+    memory.max_bytes = memory.total_bytes + 60            # less than the summary adds
+
+    async def _long(summary, messages):
+        return "z " * 50
+
+    assert await memory.update_summary("s", _long) is True
+    assert "old" not in memory and "s" in memory
+    assert memory.total_bytes <= memory.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_summary_skipped_when_session_cleared_meanwhile():
+    memory, _ = _memory(window_turns=1)
+    for text in ("a", "b", "c"):
+        memory.add_message("s", HumanMessage(content=text))
+
+    async def _slow(summary, messages):
+        memory.clear_history("s")
+        return "late"
+
+    assert await memory.update_summary("s", _slow) is False
+    assert memory.get_context("s") == [] and memory.total_bytes == 0
@@ -0,0 +1,108 @@
+import pytest
+
+from app.services.destinations import DestinationResolver, PrefixTrie
+
+
+DESTINATIONS = [
+    {"code": "BCN", "name": {"content": "Barcelona"}, "countryCode": "ES",
+     "zones": [{"zoneCode": 1, "name": {"content": "Eixample"}},
+               {"zoneCode": 2, "name": {"content": "Ciutat Vella"}}]},
+    {"code": "BRI", "name": {"content": "Bari"}, "countryCode": "IT", "zones": []},
+    {"code": "LIS", "name": {"content": "Lisboa"}, "countryCode": "PT", "zones": []},
+    {"code": "MAD", "name": {"content": "Madrid"}, "countryCode": "ES",
+     "zones": [{"zoneCode": 3, "name": {"content": "Centro"}}]},
+    {"code": "MLA", "name": {"content": "Malaga"}, "countryCode": "ES",
+     "zones": [{"zoneCode": 4, "name": {"content": "Centro"}}]},
+]
+
+
+def _resolver():
+    resolver = DestinationResolver()
+    resolver.load(DESTINATIONS)
+    return resolver
+
+
+def test_prefix_trie_ranges():
+    trie = PrefixTrie([("barcelona", 1), ("bari", 2), ("madrid", 3), ("bar", 4)])
+    assert trie.exact("bari") == [2]
+    assert [k for k, _ in trie.prefix("bar")] == ["bar", "barcelona", "bari"]
+    assert trie.prefix("zz") == []
+
+
+@pytest.mark.parametrize("text, code, method", [
+    ("bcn", "BCN", "code"),
+    ("Barcelona", "BCN", "exact"),
+    ("Barcelona, Spain", "BCN", "exact"),
+    ("lisbon", "LIS", "alias"),
+    ("madr", "MAD", "prefix"),
+    ("barcleona", "BCN", "fuzzy"),
+    ("eixample", "BCN", "exact"),
+])
+def test_resolves_codes_names_aliases_and_typos(text, code, method):
+    found = _resolver().resolve(text)
+    assert (found.code, found.method) == (code, method)
+
+
+def test_ambiguous_and_unknown_give_suggestions():
+    resolver = _resolver()
+    centro = resolver.resolve("Centro")
+    assert centro.code is None and centro.method == "ambiguous"
+    assert {s["code"] for s in centro.suggestions} == {"MAD", "MLA"}
+    assert resolver.resolve("bar").code is None               # Barcelona or Bari
+    assert resolver.resolve("qqqzzz").method == "unknown"
+    assert resolver.resolve("Eixample").zone == "Eixample"
+
+
+def test_prefix_is_unique_only_over_the_whole_subtree():
+    """More than 50 keys of one code under a prefix do not hide a second code"""
+    zones = [{"zoneCode": i, "name": {"content": f"Santa Zone {i:03d}"}} for i in range(60)]
+    resolver = DestinationResolver()
+    resolver.load([{"code": "AAA", "name": {"content": "Santa Alpha"}, "zones": zones},
+                   {"code": "ZZZ", "name": {"content": "Santa Zulu"}, "zones": []}])
+    assert resolver.trie.span("santa")[1] - resolver.trie.span("santa")[0] == 62
+    assert resolver.resolve("santa").code is None
+    assert resolver.resolve("santa z").code is None
+    assert resolver.resolve("santa zo").code == "AAA"
+
+
+def test_mentioned_finds_every_destination_in_a_sentence():
+    resolver = _resolver()
+    assert resolver.mentioned("cheap hotels in barcelona next weekend") == [("BCN", "barcelona")]
+    assert resolver.mentioned("Lisbon or Madrid?") == [("LIS", "lisbon"), ("MAD", "madrid")]
+    assert resolver.mentioned("ciutat vella then centro") == [("BCN", "ciutat vella"),
+                                                              (None, "centro")]
+    assert resolver.mentioned("somewhere sunny") == []
+
+def test_file_round_trip(tmp_path):
+    path = str(tmp_path / "dest" / "destinations.json.gz")
+    resolver = _resolver()
+    resolver.write_file(path, DESTINATIONS)
+    again = DestinationResolver()
+    again.load(resolver.read_file(path))
+    assert len(again) == 5 and again.resolve("malaga").code == "MLA"
+    assert DestinationResolver().read_file(str(tmp_path / "missing.gz")) is None
+
+
+@pytest.mark.asyncio
+async def test_tools_receive_resolved_codes(monkeypatch):
+    """Tool inputs are normalised before any availability call"""
+    from app.services import lc_tools
+
+    monkeypatch.setattr(lc_tools, "destination_resolver", _resolver())
+    seen = []
+
+    async def _tool(dest=None, dests=None, **kwargs):
+        seen.append(dest or dests)
+        return {}
+
+    wrapped = lc_tools.resolved_dest(_tool)
+    await wrapped(dest="barcelonna", cin="2025-03-01")
+    await wrapped(dests=["Madrid", "lis"])
+    assert seen == ["BCN", ["MAD", "LIS"]]
+
+    error = await wrapped(dest="Atlantis")
+    assert "Unknown destination" in error["error"] and seen == ["BCN", ["MAD", "LIS"]]
+
+    monkeypatch.setattr(lc_tools, "destination_resolver", DestinationResolver())
+    await wrapped(dest="pmi")
+    assert seen[-1] == "PMI"                                   # nothing loaded: passed through
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.services.hotel_geo import GeoIndex, HotelGeo, haversine_km
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = np.concatenate([rng.uniform(41.3, 41.5, n // 2), rng.uniform(-60, 70, n - n // 2)])
+    lons = np.concatenate([rng.uniform(2.0, 2.3, n // 2), rng.uniform(-180, 180, n - n // 2)])
+    return list(range(n)), lats, lons
+
+
+@pytest.mark.parametrize("lat,lon,km", [(41.4036, 2.1744, 1.5), (41.4, 2.17, 30.0),
+                                       (0.0, 179.95, 800.0), (65.0, -20.0, 3000.0)])
+def test_radius_and_nearest_match_brute_force(lat, lon, km):
+    """Grid queries return exactly what a full haversine scan returns"""
+    ids, lats, lons = _points(4000)
+    index = GeoIndex(cell_deg=0.05, merge_at=10**9)
+    index.upsert(zip(ids[:3000], lats[:3000], lons[:3000]))
+    index.merge()
+    index.upsert(zip(ids[3000:], lats[3000:], lons[3000:]))   # left in the delta
+
+    dist = haversine_km(lat, lon, lats, lons)
+    expected = sorted((d, i) for i, d in enumerate(dist) if d <= km)
+    assert [pid for pid, _ in index.radius(lat, lon, km)] == [i for _, i in expected]
+
+    nearest = index.nearest(lat, lon, 7)
+    assert [pid for pid, _ in nearest] == [int(i) for i in np.argsort(dist, kind="stable")[:7]]
+
+
+def test_upsert_moves_and_remove_drops_points():
+    index = GeoIndex()
+    index.upsert([(1, 41.40, 2.17), (2, 48.85, 2.35)])
+    index.merge()
+    index.upsert([(1, 48.86, 2.34)])                          # hotel 1 moved to Paris
+    index.remove([2])
+    assert len(index) == 1
+    assert index.radius(41.40, 2.17, 5) == []
+    assert [pid for pid, _ in index.radius(48.85, 2.35, 5)] == [1]
+
+
+def test_hotel_geo_refreshes_incrementally():
+    """Only rows above the highest HOTEL_ID seen are fetched on refresh"""
+    table = [{"HOTEL_ID": i, "HOTEL_NAME": f"H{i}", "LATITUDE": 41.4 + i / 1000,
+              "LONGITUDE": 2.17} for i in range(1, 6)]
+    calls = []
+
+    def fetch(after_id, limit):
+        calls.append(after_id)
+        return [r for r in table if r["HOTEL_ID"] > after_id][:limit]
+
+    geo = HotelGeo(fetch=fetch, batch=2)
+    assert geo.reload() == 5
+    table.append({"HOTEL_ID": 9, "HOTEL_NAME": "New", "LATITUDE": 41.4, "LONGITUDE": 2.1701})
+    calls.clear()
+    assert geo.refresh() == 1
+    assert calls == [5]
+    near = geo.nearest(41.4, 2.1701, k=2)
+    assert [h["HOTEL_NAME"] for h in near] == ["New", "H1"]
+    assert near[0]["DISTANCE_KM"] == 0.0
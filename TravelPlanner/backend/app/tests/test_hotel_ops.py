@@ -0,0 +1,504 @@
+import asyncio
+import pytest
+from app.services import hotel_ops
+
+
+def _payload(n_hotels: int = 3) -> dict:
+    return {
+        "hotels": [
+            {
+                "code": code,
+                "rooms": [{"rates": [{"net": str(100 + code), "boardCode": "BB",
+                                      "rateClass": "NOR"}]}],
+            }
+            for code in range(n_hotels)
+        ]
+    }
+
+
+@pytest.fixture
+def fake_post(monkeypatch):
+    """Replace the Hotelbeds POST with a counting, slightly slow fake."""
+    calls = []
+
+    async def _post(body, priority=0):
+        calls.append(body)
+        await asyncio.sleep(0.01)
+        return _payload(), 1000
+
+    hotel_ops.clear_availability_cache()
+    monkeypatch.setattr(hotel_ops, "_post_availability", _post)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_availability_cache_hit(fake_post):
+    """Second identical request is served from cache"""
+    before = hotel_ops.availability_cache_stats()
+    await hotel_ops.availability("bcn", "2025-03-01", "2025-03-03")
+    await hotel_ops.availability(" BCN ", "2025-03-01", "2025-03-03")
+
+    stats = hotel_ops.availability_cache_stats()
+    assert len(fake_post) == 1
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_availability_single_flight(fake_post):
+    """Concurrent identical requests share one upstream call"""
+    before = hotel_ops.availability_cache_stats()
+    results = await asyncio.gather(*[
+        hotel_ops.availability("LIS", "2025-03-01", "2025-03-03") for _ in range(5)
+    ])
+
+    stats = hotel_ops.availability_cache_stats()
+    assert len(fake_post) == 1
+    assert all(r is results[0] for r in results)
+    assert stats["coalesced"] - before["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_availability_failures_not_cached(monkeypatch):
+    """A failed upstream call is retried on the next request"""
+    calls = []
+
+    async def _post(body, priority=0):
+        calls.append(body)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return _payload(), 1000
+
+    hotel_ops.clear_availability_cache()
+    monkeypatch.setattr(hotel_ops, "_post_availability", _post)
+    with pytest.raises(RuntimeError):
+        await hotel_ops.availability("PMI", "2025-03-01", "2025-03-03")
+    data = await hotel_ops.availability("PMI", "2025-03-01", "2025-03-03")
+    assert len(calls) == 2
+    assert len(data["hotels"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_availability_cache_bounded_by_bytes(monkeypatch):
+    """Large payloads evict older entries once the byte budget is used"""
+    async def _post(body, priority=0):
+        return _payload(), 400
+
+    hotel_ops.clear_availability_cache()
+    monkeypatch.setattr(hotel_ops, "_post_availability", _post)
+    monkeypatch.setattr(hotel_ops, "_AVAIL_MAX_BYTES", 1000)
+    for cin in ("2025-03-01", "2025-03-02", "2025-03-03"):
+        await hotel_ops.availability("BCN", cin, "2025-03-05")
+    stats = hotel_ops.availability_cache_stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 800
+
+    monkeypatch.setattr(hotel_ops, "_AVAIL_MAX_BYTES", 300)          # larger than the budget
+    await hotel_ops.availability("MAD", "2025-03-01", "2025-03-05")
+    assert hotel_ops.availability_cache_stats()["entries"] == 2
+
+
+
+@pytest.mark.asyncio
+async def test_rate_table_lives_on_the_cache_entry(monkeypatch):
+    """Tables are built once per cached payload, counted and evicted with it"""
+    async def _post(body, priority=0):
+        return _payload(), 400
+
+    hotel_ops.clear_availability_cache()
+    monkeypatch.setattr(hotel_ops, "_post_availability", _post)
+    table = await hotel_ops._availability_table("BCN", "2025-03-01", "2025-03-05")
+    assert await hotel_ops._availability_table("BCN", "2025-03-01", "2025-03-05") is table
+    assert hotel_ops.availability_cache_stats()["bytes"] == 400 + table.nbytes
+
+    monkeypatch.setattr(hotel_ops, "_AVAIL_MAX_BYTES", 1000)
+    await hotel_ops.availability("MAD", "2025-03-01", "2025-03-05")
+    await hotel_ops.availability("LIS", "2025-03-01", "2025-03-05")
+    stats = hotel_ops.availability_cache_stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 800
+
+def _rate(net, board="BB", rate_class="NOR", promos=0, cxl=None):
+    rate = {"net": str(net), "boardCode": board, "rateClass": rate_class,
+            "promotions": [{"code": str(i)} for i in range(promos)]}
+    if cxl:
+        rate["cancellationPolicies"] = [{"amount": "10", "from": ts} for ts in cxl]
+    return rate
+
+
+RATES_PAYLOAD = {
+    "hotels": [
+        {"code": 1, "rooms": [{"rates": [
+            _rate(120, promos=2),
+            _rate(90, board="RO", rate_class="NRF", cxl=["2025-02-20T00:00:00+01:00"]),
+        ]}]},
+        {"code": 2, "rooms": [{"rates": [
+            _rate(80, cxl=["2025-03-01T00:00:00+00:00", "2025-02-25T00:00:00+00:00"]),
+            _rate(150, promos=3),
+        ]}]},
+    ]
+}
+
+
+def test_rate_table_columns():
+    """RateTable parses prices, codes and earliest penalty date once"""
+    from app.services.rate_table import RateTable
+
+    table = RateTable.from_availability(RATES_PAYLOAD)
+    assert len(table) == 4
+    assert table.net.tolist() == [120.0, 90.0, 80.0, 150.0]
+    assert table.promos.tolist() == [2, 0, 0, 3]
+    assert table.hotel_code_set() == [1, 2]
+    assert table.free_cancellation().tolist() == [True, False, False, True]
+    # the payload itself is left untouched
+    assert "hotelCode" not in RATES_PAYLOAD["hotels"][0]["rooms"][0]["rates"][0]
+
+
+@pytest.mark.asyncio
+async def test_ranking_functions_use_rate_table(monkeypatch):
+    """Ranking tools filter and sort on the columnar table"""
+    async def _availability(*args, **kwargs):
+        return RATES_PAYLOAD
+
+    monkeypatch.setattr(hotel_ops, "availability", _availability)
+
+    cheapest = await hotel_ops.hotels_lowest_prices("BCN", "2025-03-01", "2025-03-03", top_n=2)
+    assert [(r["hotelCode"], r["net"]) for r in cheapest] == [(2, "80"), (1, "90")]
+
+    promo = await hotel_ops.hotels_best_promo_board("BCN", "2025-03-01", "2025-03-03", board="BB", top_n=2)
+    assert [r["net"] for r in promo] == ["150", "120"]
+
+    nrf = await hotel_ops.hotels_with_cxl_policy("BCN", "2025-03-01", "2025-03-03", "NRF")
+    assert [r["net"] for r in nrf] == ["90"]
+
+    before = await hotel_ops.hotels_with_cxl_policy(
+        "BCN", "2025-03-01", "2025-03-03", "BEFORE_DATE", deadline="2025-02-22")
+    assert sorted(r["net"] for r in before) == ["120", "150", "80"]
+
+    window = await hotel_ops.hotels_with_cxl_policy(
+        "BCN", "2025-03-01", "2025-03-03", "BEFORE_DATE", deadline="2025-02-22",
+        deadline_to="2025-02-28", max_price=100)
+    assert [r["net"] for r in window] == ["80"]
+
+
+def test_cancellation_index_matches_masks():
+    """Indexed select equals the full-scan masks, alone and combined"""
+    import numpy as np
+    from app.services.rate_table import RateTable, _epoch
+    from benchmarks.synthetic import synthetic_availability
+
+    table = RateTable.from_availability(synthetic_availability(3000, seed=3))
+    rows = lambda mask: np.flatnonzero(mask).tolist()
+
+    assert table.select(free_cancellation=True).tolist() == rows(table.free_cancellation())
+    assert table.select(rate_class="NRF").tolist() == rows(table.rate_class_is("NRF"))
+    for deadline in ("2025-02-01", "2025-02-15T12:00:00", "2025-03-02"):
+        assert (table.select(penalty_free_after=deadline).tolist()
+                == rows(table.penalty_free_until(deadline)))
+
+    lo, hi = "2025-02-10", "2025-02-20"
+    combined = (table.penalty_free_until(lo) & (table.cxl_from <= _epoch(hi))
+                & table.board_is("HB") & (table.net <= 300))
+    assert table.select(penalty_free_after=lo, penalty_from_before=hi,
+                        board="HB", max_net=300).tolist() == rows(combined)
+    assert table.select(rate_class="NOPE").tolist() == []
+
+
+@pytest.mark.asyncio
+async def test_ranked_weighted_and_pareto(monkeypatch):
+    """One ranking call covers the price / promotion trade-off"""
+    async def _availability(*args, **kwargs):
+        return RATES_PAYLOAD
+
+    monkeypatch.setattr(hotel_ops, "availability", _availability)
+
+    cheap = await hotel_ops.hotels_ranked("BCN", "2025-03-01", "2025-03-03", {"price": 1})
+    assert [(h["hotelCode"], h["net"]) for h in cheap["hotels"]] == [(2, "80"), (1, "90")]
+
+    promo = await hotel_ops.hotels_ranked("BCN", "2025-03-01", "2025-03-03", {"promotions": 1})
+    assert [h["net"] for h in promo["hotels"]] == ["150", "120"]
+
+    front = await hotel_ops.hotels_ranked("BCN", "2025-03-01", "2025-03-03",
+                                          {"price": 1, "promotions": 1}, mode="pareto")
+    assert front["front_size"] == 2
+    assert sorted(h["net"] for h in front["hotels"]) == ["120", "80"]
+
+    with pytest.raises(ValueError):
+        await hotel_ops.hotels_ranked("BCN", "2025-03-01", "2025-03-03", {"stars": 1})
+
+
+def test_pareto_front_matches_brute_force():
+    """Non-dominated set equals pairwise comparison, duplicates included"""
+    import numpy as np
+    from app.services.ranking import pareto_front
+
+    rng = np.random.default_rng(11)
+    points = rng.integers(0, 5, (300, 3)).astype(float)
+    dominated = [any(np.all(q >= p) and np.any(q > p) for q in points) for p in points]
+    assert pareto_front(points).tolist() == [i for i, d in enumerate(dominated) if not d]
+
+
+def test_top_k_matches_full_sort():
+    """Partial top-k equals a stable full sort, including heavy ties"""
+    import numpy as np
+    from app.services.topk import top_k_indices, BoundedTopK
+
+    rng = np.random.default_rng(7)
+    keys = [rng.integers(0, 3, 500).astype(float), rng.integers(0, 4, 500).astype(float)]
+    expected = np.lexsort([np.arange(500)] + keys[::-1])[:10]
+    assert top_k_indices(keys, 10).tolist() == expected.tolist()
+
+    heap = BoundedTopK(10)
+    for i in range(500):
+        heap.push((keys[0][i], keys[1][i]), i)
+    assert heap.items() == expected.tolist()
+
+
+def test_top_k_ranks_nan_last():
+    """NaN keys rank after every number instead of emptying the selection"""
+    import numpy as np
+    from app.services.topk import top_k_indices
+    from app.services.ranking import weighted_top_k
+    from app.services.rate_table import RateTable
+
+    nan = np.full(6, np.nan)
+    assert top_k_indices([-np.ones(6), nan], 3).tolist() == [0, 1, 2]
+    assert top_k_indices([np.array([np.nan, 3.0, np.nan, 1.0])], 3).tolist() == [3, 1, 0]
+
+    table = RateTable.from_availability({"hotels": [{"code": 1, "rooms": [{"rates": [
+        {"boardCode": "BB", "rateClass": "NOR"}, {"boardCode": "RO", "rateClass": "NOR"}]}]}]})
+    assert np.isnan(table.net).all()
+    assert weighted_top_k(table, np.array([0.2, 0.5]), 2).tolist() == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_streamed_ranking_matches_buffered(monkeypatch):
+    """Incremental decode + bounded heap gives the same top-N as the table"""
+    import json
+
+    body = json.dumps({"auditData": {}, "hotels": {"hotels": RATES_PAYLOAD["hotels"], "total": 2}}).encode()
+
+    async def _chunks():
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7]
+
+    hotels = [h async for h in hotel_ops._iter_hotels(_chunks())]
+    assert [h["code"] for h in hotels] == [1, 2]
+
+    async def _numbers():
+        yield b'{"hotels": {"hotels": [{"code": 3, "latitude": 41.38, "rooms": []}]}}'
+
+    [numeric] = [h async for h in hotel_ops._iter_hotels(_numbers())]
+    assert type(numeric["latitude"]) is float and type(numeric["code"]) is int
+
+    streamed = await hotel_ops._stream_top_k(hotel_ops._iter_hotels(_chunks()),
+                                             hotel_ops.LOWEST_PRICE_ORDER, 3)
+    monkeypatch.setattr(hotel_ops, "availability", lambda *a, **k: asyncio.sleep(0, RATES_PAYLOAD))
+    buffered = await hotel_ops.hotels_lowest_prices("BCN", "2025-03-01", "2025-03-03", top_n=3)
+    assert streamed == buffered
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_streams_share_one_request(monkeypatch):
+    """Identical streamed rankings coalesce; a different ranking reads buffered"""
+    opened, posted = [], []
+
+    async def _stream(dest, cin, cout, rooms=1, adults=2, children=0):
+        opened.append(dest)
+        await asyncio.sleep(0.01)
+        for h in RATES_PAYLOAD["hotels"]:
+            yield h
+
+    async def _post(body, priority=0):
+        posted.append(body)
+        return RATES_PAYLOAD, 1000
+
+    hotel_ops.clear_availability_cache()
+    monkeypatch.setattr(hotel_ops, "_STREAM_AVAILABILITY", True)
+    monkeypatch.setattr(hotel_ops, "availability_stream", _stream)
+    monkeypatch.setattr(hotel_ops, "_post_availability", _post)
+    args = ("BCN", "2025-03-01", "2025-03-03")
+    a, b, promo = await asyncio.gather(hotel_ops.hotels_lowest_prices(*args, top_n=3),
+                                       hotel_ops.hotels_lowest_prices(*args, top_n=3),
+                                       hotel_ops.hotels_best_promo_board(*args))
+    assert a == b and a[0]["net"] == "80" and a[0] is not b[0]
+    assert len(opened) == 1 and len(posted) == 1
+    assert promo[0]["promotions"] and hotel_ops.stream_stats()["inflight"] == 0
+
+    await hotel_ops.hotels_lowest_prices(*args, top_n=3)          # now cached: not streamed
+    assert len(opened) == 1 and len(posted) == 1
+
+
+@pytest.mark.asyncio
+async def test_hotel_static_fetches_only_missing_codes(monkeypatch):
+    """Static content is cached per code and fetched in chunks"""
+    requested = []
+
+    async def _fetch(codes, priority=0):
+        requested.append(list(codes))
+        await asyncio.sleep(0.01)
+        return {c: {"code": int(c), "category": {"simpleCode": 3}} for c in codes}
+
+    hotel_ops._static_cache.clear()
+    monkeypatch.setattr(hotel_ops, "_fetch_static_chunk", _fetch)
+    monkeypatch.setattr(hotel_ops, "_STATIC_CHUNK", 2)
+
+    first = await hotel_ops.hotel_static(1, 2, 3)
+    assert list(first) == ["1", "2", "3"]
+    assert requested == [["1", "2"], ["3"]]
+
+    # overlapping lookups: only the new code goes out, concurrent ones coalesce
+    requested.clear()
+    a, b = await asyncio.gather(hotel_ops.hotel_static("3", "4"),
+                                hotel_ops.hotel_static(4, 2))
+    assert requested == [["4"]]
+    assert list(a) == ["3", "4"] and list(b) == ["4", "2"]
+
+
+@pytest.mark.asyncio
+async def test_hotel_static_reads_through_store(monkeypatch, tmp_path):
+    """The on-disk store is consulted before the content API"""
+    from app.services.static_store import HotelStaticStore
+
+    path = str(tmp_path / "static.db")
+    writer = HotelStaticStore(path, readonly=False)
+    writer.put_many({"10": {"code": 10, "name": "Stored"}})
+    writer.put_many({"11": {"code": 11, "name": "Old"}}, fetched_at=0)
+    assert writer.stale_codes(max_age=3600) == ["11"]
+    writer.close()
+
+    requested = []
+
+    async def _fetch(codes, priority=0):
+        requested.append(list(codes))
+        return {c: {"code": int(c), "name": "Fetched"} for c in codes}
+
+    hotel_ops._static_cache.clear()
+    monkeypatch.setattr(hotel_ops, "_fetch_static_chunk", _fetch)
+    monkeypatch.setattr(hotel_ops.settings, "hotel_static_db_path", path)
+    store = hotel_ops.open_static_store(readonly=True)
+    try:
+        result = await hotel_ops.hotel_static(10, 11, 12)
+        assert result["10"]["name"] == "Stored"
+        assert requested == [["11", "12"]]                 # stale + unknown only
+        with pytest.raises(PermissionError):
+            store.put_many({"12": {}})
+    finally:
+        hotel_ops.close_static_store()
+
+    refresher = HotelStaticStore(path, readonly=False)
+    assert await hotel_ops.refresh_static_store(refresher, max_age=3600) == 1
+    assert refresher.stale_codes(max_age=3600) == []
+    refresher.close()
+
+
+@pytest.mark.asyncio
+async def test_static_store_reads_respect_the_cache_size(monkeypatch, tmp_path):
+    """A large read from the store does not grow the per-code cache past its cap"""
+    from app.services.static_store import HotelStaticStore
+
+    path = str(tmp_path / "static.db")
+    writer = HotelStaticStore(path, readonly=False)
+    writer.put_many({str(c): {"code": c, "name": f"Stored {c}"} for c in range(5)})
+    writer.close()
+
+    hotel_ops._static_cache.clear()
+    monkeypatch.setattr(hotel_ops, "_STATIC_MAX", 2)
+    monkeypatch.setattr(hotel_ops.settings, "hotel_static_db_path", path)
+    hotel_ops.open_static_store(readonly=True)
+    try:
+        assert len(await hotel_ops.hotel_static(*range(5))) == 5
+        assert list(hotel_ops._static_cache) == ["3", "4"]
+    finally:
+        hotel_ops.close_static_store()
+        hotel_ops._static_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_price_matrix_fans_out_and_merges(monkeypatch):
+    """One call covers every destination x check-in and keeps a global top-N"""
+    seen = []
+
+    async def _availability(dest, cin, cout, *args, **kwargs):
+        seen.append((dest, cin, cout))
+        if dest == "LIS" and cin == "2025-03-02":
+            raise RuntimeError("upstream down")
+        shift = 0 if dest == "BCN" else 5
+        day = int(cin[-2:])
+        return {"hotels": [{"code": f"{dest}{day}", "rooms": [{"rates": [
+            _rate(100 + shift + day), _rate(200 + shift + day)]}]}]}
+
+    monkeypatch.setattr(hotel_ops, "availability", _availability)
+    result = await hotel_ops.hotels_price_matrix(["bcn", "LIS"], "2025-03-01", "2025-03-03",
+                                                 nights=2, top_n=3)
+
+    assert len(seen) == 6
+    assert ("BCN", "2025-03-01", "2025-03-03") in seen
+    assert result["matrix"]["BCN"] == {"2025-03-01": 101.0, "2025-03-02": 102.0, "2025-03-03": 103.0}
+    assert result["matrix"]["LIS"]["2025-03-02"] is None
+    assert result["failed"] == 1
+    assert [(r["destination"], r["checkIn"]) for r in result["top"]] == [
+        ("BCN", "2025-03-01"), ("BCN", "2025-03-02"), ("BCN", "2025-03-03")]
+
+
+@pytest.mark.asyncio
+async def test_price_calendar_serves_index_and_refreshes_stale_cells(monkeypatch, tmp_path):
+    """Fresh cells come from the swept index, stale ones are priced live"""
+    import datetime
+    import time
+    from app.services.price_calendar import CalendarIndex, CalendarStore
+
+    priced = []
+
+    async def _availability(dest, cin, cout, *args, **kwargs):
+        priced.append(cin)
+        return {"hotels": [{"code": 1, "rooms": [{"rates": [_rate(50), _rate(70), _rate(90)]}]}]}
+
+    monkeypatch.setattr(hotel_ops, "availability", _availability)
+
+    store = CalendarStore(str(tmp_path / "calendar.db"), readonly=False)
+    start = datetime.date(2025, 3, 1)
+    assert await hotel_ops.sweep_price_calendar(store, ["bcn"], nights=2, start=start) == 2
+    day2 = datetime.date(2025, 3, 2)
+    store.upsert("BCN", [(day2, 10.0, 20.0, time.time() - 10 * 24 * 3600)])   # make day 2 stale
+    store.close()
+
+    index = CalendarIndex(str(tmp_path / "calendar.db"), reload_every=0)
+    monkeypatch.setattr(hotel_ops, "_calendar", index)
+    priced.clear()
+
+    result = await hotel_ops.hotels_price_calendar("BCN", "2025-03-01", "2025-03-03", max_age=3600)
+    days = {d["date"]: d for d in result["days"]}
+    assert days["2025-03-01"] == {**days["2025-03-01"], "min": 50.0, "median": 70.0, "source": "index"}
+    assert days["2025-03-02"]["source"] == "live" and days["2025-03-02"]["min"] == 50.0
+    assert days["2025-03-03"]["source"] == "live"
+    assert sorted(priced) == ["2025-03-02", "2025-03-03"]
+
+    priced.clear()
+    result = await hotel_ops.hotels_price_calendar("LIS", "2025-03-01", "2025-12-31",
+                                                   max_age=3600, max_live=5)
+    sources = [d["source"] for d in result["days"]]
+    assert len(priced) == 5 and sources[:5] == ["live"] * 5
+    assert set(sources[5:]) == {"unavailable"} and len(sources) == 306
+
+
+@pytest.mark.asyncio
+async def test_calendar_reload_keeps_newer_live_cells(tmp_path):
+    """A reload picks up the sweep's rows without dropping fresher live prices"""
+    import datetime
+    from app.services.price_calendar import CalendarIndex, CalendarStore
+
+    path = str(tmp_path / "calendar.db")
+    day1, day2, day3 = (datetime.date(2025, 3, d) for d in (1, 2, 3))
+    store = CalendarStore(path, readonly=False)
+    store.upsert("BCN", [(day1, 10.0, 20.0, 100.0), (day2, 10.0, 20.0, 100.0)])
+
+    index = CalendarIndex(path, reload_every=0)
+    await index.refresh()
+    index.put("BCN", day2, 30.0, 40.0, 200.0)                 # live, newer than the file
+    index.put("BCN", day3, 50.0, 60.0, 200.0)                 # live, not in the file
+    index.put("MAD", day1, 70.0, 80.0, 200.0)
+    store.upsert("BCN", [(day1, 11.0, 21.0, 300.0)])          # the sweep moves on
+    store.close()
+    await index.refresh()
+
+    assert [c[1] for c in index.cells("BCN", day1, day3)] == [11.0, 30.0, 50.0]
+    assert index.cells("MAD", day1, day1)[0][1] == 70.0
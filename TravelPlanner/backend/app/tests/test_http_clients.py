@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services import http_clients
+from app.services.http_clients import ClientRegistry, UpstreamConfig, _MeteredAsyncTransport, _PoolMeter
+
+
+@pytest.mark.asyncio
+async def test_metered_transport_counts_requests_and_errors():
+    meter = _PoolMeter()
+    status = iter([200, 503])
+    inner = httpx.MockTransport(lambda request: httpx.Response(next(status)))
+    async with httpx.AsyncClient(transport=_MeteredAsyncTransport(inner, meter)) as client:
+        await client.get("http://upstream/a")
+        await client.get("http://upstream/b")
+    assert meter.requests == 2
+    assert meter.errors == 1
+    assert meter.inflight == 0 and meter.peak_inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_client_until_closed():
+    registry = ClientRegistry()
+    registry.register(UpstreamConfig("api", base_url="http://upstream"))
+    registry.register(UpstreamConfig("sdk", sync=True))
+    client = registry.get("api")
+    assert registry.get("api") is client
+    built = []
+    sdk = registry.sdk("sdk", lambda http: built.append(http) or object())
+    assert registry.sdk("sdk", lambda http: built.append(http) or object()) is sdk
+    assert len(built) == 1
+    assert registry.metrics()["api"]["open"] is True
+    await registry.aclose()
+    assert client.is_closed
+    assert registry.get("api") is not client
+    await registry.aclose()
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def keepalive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_clients_survive_successive_event_loops(monkeypatch, keepalive_server):
+    """Celery tasks call asyncio.run once per run; pooled connections must not leak across loops"""
+    registry = ClientRegistry()
+    registry.register(UpstreamConfig("api", base_url=keepalive_server))
+    monkeypatch.setattr(http_clients, "registry", registry)
+
+    async def fetch():
+        return (await http_clients.registry.get("api").get("/")).text
+
+    assert http_clients.run_with_clients(fetch()) == "ok"
+    assert http_clients.run_with_clients(fetch()) == "ok"
+    assert registry.metrics()["api"]["open"] is False            # closed with its loop
+
+    assert asyncio.run(fetch()) == "ok"                           # rebuilt for a new loop
+    replaced = registry._clients["api"]
+    assert asyncio.run(fetch()) == "ok"
+    assert replaced.is_closed and registry._clients["api"] is not replaced
@@ -0,0 +1,66 @@
+import httpx
+import pytest
+
+from app.services.http_recording import FixtureWriter, RecordingAsyncTransport, load_fixtures
+from benchmarks.standin import StandInConfig, create_app
+
+
+def _upstream(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"hotels": {"hotels": [{"code": 1}]}},
+                          headers={"x-signature": "secret"})
+
+
+@pytest.mark.asyncio
+async def test_recorded_exchange_is_replayed_by_standin(tmp_path):
+    writer = FixtureWriter(str(tmp_path), "hotelbeds")
+    transport = RecordingAsyncTransport(httpx.MockTransport(_upstream), writer)
+    async with httpx.AsyncClient(transport=transport, base_url="http://hb") as client:
+        r = await client.post("/hotel-api/1.0/hotels", json={"destination": {"code": "BCN"}},
+                              headers={"Api-key": "k"})
+    assert r.json() == {"hotels": {"hotels": [{"code": 1}]}}
+
+    [exchange] = list(load_fixtures(str(tmp_path)))
+    assert exchange["request"] == {"destination": {"code": "BCN"}}
+    assert "x-signature" not in exchange["headers"]
+
+    app = create_app(StandInConfig(fixtures=str(tmp_path)))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url="http://standin") as client:
+        r = await client.post("/hotel-api/1.0/hotels", json={"destination": {"code": "PMI"}})
+        assert r.json() == exchange["response"]
+        stats = (await client.get("/_standin/stats")).json()
+    assert stats["replayed"] == 1 and stats["fixtures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_standin_synthesises_hotels_offers_and_errors():
+    app = create_app(StandInConfig(hotels_per_city=50, rates_per_hotel=2, offers_per_search=3))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                 base_url="http://standin") as client:
+        body = {"stay": {"checkIn": "2025-06-01", "checkOut": "2025-06-03"},
+                "destination": {"code": "BCN"}}
+        hotels = (await client.post("/hotel-api/1.0/hotels", json=body)).json()["hotels"]["hotels"]
+        assert len(hotels) == 50
+        content = (await client.get("/hotel-content-api/1.0/hotels",
+                                    params={"codes": hotels[0]["code"]})).json()["hotels"]
+        assert content[0]["category"]["simpleCode"] >= 0
+        page = (await client.get("/hotel-content-api/1.0/locations/destinations",
+                                 params={"from": 1001, "to": 2000})).json()
+        assert page["total"] == 1500 and len(page["destinations"]) == 500
+
+        slices = [{"origin": "LHR", "destination": "BCN", "departure_date": "2025-06-01"}]
+        search = (await client.post("/air/offer_requests?return_offers=true",
+                                    json={"data": {"slices": slices,
+                                                   "passengers": [{"type": "adult"}]}})).json()
+        offer_id = search["data"]["offers"][0]["id"]
+        offer = (await client.get(f"/air/offers/{offer_id}")).json()["data"]
+        assert offer["id"] == offer_id
+        order = await client.post("/air/orders", json={"data": {"selected_offers": [offer_id],
+                                                                 "passengers": []}})
+        assert order.status_code == 200
+
+    failing = create_app(StandInConfig(error_rate=1.0, error_status=429))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=failing),
+                                 base_url="http://standin") as client:
+        r = await client.get("/hotel-content-api/1.0/hotels", params={"codes": "1,2"})
+    assert r.status_code == 429
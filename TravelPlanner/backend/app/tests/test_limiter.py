@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from app.services.limiter import AdaptiveLimiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_concurrency_and_serves_priority_first():
+    """Waiters beyond the limit queue up and are admitted by priority"""
+    limiter = AdaptiveLimiter("test", initial=1, max_limit=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def call(name, priority):
+        async with limiter.slot(priority) as slot:
+            order.append(name)
+            if name == "first":
+                await gate.wait()
+            slot.observe(200)
+
+    first = asyncio.create_task(call("first", 0))
+    await asyncio.sleep(0)
+    low = asyncio.create_task(call("background", 10))
+    high = asyncio.create_task(call("interactive", 0))
+    await asyncio.sleep(0)
+    assert limiter.stats()["queue_depth"] == 2
+
+    gate.set()
+    await asyncio.gather(first, low, high)
+    assert order == ["first", "interactive", "background"]
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_aimd():
+    """Successes grow the limit additively, throttling shrinks it"""
+    limiter = AdaptiveLimiter("test", initial=10, max_limit=20, cooldown=0)
+    for _ in range(10):
+        async with limiter.slot() as slot:
+            slot.observe(200)
+    assert 10.5 < limiter.limit < 11.5
+
+    async with limiter.slot() as slot:
+        slot.observe(429)
+    assert limiter.limit < 8
+    assert limiter.stats()["throttled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancelled_waiter_does_not_leak():
+    limiter = AdaptiveLimiter("test", initial=1, max_limit=1)
+    async with limiter.slot():
+        waiter = asyncio.create_task(limiter.slot().__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    assert limiter.inflight == 0
+    assert limiter.queue_depth == 0
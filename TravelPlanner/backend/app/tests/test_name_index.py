@@ -0,0 +1,58 @@
+from app.services.name_index import HotelLookup, normalise
+
+
+ROWS = [
+    {"HOTEL_ID": 1, "HOTEL_NAME": "Hotel Sagrada Família", "CITY_CODE": "BCN", "COUNTRY_CODE": "ES"},
+    {"HOTEL_ID": 2, "HOTEL_NAME": "Hotel Arts Barcelona", "CITY_CODE": "BCN", "COUNTRY_CODE": "ES"},
+    {"HOTEL_ID": 3, "HOTEL_NAME": "Pestana Palace Lisboa", "CITY_CODE": "LIS", "COUNTRY_CODE": "PT"},
+    {"HOTEL_ID": 4, "HOTEL_NAME": "Hotel Palace", "CITY_CODE": "MAD", "COUNTRY_CODE": "ES"},
+]
+
+
+def _lookup():
+    lookup = HotelLookup(hotel_rows=lambda: ROWS,
+                         stored_names=lambda: [("77", "Sagrada Familia Suites")],
+                         cached_names=lambda: [("78", "Casa Fuster Hotel")],
+                         destination_names=lambda: [("BCN", "Barcelona", "Barcelona", "ES"),
+                                                    ("LIS", "Lisboa", "Lisboa", "PT"),
+                                                    ("LIS", "lisbon", "Lisboa", "PT")])
+    lookup.reload()
+    return lookup
+
+
+def test_normalise_strips_accents_and_punctuation():
+    assert normalise("  Hôtel  d'Orsay—Paris ") == "hotel d orsay paris"
+
+
+def test_typo_tolerant_hotel_lookup():
+    """Misspelt names still resolve to DB ids and Hotelbeds codes"""
+    lookup = _lookup()
+    top = lookup.lookup("sagarda familia")
+    assert {(m["source"], m["id"]) for m in top[:2]} == {("db", 1), ("hotelbeds", "77")}
+    assert lookup.lookup("pestana palase lisbon")[0]["id"] == 3
+    assert lookup.lookup("casa fuster")[0]["id"] == "78"       # from the static cache
+
+
+def test_destination_lookup_by_kind():
+    lookup = _lookup()
+    [match] = lookup.lookup("LIS", kind="destination")
+    assert match["id"] == "LIS" and match["country_code"] == "PT"
+    assert all(m["kind"] == "hotel" for m in lookup.lookup("palace", kind="hotel"))
+    assert lookup.lookup("zzzzqqq") == []
+
+
+def test_misspelt_destination_names_resolve():
+    lookup = _lookup()
+    match = lookup.lookup("Barcelna", kind="destination")[0]
+    assert (match["id"], match["name"]) == ("BCN", "Barcelona")
+    assert lookup.lookup("lisbn", kind="destination")[0]["id"] == "LIS"
+
+
+def test_kind_filter_applies_before_the_rescore_cut():
+    rows = [{"HOTEL_ID": i, "HOTEL_NAME": f"Hotel Madrid {i}", "CITY_CODE": "MAD"}
+            for i in range(200)]
+    lookup = HotelLookup(hotel_rows=lambda: rows, stored_names=list, cached_names=list,
+                         destination_names=lambda: [("MAD", "Madrid", "Madrid", "ES")])
+    lookup.reload()
+    [match] = lookup.lookup("madrid", k=1, kind="destination")
+    assert match["id"] == "MAD" and match["name"] == "Madrid"
@@ -0,0 +1,98 @@
+import asyncio
+import httpx
+import pytest
+from app.services.limiter import AdaptiveLimiter
+from app.services.resilience import LatencyTracker, RetryBudget, hedged_call
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://example.test/")
+    return httpx.HTTPStatusError("error", request=request,
+                                 response=httpx.Response(status, request=request))
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_delay_and_fast_attempt_wins():
+    """A slow first attempt is raced by a hedge"""
+    tracker = LatencyTracker(default=0.01)
+    budget = RetryBudget()
+    delays = iter([1.0, 0.0])
+    started = []
+
+    async def attempt():
+        started.append(1)
+        await asyncio.sleep(next(delays))
+        return len(started)
+
+    assert await asyncio.wait_for(hedged_call(attempt, tracker, budget), 0.5) == 2
+    assert budget.stats["hedges"] == 1 and budget.stats["hedge_wins"] == 1
+    assert tracker.stats()["samples"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors_only():
+    budget = RetryBudget()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _status_error(503)
+        return "ok"
+
+    assert await hedged_call(flaky, LatencyTracker(), budget, backoff=0) == "ok"
+    assert budget.stats["retries"] == 2
+
+    async def bad_request():
+        raise _status_error(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await hedged_call(bad_request, LatencyTracker(), budget, backoff=0)
+    assert budget.stats["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_caps_amplification():
+    """Once the budget is spent, failures are returned without retrying"""
+    budget = RetryBudget(ratio=0.1, min_per_sec=0, max_tokens=1)
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise httpx.ConnectError("down")
+
+    for _ in range(5):
+        with pytest.raises(httpx.ConnectError):
+            await hedged_call(down, LatencyTracker(), budget, backoff=0)
+    assert len(calls) == 6              # 5 first attempts + the single budgeted retry
+    assert budget.stats["exhausted"] >= 4
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_wait_neither_hedges_nor_counts_as_latency():
+    """The hedge timer and the latency sample start at limiter admission"""
+    limiter = AdaptiveLimiter("test", initial=1, max_limit=1)
+    tracker = LatencyTracker(default=0.05, min_samples=1)
+    budget = RetryBudget()
+    gate = asyncio.Event()
+
+    async def blocker():
+        async with limiter.slot() as slot:
+            await gate.wait()
+            slot.observe(200)
+
+    async def attempt():
+        async with limiter.slot() as slot:
+            await asyncio.sleep(0.01)
+            slot.observe(200)
+        return "ok"
+
+    held = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    call = asyncio.create_task(hedged_call(attempt, tracker, budget))
+    await asyncio.sleep(0.2)                                # queued far past the hedge delay
+    gate.set()
+    assert await call == "ok"
+    await held
+    assert budget.stats["hedges"] == 0
+    assert tracker.quantile(0.5) < 0.1
@@ -0,0 +1,130 @@
+import datetime
+import time
+
+import numpy as np
+import pytest
+
+from app.services import semantic_cache as sc
+from app.services.destinations import DestinationResolver
+from app.tests.test_destinations import DESTINATIONS
+
+
+def _bag_of_words(texts):
+    """Stand-in embedding: hashed word counts, unit length."""
+    out = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.split():
+            out[row, hash(word) % 64] += 1
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+@pytest.fixture(autouse=True)
+def resolver(monkeypatch):
+    resolver = DestinationResolver()
+    resolver.load(DESTINATIONS)
+    monkeypatch.setattr(sc, "destination_resolver", resolver)
+
+
+def test_slots_are_extracted_and_masked():
+    friday = datetime.date(2025, 3, 7)
+    slots = sc.extract_slots("Cheap hotels in Barcelona next weekend!", today=friday)
+    assert slots.destination == "BCN"
+    assert slots.dates == ("2025-03-15", "2025-03-16")
+    assert slots.masked == "cheap hotels in place date"
+
+    iso = sc.extract_slots("hotels in madrid from 2025-04-01 to 2025-04-03")
+    assert iso.key == ("MAD", ("2025-04-01", "2025-04-03"), ())
+
+
+
+@pytest.mark.parametrize("query", [
+    "cheap hotels in Lisbon or Madrid next weekend",
+    "cheap hotels in Lisbon or Barcelona next weekend",
+    "hotels in Barcelona, then fly to Malaga",
+    "hotels in centro",                                   # Madrid's or Malaga's
+])
+def test_several_destinations_are_uncacheable(query):
+    slots = sc.extract_slots(query)
+    assert slots.destination is None and not slots.cacheable
+    assert slots.masked.count("place") == len(sc.destination_resolver.mentioned(query))
+
+@pytest.mark.parametrize("query, dates", [
+    ("hotels in madrid March 3–5", ("2026-03-03", "2026-03-05")),        # already past: next year
+    ("hotels in madrid 15/03 to 17/03", ("2025-03-15", "2025-03-17")),
+    ("hotels in madrid the 12th to the 14th", ("2025-03-12", "2025-03-14")),
+    ("hotels in madrid from the 3rd to the 5th of april", ("2025-04-03", "2025-04-05")),
+    ("hotels in madrid dec 30 - jan 2", ("2025-12-30", "2026-01-02")),
+])
+def test_written_dates_are_slots(query, dates):
+    slots = sc.extract_slots(query, today=datetime.date(2025, 3, 7))
+    assert slots.dates == dates and slots.cacheable
+    assert not any(ch.isdigit() for ch in slots.masked)
+
+
+def test_occupancy_is_a_slot_and_leftovers_are_uncacheable():
+    two = sc.extract_slots("hotels in madrid for 2 adults and one child")
+    four = sc.extract_slots("hotels in madrid for four adults and 1 child")
+    assert two.occupancy == ("adults=2", "children=1")
+    assert four.occupancy == ("adults=4", "children=1")
+    assert two.masked == four.masked and two.key != four.key
+
+    for query in ("hotels in madrid with 4.5 stars", "hotels in madrid in march",
+                  "hotels in madrid feb 30", "hotels in madrid for three"):
+        assert not sc.extract_slots(query).cacheable, query
+    assert sc.extract_slots("may I see hotels in madrid").cacheable
+
+
+@pytest.mark.asyncio
+async def test_near_duplicates_hit_and_other_slots_miss():
+    cache = sc.SemanticCache(embed=_bag_of_words, threshold=0.8, ttl=60)
+    await cache.store("cheap hotels in Barcelona next weekend", "Try Hotel A", ["get_cheapest_hotels"])
+
+    hit = await cache.lookup("Cheap hotels in barcelona next weekend?")
+    assert hit.reply == "Try Hotel A" and hit.similarity >= 0.99
+    assert await cache.lookup("cheap hotels in Madrid next weekend") is None      # other destination
+    assert await cache.lookup("cheap hotels in Barcelona this weekend") is None   # other dates
+    assert await cache.lookup("family friendly spa resort in Barcelona next weekend") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+    await cache.store("hotels in Barcelona for 2 adults", "For two")
+    assert await cache.lookup("hotels in Barcelona for 4 adults") is None
+    assert await cache.store("hotels in Barcelona around the 4.5 star mark", "x") is False
+    assert await cache.lookup("hotels in Barcelona around the 4.5 star mark") is None
+    assert cache.stats()["uncacheable"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expiry_and_capacity():
+    cache = sc.SemanticCache(embed=_bag_of_words, threshold=0.8, ttl=60, max_entries=2)
+    await cache.store("hotels in lisbon", "old")
+    cache._buckets[("LIS", (), ())][1][0].created = time.time() - 120
+    assert await cache.lookup("hotels in lisbon") is None
+    assert cache.stats()["expired"] == 1
+
+    await cache.store("hotels in madrid", "m")
+    await cache.store("hotels in malaga", "g")
+    assert len(cache) == 2 and ("LIS", (), ()) not in cache._buckets
+    assert (await cache.lookup("hotels in malaga")).reply == "g"
+
+
+@pytest.mark.asyncio
+async def test_disabled_without_model(monkeypatch):
+    monkeypatch.setattr(sc, "_sentence_transformer", lambda: None)
+    cache = sc.SemanticCache()
+    assert await cache.store("hotels in lisbon", "x") is False
+    assert await cache.lookup("hotels in lisbon") is None
+    assert cache.stats()["enabled"] is False
+
+
+@pytest.mark.asyncio
+async def test_store_runs_in_the_background(monkeypatch):
+    loads = []
+    monkeypatch.setattr(sc, "_sentence_transformer", lambda: loads.append(1) or _bag_of_words)
+    cache = sc.SemanticCache(threshold=0.8, ttl=60)
+    cache.start()
+    task = cache.schedule_store("hotels in lisbon", "x")
+    assert len(cache) == 0
+    await task
+    assert (await cache.lookup("hotels in lisbon")).reply == "x"
+    assert loads == [1]
+    await cache.stop()
@@ -0,0 +1,37 @@
+from app.services import hotel_ops
+from app.services.static_store import HotelStaticStore
+from app.workers import tasks
+
+
+def _availability_by_night(dest, cin, cout, *args, **kwargs):
+    code = 100 + int(cin[-2:])
+    rate = {"net": "80", "boardCode": "BB", "rateClass": "NOR"}
+    return {"hotels": [{"code": code, "rooms": [{"rates": [rate]}]},
+                       {"code": 1, "rooms": [{"rates": [rate]}]}]}
+
+
+def test_calendar_sweep_seeds_a_fresh_static_store(monkeypatch, tmp_path):
+    """The sweep writes static content for new hotels without a writable API store"""
+    fetched = []
+
+    async def _availability(*args, **kwargs):
+        return _availability_by_night(*args, **kwargs)
+
+    async def _fetch(codes, priority=0):
+        fetched.extend(codes)
+        return {c: {"code": int(c), "name": f"Hotel {c}"} for c in codes}
+
+    static_path = str(tmp_path / "static.db")
+    monkeypatch.setattr(hotel_ops, "availability", _availability)
+    monkeypatch.setattr(hotel_ops, "_fetch_static_chunk", _fetch)
+    monkeypatch.setattr(tasks.settings, "price_calendar_db_path", str(tmp_path / "calendar.db"))
+    monkeypatch.setattr(tasks.settings, "hotel_static_db_path", static_path)
+    assert tasks.settings.hotel_static_db_writable is False
+
+    assert tasks.sweep_price_calendar(dests=["BCN"], nights=2) == 2
+    store = HotelStaticStore(static_path)
+    assert len(store) == 3 and store.missing_codes(["1", "999"]) == ["999"]
+    store.close()
+
+    tasks.sweep_price_calendar(dests=["BCN"], nights=2)            # nothing new to seed
+    assert len(fetched) == 3
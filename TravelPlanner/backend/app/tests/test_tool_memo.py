@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.tool_memo import ToolMemo, canonical_args, current_session
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _counting_tool():
+    calls = []
+
+    async def tool(dest, cin, cout, top_n=10):
+        calls.append((dest, cin, cout, top_n))
+        if dest == "XXX":
+            return {"error": "Unknown destination 'XXX'"}
+        return [{"hotelCode": 1, "net": "80"}]
+    return tool, calls
+
+
+def test_canonical_args_ignore_keyword_order():
+    assert canonical_args((), {"a": 1, "b": [2, 1]}) == canonical_args((), {"b": [2, 1], "a": 1})
+    assert canonical_args((), {"b": [2, 1]}) != canonical_args((), {"b": [1, 2]})
+
+
+@pytest.mark.asyncio
+async def test_repeats_within_a_session_are_served_from_memo():
+    clock = _Clock()
+    memo = ToolMemo(ttl=60, max_sessions=10, clock=clock)
+    tool, calls = _counting_tool()
+    cheapest = memo.wrap("get_cheapest_hotels", tool)
+
+    stats = memo.begin_turn("s1")
+    await cheapest(dest="BCN", cin="2025-03-01", cout="2025-03-03")
+    await cheapest(cout="2025-03-03", cin="2025-03-01", dest="BCN")
+    await cheapest(dest="BCN", cin="2025-03-01", cout="2025-03-03", top_n=5)
+    assert len(calls) == 2 and stats == {"hits": 1, "misses": 2}
+
+    await cheapest(dest="XXX", cin="2025-03-01", cout="2025-03-03")
+    await cheapest(dest="XXX", cin="2025-03-01", cout="2025-03-03")     # errors are not kept
+    assert len(calls) == 4
+
+    memo.begin_turn("s2")                                      # other sessions do not share
+    await cheapest(dest="BCN", cin="2025-03-01", cout="2025-03-03")
+    assert len(calls) == 5
+
+    memo.begin_turn("s1")
+    clock.now = 61                                             # expired
+    await cheapest(dest="BCN", cin="2025-03-01", cout="2025-03-03")
+    assert len(calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_no_session_means_no_memo_and_turns_are_isolated():
+    memo = ToolMemo(ttl=60, max_sessions=1)
+    tool, calls = _counting_tool()
+    cheapest = memo.wrap("get_cheapest_hotels", tool)
+
+    async def turn(session_id):
+        stats = memo.begin_turn(session_id)
+        await cheapest(dest="BCN", cin="a", cout="b")
+        return stats
+
+    a, b = await asyncio.gather(turn("s1"), turn("s2"))          # separate contexts
+    assert a == b == {"hits": 0, "misses": 1}
+    assert memo.stats()["sessions"] == 1                       # LRU bound
+
+    assert current_session.get() is None
+    await cheapest(dest="BCN", cin="a", cout="b")
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_spellings_of_one_city_share_a_memo_entry(monkeypatch):
+    from app.services import lc_tools
+    from app.services.destinations import DestinationResolver
+    from app.tests.test_destinations import DESTINATIONS
+
+    resolver = DestinationResolver()
+    resolver.load(DESTINATIONS)
+    memo = ToolMemo(ttl=60, max_sessions=10)
+    monkeypatch.setattr(lc_tools, "destination_resolver", resolver)
+    monkeypatch.setattr(lc_tools, "tool_memo", memo)
+    tool, calls = _counting_tool()
+    cheapest = lc_tools.hotelbeds_tool("get_cheapest_hotels", tool)
+
+    stats = memo.begin_turn("s1")
+    await cheapest(dest="Barcelona", cin="2025-03-01", cout="2025-03-03")
+    await cheapest(dest="BCN", cin="2025-03-01", cout="2025-03-03")
+    assert calls == [("BCN", "2025-03-01", "2025-03-03", 10)]
+    assert stats == {"hits": 1, "misses": 1}
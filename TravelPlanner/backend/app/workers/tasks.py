@@ -1,5 +1,6 @@
 from celery import Celery
 from app.core.settings import settings
+from app.services.http_clients import run_with_clients
 
 app = Celery(
     "worker",
@@ -7,6 +8,74 @@ app = Celery(
     backend=settings.redis_url,
 )
 
+app.conf.beat_schedule = {
+    "refresh-hotel-static": {
+        "task": "app.workers.tasks.refresh_hotel_static",
+        "schedule": 6 * 60 * 60,
+    },
+    "sweep-price-calendar": {
+        "task": "app.workers.tasks.sweep_price_calendar",
+        "schedule": 4 * 60 * 60,
+    },
+    "refresh-destinations": {
+        "task": "app.workers.tasks.refresh_destinations",
+        "schedule": 24 * 60 * 60,
+    },
+}
+
 @app.task
 def ping():
     return "pong"
+
+@app.task
+def refresh_hotel_static(codes=None, max_age=None, limit=None):
+    """Refresh stale entries of the on-disk hotel static content store."""
+    from app.services import hotel_ops
+    from app.services.static_store import HotelStaticStore
+
+    store = HotelStaticStore(settings.hotel_static_db_path, readonly=False)
+    try:
+        return run_with_clients(
+            hotel_ops.refresh_static_store(store, max_age=max_age,
+                                           codes=codes or (), limit=limit)
+        )
+    finally:
+        store.close()
+
+@app.task
+def sweep_price_calendar(dests=None, nights=None):
+    """Refresh the lowest-price calendar for popular destinations, and seed
+    the hotel static store with any hotel the sweep saw for the first time."""
+    from app.services import hotel_ops
+    from app.services.price_calendar import CalendarStore
+    from app.services.static_store import HotelStaticStore
+
+    async def _sweep(store, static):
+        hotel_codes = set()
+        written = await hotel_ops.sweep_price_calendar(
+            store,
+            dests or settings.price_calendar_destinations,
+            nights or settings.price_calendar_nights,
+            hotel_codes=hotel_codes,
+        )
+        await hotel_ops.seed_static_store(static, hotel_codes)
+        return written
+
+    store = CalendarStore(settings.price_calendar_db_path, readonly=False)
+    static = HotelStaticStore(settings.hotel_static_db_path, readonly=False)
+    try:
+        return run_with_clients(_sweep(store, static))
+    finally:
+        store.close()
+        static.close()
+
+@app.task
+def refresh_destinations():
+    """Re-fetch the Hotelbeds destination list used by the destination resolver."""
+    from app.services import hotel_ops
+    from app.services.destinations import destination_resolver
+
+    destinations = run_with_clients(hotel_ops.fetch_destinations())
+    if destinations:
+        destination_resolver.write_file(settings.destinations_path, destinations)
+    return len(destinations)
@@ -0,0 +1,151 @@
+"""Time and peak memory of the hotel flatten / filter / rank hot paths.
+
+Every case runs on synthetic availability payloads (1k, 10k and 100k rates
+by default). Ranking functions are called through ``hotel_ops`` with the
+payload and the static content already cached, so no network is involved
+and the numbers cover only our own work. Run from TravelPlanner/backend:
+
+    python -m benchmarks.bench_hot_paths [--sizes 1000 10000 100000]
+                                         [--repeat 10] [--out results.json]
+
+Compare a run against the committed baseline with
+``python -m benchmarks.check_regression results.json``; refresh the
+baseline (on the reference machine) with ``--out benchmarks/baseline.json``.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import numpy as np
+
+from app.services import hotel_ops
+from app.services.lc_tools import select_best_hotel
+from app.services.rate_table import RateTable
+from benchmarks.synthetic import synthetic_availability, synthetic_content
+
+DEST, CIN, COUT = "BCN", "2025-03-01", "2025-03-03"
+
+
+def _prime_caches(raw: dict) -> None:
+    """Serve ``raw`` and its hotels' static content from hotel_ops' caches."""
+    hotel_ops.clear_availability_cache()
+    key = hotel_ops._cache_key(hotel_ops._availability_body(DEST, CIN, COUT, 1, 2, 0))
+    hotel_ops._avail_cache[key] = (time.monotonic(), raw, 0, None)
+    hotel_ops._static_cache.clear()
+    now = time.monotonic()
+    content = synthetic_content(h["code"] for h in raw["hotels"]["hotels"])
+    for h in content["hotels"]:
+        hotel_ops._static_cache[str(h["code"])] = (now, h)
+
+
+def _cases(raw: dict, loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[], object]]:
+    run = loop.run_until_complete
+    table = run(hotel_ops._flatten_rates(raw))
+    candidates = [{"code": table.hotel_codes[table.hotel[i]], "price": float(table.net[i]),
+                   "rating": int(table.category[i])} for i in range(len(table))]
+    return {
+        # flatten (ingest; hotel_ops keeps the table per payload afterwards)
+        "flatten": lambda: RateTable.from_availability(raw),
+        # filter
+        "filter.board_bb": lambda: table.take(table.board_is("BB")),
+        "filter.nrf": lambda: table.take(table.rate_class_is("NRF")),
+        "filter.free_cxl": lambda: table.take(table.free_cancellation()),
+        "filter.before_date": lambda: table.take(table.penalty_free_until("2025-02-20")),
+        "filter.indexed_window_bb": lambda: table.select(
+            penalty_free_after="2025-02-10", penalty_from_before="2025-02-20",
+            board="BB", max_net=300),
+        # sort
+        "sort.full_lowest_price": lambda: np.lexsort(
+            table.sort_keys(hotel_ops.LOWEST_PRICE_ORDER)[::-1]),
+        # top-k
+        "topk.lowest_price": lambda: table.records(
+            table.top_k(10, hotel_ops.LOWEST_PRICE_ORDER)),
+        "topk.best_promo": lambda: table.records(
+            table.top_k(10, hotel_ops.BEST_PROMO_ORDER)),
+        # static merge
+        "static.merge": lambda: run(hotel_ops.hotel_static(*table.hotel_code_set())),
+        # end to end through hotel_ops (cached payload, no network)
+        "hotel_ops.lowest_prices": lambda: run(
+            hotel_ops.hotels_lowest_prices(DEST, CIN, COUT, top_n=10)),
+        "hotel_ops.highest_rating": lambda: run(
+            hotel_ops.hotels_highest_rating(DEST, CIN, COUT, top_n=5)),
+        "hotel_ops.cxl_policy": lambda: run(
+            hotel_ops.hotels_with_cxl_policy(DEST, CIN, COUT, "FREE")),
+        "hotel_ops.best_promo_board": lambda: run(
+            hotel_ops.hotels_best_promo_board(DEST, CIN, COUT, "BB", 10)),
+        "hotel_ops.ranked_weighted": lambda: run(
+            hotel_ops.hotels_ranked(DEST, CIN, COUT, top_n=10)),
+        "hotel_ops.ranked_pareto": lambda: run(
+            hotel_ops.hotels_ranked(DEST, CIN, COUT, mode="pareto", top_n=10)),
+        "lc_tools.select_best_hotel": lambda: run(
+            select_best_hotel(candidates, budget=300)),
+    }
+
+
+def _time(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()                                                    # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"ms": round(min(samples) * 1e3, 4),
+            "median_ms": round(statistics.median(samples) * 1e3, 4)}
+
+
+def _peak_kib(fn: Callable[[], object]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def run_suite(sizes, repeat: int) -> dict:
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for size in sizes:
+            raw = synthetic_availability(size)
+            _prime_caches(raw)
+            for name, fn in _cases(raw, loop).items():
+                reps = max(repeat, repeat * 10_000 // size)  # small sizes are noisier
+                results[f"{name}@{size}"] = {**_time(fn, reps), "peak_kib": _peak_kib(fn)}
+    finally:
+        loop.close()
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__,
+                 "machine": platform.machine(), "processor": platform.processor()},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.repeat)
+    print(f"{'case':<40}{'best ms':>11}{'median ms':>11}{'peak KiB':>11}")
+    for name, r in report["results"].items():
+        print(f"{name:<40}{r['ms']:>11.3f}{r['median_ms']:>11.3f}{r['peak_kib']:>11.1f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Full sort vs partial top-k for the hotel ranking tools.
+
+Run from TravelPlanner/backend:
+
+    python -m benchmarks.bench_topk [--rates 50000] [--top-n 10] [--repeat 20]
+"""
+
+import argparse
+import time
+
+from app.services.rate_table import RateTable, hotel_list
+from app.services.hotel_ops import LOWEST_PRICE_ORDER, BEST_PROMO_ORDER
+from benchmarks.synthetic import synthetic_availability
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=int, default=50_000)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    raw = synthetic_availability(args.rates)
+    table = RateTable.from_availability(raw)
+    flat = [{**r, "hotelCode": h["code"]}
+            for h in hotel_list(raw) for room in h["rooms"] for r in room["rates"]]
+    k = args.top_n
+
+    cases = {
+        "lowest price": (
+            # previous implementation: sort every dict, then slice
+            lambda: sorted(flat, key=lambda r: float(r["net"]))[:k],
+            lambda: table.records(table.top_k(k, LOWEST_PRICE_ORDER)),
+        ),
+        "best promo (BB)": (
+            lambda: sorted([r for r in flat if r["boardCode"] == "BB"],
+                           key=lambda r: len(r.get("promotions", [])),
+                           reverse=True)[:k],
+            lambda: (lambda t: t.records(t.top_k(k, BEST_PROMO_ORDER)))(
+                table.take(table.board_is("BB"))),
+        ),
+    }
+
+    print(f"{len(table)} rates, top_n={k}, best of {args.repeat}")
+    print(f"{'case':<18}{'sort+slice ms':>15}{'top-k ms':>12}{'speedup':>10}")
+    for name, (old, new) in cases.items():
+        t_old, t_new = _best(old, args.repeat), _best(new, args.repeat)
+        print(f"{name:<18}{t_old:>15.2f}{t_new:>12.2f}{t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
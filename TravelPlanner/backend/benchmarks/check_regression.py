@@ -0,0 +1,73 @@
+"""Flag hot-path slowdowns against the committed benchmark baseline.
+
+Run from TravelPlanner/backend after ``bench_hot_paths --out results.json``:
+
+    python -m benchmarks.check_regression results.json
+        [--baseline benchmarks/baseline.json] [--threshold 0.25]
+        [--memory-threshold 0.25] [--min-ms 0.5]
+
+Exits with status 1 when any case is more than ``threshold`` slower (best
+time) or uses more than ``memory-threshold`` extra peak memory than the
+baseline. Cases faster than ``min-ms`` in the baseline are timer noise and
+only checked for memory. Baselines are machine specific: compare runs from
+the machine that recorded the baseline.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Tuple
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def compare(baseline: dict, current: dict, threshold: float, memory_threshold: float,
+            min_ms: float) -> Tuple[List[str], List[str]]:
+    """(regressions, notes) of ``current`` results against ``baseline``."""
+    regressions, notes = [], []
+    base, cur = baseline["results"], current["results"]
+    for name in sorted(base):
+        if name not in cur:
+            notes.append(f"{name}: missing from current run")
+            continue
+        b, c = base[name], cur[name]
+        if b["ms"] >= min_ms and c["ms"] > b["ms"] * (1 + threshold):
+            regressions.append(f"{name}: {b['ms']:.3f} ms -> {c['ms']:.3f} ms "
+                               f"(+{c['ms'] / b['ms'] - 1:.0%})")
+        if b["peak_kib"] > 0 and c["peak_kib"] > b["peak_kib"] * (1 + memory_threshold):
+            regressions.append(f"{name}: peak {b['peak_kib']:.1f} KiB -> {c['peak_kib']:.1f} KiB "
+                               f"(+{c['peak_kib'] / b['peak_kib'] - 1:.0%})")
+    notes.extend(f"{name}: new case, no baseline" for name in sorted(set(cur) - set(base)))
+    if baseline.get("meta") != current.get("meta"):
+        notes.append(f"environment differs from baseline: {baseline.get('meta')} vs {current.get('meta')}")
+    return regressions, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results", help="JSON written by bench_hot_paths --out")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.25)
+    parser.add_argument("--min-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        current = json.load(f)
+    regressions, notes = compare(baseline, current, args.threshold,
+                                 args.memory_threshold, args.min_ms)
+    for note in notes:
+        print(f"note: {note}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions beyond {args.threshold:.0%} time / "
+          f"{args.memory_threshold:.0%} memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Local stand-in for the Hotelbeds and Duffel APIs.
+
+Replays fixtures captured with ``HTTP_RECORD_DIR`` (see
+``app/services/http_recording.py``) and synthesises anything that was not
+recorded, e.g. 5k hotels per city. Latency and errors can be injected to
+load-test the hotel and flight paths offline. Run from TravelPlanner/backend:
+
+    python -m benchmarks.standin [--port 8900] [--fixtures DIR] [--hotels 5000]
+                                 [--latency-ms 150] [--jitter-ms 100]
+                                 [--error-rate 0.02] [--error-status 503]
+
+then point the app at it:
+
+    HOTELBEDS_BASE_URL=http://127.0.0.1:8900 DUFFEL_BASE_URL=http://127.0.0.1:8900
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from app.services.http_recording import load_fixtures
+from benchmarks.synthetic import (synthetic_availability, synthetic_content,
+                                  synthetic_destinations, synthetic_offers)
+
+
+@dataclass
+class StandInConfig:
+    fixtures: Optional[str] = None
+    hotels_per_city: int = 5000
+    destinations: int = 1500
+    rates_per_hotel: int = 10
+    offers_per_search: int = 50
+    latency: float = 0.0                 # seconds added to every response
+    jitter: float = 0.0                  # plus uniform 0..jitter seconds
+    replay_latency: bool = False         # use the latency recorded in the fixture
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 0
+
+
+class _Replays:
+    """Recorded responses per (method, path), handed out round-robin."""
+
+    def __init__(self, root: Optional[str]):
+        grouped: Dict[Tuple[str, str], List[dict]] = {}
+        if root:
+            for exchange in load_fixtures(root):
+                grouped.setdefault((exchange["method"], exchange["path"]), []).append(exchange)
+        self._cycles = {key: itertools.cycle(items) for key, items in grouped.items()}
+        self.count = sum(len(items) for items in grouped.values())
+
+    def next(self, method: str, path: str) -> Optional[dict]:
+        cycle = self._cycles.get((method, path))
+        return next(cycle) if cycle is not None else None
+
+
+class _Bounded(OrderedDict):
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def create_app(config: StandInConfig = StandInConfig()) -> FastAPI:
+    app = FastAPI(title="Provider stand-in")
+    replays = _Replays(config.fixtures)
+    rnd = random.Random(config.seed)
+    payloads = _Bounded(32)              # serialised synthetic availability by search
+    offers = _Bounded(10_000)            # offer id -> offer, so offers can be booked
+    stats = {"requests": 0, "replayed": 0, "synthetic": 0, "injected_errors": 0}
+    app.state.stats = stats
+
+    @app.middleware("http")
+    async def inject(request: Request, call_next):
+        stats["requests"] += 1
+        delay = config.latency + rnd.uniform(0, config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if config.error_rate and rnd.random() < config.error_rate:
+            stats["injected_errors"] += 1
+            return JSONResponse({"error": {"code": "INJECTED", "message": "stand-in error"}},
+                                status_code=config.error_status)
+        return await call_next(request)
+
+    async def replay(request: Request) -> Optional[Response]:
+        exchange = replays.next(request.method, request.url.path)
+        if exchange is None:
+            return None
+        stats["replayed"] += 1
+        if config.replay_latency:
+            await asyncio.sleep(exchange.get("latency", 0.0))
+        body = exchange["response"]
+        content = body if isinstance(body, str) else json.dumps(body)
+        media_type = exchange.get("headers", {}).get("content-type", "application/json")
+        return Response(content, status_code=exchange["status"], media_type=media_type)
+
+    # --- Hotelbeds ------------------------------------------------------------
+    @app.post("/hotel-api/1.0/hotels")
+    async def availability(request: Request):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        body = await request.json()
+        dest = body["destination"]["code"]
+        stay = body["stay"]
+        key = (dest, stay["checkIn"], stay["checkOut"])
+        content = payloads.get(key)
+        if content is None:
+            # Disjoint code ranges per destination, stable across restarts.
+            first_code = 1000 + zlib.crc32(dest.encode()) % 900 * 100_000
+            seed = zlib.crc32(json.dumps(key).encode()) ^ config.seed
+            payload = synthetic_availability(
+                config.hotels_per_city * config.rates_per_hotel, config.rates_per_hotel,
+                dest=dest, seed=seed, first_code=first_code,
+                check_in=stay["checkIn"], check_out=stay["checkOut"])
+            content = payloads[key] = json.dumps(payload).encode()
+        stats["synthetic"] += 1
+        return Response(content, media_type="application/json")
+
+    @app.get("/hotel-content-api/1.0/hotels")
+    async def content(request: Request, codes: str = ""):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        stats["synthetic"] += 1
+        return synthetic_content([c for c in codes.split(",") if c], seed=config.seed)
+
+    @app.get("/hotel-content-api/1.0/locations/destinations")
+    async def destinations(request: Request):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        stats["synthetic"] += 1
+        first = int(request.query_params.get("from", 1))
+        last = int(request.query_params.get("to", first + 999))
+        every = synthetic_destinations(config.destinations)
+        return {"from": first, "to": min(last, len(every)), "total": len(every),
+                "destinations": every[first - 1:last]}
+
+    # --- Duffel ---------------------------------------------------------------
+    @app.get("/places/suggestions")
+    async def places(request: Request, query: str = ""):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        stats["synthetic"] += 1
+        code = (query[:3] or "XXX").upper()
+        return {"data": [{"type": "airport", "iata_code": code, "name": f"{query.title()} Airport",
+                          "city_name": query.title()}]}
+
+    @app.post("/air/offer_requests")
+    async def offer_request(request: Request):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        data = (await request.json())["data"]
+        payload = synthetic_offers(data["slices"], passengers=len(data.get("passengers", [])) or 1,
+                                   n_offers=config.offers_per_search,
+                                   seed=rnd.randrange(10_000))
+        for offer in payload["data"]["offers"]:
+            offers[offer["id"]] = offer
+        stats["synthetic"] += 1
+        return payload
+
+    @app.get("/air/offers/{offer_id}")
+    async def offer(request: Request, offer_id: str):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        found = offers.get(offer_id)
+        if found is None:
+            return JSONResponse({"errors": [{"code": "not_found", "title": "Offer not found"}]},
+                                status_code=404)
+        stats["synthetic"] += 1
+        return {"data": found}
+
+    @app.post("/air/orders")
+    async def order(request: Request):
+        recorded = await replay(request)
+        if recorded is not None:
+            return recorded
+        data = (await request.json())["data"]
+        offer_id = data["selected_offers"][0]
+        if offer_id not in offers:
+            return JSONResponse({"errors": [{"code": "offer_no_longer_available",
+                                             "title": "Offer no longer available"}]},
+                                status_code=422)
+        stats["synthetic"] += 1
+        return {"data": {"id": f"ord_{uuid.uuid4().hex[:16]}",
+                         "booking_reference": uuid.uuid4().hex[:6].upper(),
+                         "total_amount": offers[offer_id]["total_amount"],
+                         "total_currency": offers[offer_id]["total_currency"],
+                         "passengers": data["passengers"]}}
+
+    @app.get("/_standin/stats")
+    async def standin_stats():
+        return {**stats, "fixtures": replays.count}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--fixtures", help="directory written with HTTP_RECORD_DIR")
+    parser.add_argument("--hotels", type=int, default=5000, help="synthetic hotels per city")
+    parser.add_argument("--rates-per-hotel", type=int, default=10)
+    parser.add_argument("--destinations", type=int, default=1500, help="synthetic destinations")
+    parser.add_argument("--offers", type=int, default=50, help="synthetic offers per search")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--replay-latency", action="store_true")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = StandInConfig(
+        fixtures=args.fixtures, hotels_per_city=args.hotels, destinations=args.destinations,
+        rates_per_hotel=args.rates_per_hotel, offers_per_search=args.offers,
+        latency=args.latency_ms / 1e3, jitter=args.jitter_ms / 1e3,
+        replay_latency=args.replay_latency, error_rate=args.error_rate,
+        error_status=args.error_status, seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
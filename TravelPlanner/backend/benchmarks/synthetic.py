@@ -0,0 +1,126 @@
+"""Synthetic Hotelbeds and Duffel payloads for offline benchmarks"""
+
+import itertools
+import random
+import string
+from datetime import datetime, timedelta, timezone
+
+BOARDS = ("RO", "BB", "HB", "FB", "AI")
+CATEGORIES = ("1EST", "2EST", "3EST", "4EST", "5EST", "4LUX", "5LUX", "HS2")
+CITIES = (("BCN", "Barcelona", "ES"), ("MAD", "Madrid", "ES"), ("PMI", "Mallorca", "ES"),
+          ("LIS", "Lisboa", "PT"), ("PAR", "Paris", "FR"), ("LON", "London", "GB"),
+          ("ROE", "Roma", "IT"), ("AMS", "Amsterdam", "NL"), ("BER", "Berlin", "DE"),
+          ("NYC", "New York", "US"))
+
+
+def category(code: str) -> dict:
+    """Content API ``category`` object for a category code ("4LUX" -> 4 stars)."""
+    return {"code": code, "simpleCode": int(code[0]) if code[0].isdigit() else 0}
+
+
+def synthetic_availability(n_rates: int, rates_per_hotel: int = 10,
+                           dest: str = "BCN", seed: int = 0, first_code: int = 1000,
+                           check_in: str = "2025-03-01", check_out: str = "2025-03-03") -> dict:
+    """Availability response shaped like ``POST /hotel-api/1.0/hotels``.
+
+    Hotels get ``rates_per_hotel`` rates spread over two rooms; prices,
+    boards, promotions and cancellation policies are drawn from ``seed`` so
+    runs are reproducible.
+    """
+    rnd = random.Random(seed)
+    base = datetime.fromisoformat(check_in).replace(tzinfo=timezone.utc)
+    hotels = []
+    made = 0
+    code = first_code
+    while made < n_rates:
+        per_hotel = min(rates_per_hotel, n_rates - made)
+        rooms = [{"code": "DBL.ST", "rates": []}, {"code": "TWN.ST", "rates": []}]
+        for i in range(per_hotel):
+            rate = {
+                "rateKey": f"{code}|{i}",
+                "rateClass": "NRF" if rnd.random() < 0.25 else "NOR",
+                "net": f"{rnd.uniform(40, 900):.2f}",
+                "boardCode": rnd.choice(BOARDS),
+                "allotment": rnd.randint(1, 20),
+            }
+            if rnd.random() < 0.3:
+                rate["promotions"] = [{"code": f"P{j}", "name": "Promo"}
+                                      for j in range(rnd.randint(1, 3))]
+            if rnd.random() < 0.7:
+                first = base - timedelta(days=rnd.randint(0, 30), hours=rnd.randint(0, 23))
+                rate["cancellationPolicies"] = [
+                    {"amount": "50.00", "from": (first + timedelta(days=d)).isoformat()}
+                    for d in range(rnd.randint(1, 2))
+                ]
+            rooms[i % 2]["rates"].append(rate)
+        hotels.append({
+            "code": code,
+            "name": f"Hotel {code}",
+            "categoryCode": rnd.choice(CATEGORIES),
+            "destinationCode": dest,
+            "rooms": [r for r in rooms if r["rates"]],
+        })
+        made += per_hotel
+        code += 1
+    return {"hotels": {"hotels": hotels, "checkIn": check_in,
+                       "checkOut": check_out, "total": len(hotels)}}
+
+
+def synthetic_content(codes, seed: int = 0) -> dict:
+    """Content response shaped like ``GET /hotel-content-api/1.0/hotels``;
+    each code always gets the same name and category."""
+    hotels = []
+    for code in codes:
+        rnd = random.Random(f"{seed}:{code}")
+        cat = rnd.choice(CATEGORIES)
+        hotels.append({"code": int(code), "name": {"content": f"Hotel {code}"},
+                       "categoryCode": cat, "category": category(cat)})
+    return {"hotels": hotels, "from": 1, "to": len(hotels), "total": len(hotels)}
+
+
+def synthetic_destinations(total: int = 1500) -> list:
+    """Destinations shaped like ``GET /hotel-content-api/1.0/locations/destinations``
+    entries: ``CITIES`` first, then numbered fillers with unused 3-letter codes."""
+    taken = {code for code, _, _ in CITIES}
+    out = [{"code": code, "name": {"content": name}, "countryCode": country,
+            "zones": [{"zoneCode": 1, "name": {"content": f"{name} Centre"}}]}
+           for code, name, country in CITIES]
+    fillers = ("".join(c) for c in itertools.product(string.ascii_uppercase, repeat=3))
+    for i, code in enumerate(c for c in fillers if c not in taken):
+        if len(out) >= total:
+            break
+        out.append({"code": code, "name": {"content": f"Destination {i:04d}"},
+                    "countryCode": "XX", "zones": []})
+    return out[:total]
+
+
+def synthetic_offers(slices, passengers: int = 1, n_offers: int = 50,
+                     seed: int = 0) -> dict:
+    """Offer request shaped like ``POST /air/offer_requests?return_offers=true``."""
+    rnd = random.Random(f"{seed}:{slices}")
+    pax = [{"id": f"pas_{i:04d}", "type": "adult"} for i in range(passengers)]
+    offers = []
+    for i in range(n_offers):
+        offer_slices = []
+        for s in slices:
+            depart = datetime.fromisoformat(s["departure_date"]) + timedelta(
+                hours=rnd.randint(5, 22), minutes=5 * rnd.randint(0, 11))
+            duration = timedelta(minutes=rnd.randint(60, 900))
+            offer_slices.append({
+                "origin": {"iata_code": s["origin"]},
+                "destination": {"iata_code": s["destination"]},
+                "duration": f"PT{duration.seconds // 3600}H{duration.seconds % 3600 // 60}M",
+                "segments": [{"departing_at": depart.isoformat(),
+                              "arriving_at": (depart + duration).isoformat(),
+                              "marketing_carrier": {"iata_code": rnd.choice(("BA", "IB", "LH", "AF", "U2"))},
+                              "marketing_carrier_flight_number": str(rnd.randint(100, 9999))}],
+            })
+        offers.append({
+            "id": f"off_{seed:04d}{i:06d}",
+            "total_amount": f"{rnd.uniform(40, 1500) * passengers:.2f}",
+            "total_currency": "EUR",
+            "passengers": pax,
+            "slices": offer_slices,
+        })
+    return {"data": {"id": f"orq_{seed:04d}", "slices": slices, "passengers": pax,
+                     "offers": offers}}